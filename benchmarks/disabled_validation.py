@@ -0,0 +1,72 @@
+"""
+Shows that disabled validation compiles out entirely.
+
+A jitted function wrapped in validators is lowered with validation
+turned off, and the HLO is compared against the same function without
+any validators at all. The two must be identical. Trace and lower
+times are reported for both, and for the function with validation on.
+
+Run from the repository root with
+
+    python -m benchmarks.disabled_validation
+"""
+import time
+from typing import Any
+
+import jax
+from jax import numpy as jnp
+
+from src.validation.core import Validator
+from src.validation.state import ValidationEnabledContextManager
+
+
+class NonNegative(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all(operand >= 0)
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError("Operand had negative entries")
+
+
+class Finite(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all(jnp.isfinite(operand))
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError("Operand had non-finite entries")
+
+
+validator = (NonNegative() & Finite()).compile()
+
+
+def make_step(validate: bool):
+    def step(x):
+        if validate:
+            x = validator(x)
+        y = jnp.tanh(x @ x.T)
+        if validate:
+            y = validator(y)
+        return y.sum()
+    return step
+
+
+def lower(step, x) -> (str, float):
+    start = time.perf_counter()
+    text = jax.jit(step).lower(x).as_text()
+    return text, time.perf_counter() - start
+
+
+def main():
+    x = jnp.ones([256, 256])
+    unwrapped_hlo, unwrapped_time = lower(make_step(False), x)
+    with ValidationEnabledContextManager(False):
+        disabled_hlo, disabled_time = lower(make_step(True), x)
+    enabled_hlo, enabled_time = lower(make_step(True), x)
+
+    print(f"unwrapped: lowered in {unwrapped_time * 1e3:.2f} ms, {len(unwrapped_hlo)} chars of HLO")
+    print(f"disabled:  lowered in {disabled_time * 1e3:.2f} ms, {len(disabled_hlo)} chars of HLO")
+    print(f"enabled:   lowered in {enabled_time * 1e3:.2f} ms, {len(enabled_hlo)} chars of HLO")
+    print(f"disabled HLO identical to unwrapped: {disabled_hlo == unwrapped_hlo}")
+    assert disabled_hlo == unwrapped_hlo
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Hammers chain construction and validation from many threads at once,
+as a multi-threaded server would.
+
+Each worker repeatedly builds chains drawn from a small shared pool,
+edits them, and validates an operand with a compiled chain. Since
+the pool is small, the threads are constantly racing to intern the
+same chains. Afterwards, every thread must have ended up holding the
+very same instance for each chain.
+
+Throughput is reported per operation, for 1 thread and for 32. Contention
+is measured by wrapping the locks of the interning table and the edit
+cache, and counting how often, and for how long, a thread had to wait.
+The edit methods capture the edit cache's lock when core is imported, so
+the wrappers are installed before that import, and reset between runs.
+
+Run from the repository root with
+
+    python -m benchmarks.thread_stress
+"""
+import random
+import threading
+import time
+from typing import Any, Dict, List
+
+import jax
+from jax import numpy as jnp
+
+from src.validation.state import get_cache, get_interning_table
+
+
+class CountingLock:
+    """
+    Wraps a lock, counting acquisitions, and how many of them,
+    and for how long in total, had to wait for another thread.
+    """
+    def __init__(self, lock: Any):
+        self.lock = lock
+        self.acquired = 0
+        self.contended = 0
+        self.waited = 0.0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self.lock.acquire(blocking=False):
+            self.acquired += 1
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter()
+        outcome = self.lock.acquire(True, timeout)
+        self.waited += time.perf_counter() - start
+        self.acquired += outcome
+        self.contended += outcome
+        return outcome
+
+    def reset(self):
+        self.acquired = 0
+        self.contended = 0
+        self.waited = 0.0
+
+    def release(self):
+        self.lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+        return False
+
+
+# The cachetools.cached decorators on the edit methods hold on to the lock
+# they were given, so swapping it out after core is imported would leave
+# most acquisitions uncounted.
+table, edits = get_interning_table(), get_cache("ValidatorEdits", weak=True)
+table.lock = CountingLock(table.lock)
+edits.lock = CountingLock(edits.lock)
+
+from src.validation.core import Validator
+
+
+class NonNegative(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all(operand >= 0)
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError("Operand had negative entries")
+
+
+class Below(Validator):
+    def __init__(self, bound: float):
+        self.bound = bound
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all(operand < self.bound)
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError(f"Operand was not below {self.bound}")
+
+
+def make_chain(rng: random.Random) -> Validator:
+    chain = NonNegative()
+    for _ in range(rng.randint(1, 3)):
+        chain = chain & Below(float(rng.randrange(1, 4)))
+    return chain
+
+
+# Jitted validation functions, shared between threads as a server would.
+compiled: Dict[Validator, Any] = {}
+
+
+def worker(seed: int, run_number: int, iterations: int, operand: Any, seen: List[Dict]):
+    # Every instance is kept alive, so that one id means one instance
+    rng = random.Random(seed)
+    local: Dict = {}
+    for _ in range(iterations):
+        chain = make_chain(rng)
+        local.setdefault(chain._key, {})[id(chain)] = chain
+        # The run number makes fresh chains each run, which the threads race to intern
+        edited = Below(float(100 * run_number + rng.randrange(3))) & chain.without_head()
+        local.setdefault(edited._key, {})[id(edited)] = edited
+        validate = compiled.get(chain)
+        if validate is None:
+            validate = compiled.setdefault(chain, jax.jit(chain.compile()))
+        validate(operand)
+    seen.append(local)
+
+
+def run(run_number: int, threads: int, iterations: int) -> None:
+    table.lock.reset()
+    edits.lock.reset()
+
+    operand = jnp.full([16], 0.5)
+    seen: List[Dict] = []
+    barrier = threading.Barrier(threads + 1)
+
+    def target(seed: int):
+        barrier.wait()
+        worker(seed, run_number, iterations, operand, seen)
+
+    pool = [threading.Thread(target=target, args=(seed,)) for seed in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # Every thread must have seen one and the same instance per chain
+    merged: Dict = {}
+    for local in seen:
+        for key, instances in local.items():
+            merged.setdefault(key, set()).update(instances)
+    duplicated = sum(len(ids) > 1 for ids in merged.values())
+
+    # Each iteration builds, edits, and validates a chain
+    operations = 3 * threads * iterations
+    print(f"{threads} threads: {operations / elapsed:.0f} operations per second, "
+          f"{len(merged)} distinct chains, {duplicated} built more than once")
+    for name, lock in [("interning table", table.lock), ("edit cache", edits.lock)]:
+        rate = lock.contended / lock.acquired * 100 if lock.acquired else 0.0
+        print(f"    {name}: {lock.acquired} acquisitions, {rate:.2f}% contended, "
+              f"{lock.waited * 1e3:.1f} ms spent waiting")
+
+    assert duplicated == 0
+
+
+def main():
+    # The first run jit compiles the whole pool of chains, so
+    # the later runs are not charged for it
+    run(0, 1, 500)
+    run(1, 1, 500)
+    run(2, 32, 500)
+
+
+if __name__ == "__main__":
+    main()
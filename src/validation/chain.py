@@ -0,0 +1,411 @@
+"""
+The chain module provides the persistent sequence validator chains
+are stored in.
+
+A chain is an immutable, height balanced binary tree. Each tree node
+holds a small chunk of consecutive items, so short chains are a single
+node, and long chains stay shallow. Every edit returns a new chain which
+shares all unchanged subtrees with the old one, so appending, prepending,
+inserting, removing, replacing and slicing all cost O(log n), no matter
+how long the chains get.
+
+Each chunk and each tree node also stores its length and a polynomial
+rolling hash of its items. The rolling hash only depends on the items,
+never on how they are split into chunks or arranged in the tree, so two
+chains holding the same items always hash the same, however they were
+built. This is what lets chains be used directly as interning keys.
+
+Operations on the tree are written in terms of join, following Blelloch,
+Ferizovic and Sun, "Just Join for Parallel Ordered Sets".
+"""
+
+from typing import Any, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+
+###
+# Define the rolling hash parameters, and the chunk size. The
+# modulus is the Mersenne prime 2**61 - 1.
+###
+
+hash_modulus = (1 << 61) - 1
+hash_base = 1_000_000_007
+chunk_size = 32
+
+
+class Chunk:
+    """
+    A run of consecutive items, with their rolling hash. The hash of
+    a sequence x_0 ... x_{n-1} is sum(h(x_i) * B**(n - 1 - i)), and
+    power is B**n, both modulo the hash modulus.
+    """
+    __slots__ = ("items", "hash_value", "power")
+
+    def __init__(self, items: Tuple[Hashable, ...], hash_value: Optional[int] = None, power: Optional[int] = None):
+        self.items = items
+        if hash_value is None:
+            hash_value, power = 0, 1
+            for item in items:
+                hash_value = (hash_value * hash_base + hash(item)) % hash_modulus
+                power = power * hash_base % hash_modulus
+        self.hash_value = hash_value
+        self.power = power
+
+    @classmethod
+    def merge(cls, first: 'Chunk', second: 'Chunk') -> 'Chunk':
+        return cls(first.items + second.items,
+                   (first.hash_value * second.power + second.hash_value) % hash_modulus,
+                   first.power * second.power % hash_modulus)
+
+
+class Chain:
+    """
+    A persistent sequence of hashable items. Every chain is a single
+    tree node holding a chunk of items, and the chains to its left and
+    right. The empty chain is represented by None.
+
+    Chains are never modified once built. All editing methods return
+    new chains, sharing structure with this one.
+    """
+    __slots__ = ("left", "chunk", "right", "length", "height", "hash_value", "power")
+
+    left: Optional['Chain']
+    chunk: Chunk
+    right: Optional['Chain']
+    length: int
+    height: int
+    hash_value: int
+    power: int
+
+    def __init__(self, left: Optional['Chain'], chunk: Chunk, right: Optional['Chain']):
+        """
+        Builds the node directly. This does no balancing, so use the
+        constructors and editing methods below instead.
+        """
+        self.left = left
+        self.chunk = chunk
+        self.right = right
+
+        # The hash of left + chunk + right is
+        #
+        # (H(left) * B**len(chunk) + H(chunk)) * B**len(right) + H(right)
+        #
+        # This sits on the hot path of every edit, hence the inlining.
+        hash_value, power = chunk.hash_value, chunk.power
+        length, height = len(chunk.items), 1
+        if left is not None:
+            hash_value = (left.hash_value * chunk.power + hash_value) % hash_modulus
+            power = left.power * power % hash_modulus
+            length += left.length
+            height = left.height + 1
+        if right is not None:
+            hash_value = (hash_value * right.power + right.hash_value) % hash_modulus
+            power = power * right.power % hash_modulus
+            length += right.length
+            if right.height >= height:
+                height = right.height + 1
+        self.hash_value = hash_value
+        self.power = power
+        self.length = length
+        self.height = height
+
+    ###
+    # Constructors
+    ###
+
+    @classmethod
+    def from_items(cls, items: Iterable[Hashable]) -> Optional['Chain']:
+        """
+        Builds a balanced chain holding the items, in order.
+
+        :param items: The items to store
+        :return: The chain, or None if there were no items
+        """
+        items = tuple(items)
+        chunks = [Chunk(items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+
+        def build(start: int, end: int) -> Optional['Chain']:
+            if start >= end:
+                return None
+            middle = (start + end) // 2
+            return cls(build(start, middle), chunks[middle], build(middle + 1, end))
+
+        return build(0, len(chunks))
+
+    @classmethod
+    def cons(cls, item: Hashable, rest: Optional['Chain']) -> 'Chain':
+        """
+        Places an item in front of a chain.
+
+        :param item: The new first item
+        :param rest: The chain to follow it. May be None.
+        :return: The new chain
+        """
+        return _cons(item, rest)
+
+    ###
+    # Reading
+    ###
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __hash__(self) -> int:
+        return self.hash_value
+
+    def __iter__(self) -> Iterator[Hashable]:
+        stack: List[Chain] = []
+        node = self
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield from node.chunk.items
+            node = node.right
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Hashable, Optional['Chain']]:
+        """
+        Gets the item at an index, or the chain covering a slice. Slices
+        with a step are not supported.
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step != 1:
+                raise ValueError("Chains can only be sliced with a step of 1")
+            return self.slice(start, stop)
+        index = self._normalize_index(index)
+        node = self
+        while True:
+            left_length = _length(node.left)
+            if index < left_length:
+                node = node.left
+                continue
+            index -= left_length
+            if index < len(node.chunk.items):
+                return node.chunk.items[index]
+            index -= len(node.chunk.items)
+            node = node.right
+
+    @property
+    def first(self) -> Hashable:
+        node = self
+        while node.left is not None:
+            node = node.left
+        return node.chunk.items[0]
+
+    def _normalize_index(self, index: int) -> int:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(f"Chain index out of range for chain of length {self.length}")
+        return index
+
+    ###
+    # Editing. Each of these costs O(log n).
+    ###
+
+    def split(self, index: int) -> Tuple[Optional['Chain'], Optional['Chain']]:
+        """
+        Splits the chain into the items before index, and the items from index on.
+
+        :param index: Where to split. Clamped to the chain.
+        :return: The two chains. Either may be None.
+        """
+        return _split(self, max(0, min(index, self.length)))
+
+    def slice(self, start: int, stop: int) -> Optional['Chain']:
+        """
+        The chain holding the items from start up to, not including, stop.
+        """
+        if start >= stop:
+            return None
+        left, _ = _split(self, stop)
+        _, middle = _split(left, start)
+        return middle
+
+    def concat(self, other: Optional['Chain']) -> 'Chain':
+        """
+        The chain holding the items of this chain, followed by those of other.
+        """
+        return _concat(self, other)
+
+    def insert(self, index: int, other: Optional['Chain']) -> 'Chain':
+        """
+        Inserts the items of another chain before the item at index.
+        """
+        left, right = self.split(index)
+        return _concat(_concat(left, other), right)
+
+    def remove(self, index: int) -> Optional['Chain']:
+        """
+        The chain without the item at index. None if that was the only item.
+        """
+        index = self._normalize_index(index)
+        left, right = _split(self, index)
+        _, right = _split(right, 1)
+        return _concat(left, right)
+
+    def replace(self, index: int, item: Hashable) -> 'Chain':
+        """
+        The chain with the item at index replaced.
+        """
+        index = self._normalize_index(index)
+        left, right = _split(self, index)
+        _, right = _split(right, 1)
+        return _concat(_concat(left, Chain(None, Chunk((item,)), None)), right)
+
+    ###
+    # Equality
+    ###
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, Chain):
+            return NotImplemented
+        if self.length != other.length or self.hash_value != other.hash_value:
+            return False
+        if self.length <= chunk_size and self.left is None and self.right is None \
+                and other.left is None and other.right is None:
+            # Short chains are a single chunk, so this is one tuple comparison
+            return self.chunk.items == other.chunk.items
+        return _equal(self, other)
+
+    def __repr__(self) -> str:
+        return f"Chain({list(self)!r})"
+
+
+###
+# Define the tree helpers. These all accept None as the empty chain.
+###
+
+def _length(chain: Optional[Chain]) -> int:
+    return chain.length if chain is not None else 0
+
+def _height(chain: Optional[Chain]) -> int:
+    return chain.height if chain is not None else 0
+
+def _rotate_left(chain: Chain) -> Chain:
+    right = chain.right
+    return Chain(Chain(chain.left, chain.chunk, right.left), right.chunk, right.right)
+
+def _rotate_right(chain: Chain) -> Chain:
+    left = chain.left
+    return Chain(left.left, left.chunk, Chain(left.right, chain.chunk, chain.right))
+
+def _join_right(left: Chain, chunk: Chunk, right: Optional[Chain]) -> Chain:
+    # Left is the taller. Walk down its right spine until the heights are
+    # close enough to hang the right chain there, then rebalance on the way up.
+    middle = left.right
+    if _height(middle) <= _height(right) + 1:
+        joined = Chain(middle, chunk, right)
+        if _height(joined) <= _height(left.left) + 1:
+            return Chain(left.left, left.chunk, joined)
+        return _rotate_left(Chain(left.left, left.chunk, _rotate_right(joined)))
+    joined = _join_right(middle, chunk, right)
+    result = Chain(left.left, left.chunk, joined)
+    if _height(joined) <= _height(left.left) + 1:
+        return result
+    return _rotate_left(result)
+
+def _join_left(left: Optional[Chain], chunk: Chunk, right: Chain) -> Chain:
+    # The mirror image of _join_right
+    middle = right.left
+    if _height(middle) <= _height(left) + 1:
+        joined = Chain(left, chunk, middle)
+        if _height(joined) <= _height(right.right) + 1:
+            return Chain(joined, right.chunk, right.right)
+        return _rotate_right(Chain(_rotate_left(joined), right.chunk, right.right))
+    joined = _join_left(left, chunk, middle)
+    result = Chain(joined, right.chunk, right.right)
+    if _height(joined) <= _height(right.right) + 1:
+        return result
+    return _rotate_right(result)
+
+def _join(left: Optional[Chain], chunk: Chunk, right: Optional[Chain]) -> Chain:
+    """
+    The balanced chain holding left, then chunk, then right.
+    """
+    if _height(left) > _height(right) + 1:
+        return _join_right(left, chunk, right)
+    if _height(right) > _height(left) + 1:
+        return _join_left(left, chunk, right)
+    return Chain(left, chunk, right)
+
+def _split(chain: Optional[Chain], index: int) -> Tuple[Optional[Chain], Optional[Chain]]:
+    if chain is None:
+        return None, None
+    left_length = _length(chain.left)
+    if index <= left_length:
+        left, right = _split(chain.left, index)
+        return left, _join(right, chain.chunk, chain.right)
+    items = chain.chunk.items
+    index -= left_length
+    if index >= len(items):
+        left, right = _split(chain.right, index - len(items))
+        return _join(chain.left, chain.chunk, left), right
+    # The split falls inside this node's chunk
+    return (_join(chain.left, Chunk(items[:index]), None),
+            _join(None, Chunk(items[index:]), chain.right))
+
+def _split_first(chain: Chain) -> Tuple[Chunk, Optional[Chain]]:
+    if chain.left is None:
+        return chain.chunk, chain.right
+    chunk, rest = _split_first(chain.left)
+    return chunk, _join(rest, chain.chunk, chain.right)
+
+def _split_last(chain: Chain) -> Tuple[Optional[Chain], Chunk]:
+    if chain.right is None:
+        return chain.left, chain.chunk
+    rest, chunk = _split_last(chain.right)
+    return _join(chain.left, chain.chunk, rest), chunk
+
+def _first_chunk(chain: Chain) -> Chunk:
+    while chain.left is not None:
+        chain = chain.left
+    return chain.chunk
+
+def _cons(item: Hashable, chain: Optional[Chain]) -> Chain:
+    # Prepending is what building a validator does, so it gets its own
+    # path. The item joins the first chunk when there is room, updating
+    # the chunk hash in O(1), and only the left spine is copied.
+    if chain is None:
+        return Chain(None, Chunk((item,)), None)
+    if chain.left is not None:
+        return _join(_cons(item, chain.left), chain.chunk, chain.right)
+    chunk = chain.chunk
+    if len(chunk.items) >= chunk_size:
+        return _join(None, Chunk((item,)), chain)
+    chunk = Chunk((item,) + chunk.items,
+                  (hash(item) * chunk.power + chunk.hash_value) % hash_modulus,
+                  chunk.power * hash_base % hash_modulus)
+    return Chain(None, chunk, chain.right)
+
+def _concat(left: Optional[Chain], right: Optional[Chain]) -> Optional[Chain]:
+    # The chunks meeting at the seam are merged when they fit in one,
+    # so building a chain an item at a time does not fragment it.
+    if left is None:
+        return right
+    if right is None:
+        return left
+    rest, last = _split_last(left)
+    first = _first_chunk(right)
+    if len(last.items) + len(first.items) <= chunk_size:
+        _, right = _split_first(right)
+        return _join(rest, Chunk.merge(last, first), right)
+    return _join(rest, last, right)
+
+def _equal(this: Optional[Chain], other: Optional[Chain]) -> bool:
+    # Both chains are known to have the same length here. Where the
+    # two trees are laid out the same way, we compare piece by piece, so
+    # subtrees shared between the chains are matched by identity alone.
+    # Otherwise we fall back to walking the items.
+    if this is other:
+        return True
+    if this.hash_value != other.hash_value:
+        return False
+    if (_length(this.left) != _length(other.left)
+            or len(this.chunk.items) != len(other.chunk.items)):
+        return all(a is b or a == b for a, b in zip(this, other))
+    if this.chunk is not other.chunk and this.chunk.items != other.chunk.items:
+        return False
+    return _equal(this.left, other.left) and _equal(this.right, other.right)
@@ -0,0 +1,106 @@
+import numpy as np
+import jax
+from jax import numpy as jnp
+from typing import Any, List, Optional, Tuple
+from .core import Validator, CompiledValidator
+
+
+class NOf(Validator):
+    """
+    A meta validator holding several branch chains, which passes
+    if at least 'required' of the branches pass. It is what the `|`
+    operator, and the any_of, all_of, and n_of combinators, build.
+
+    Each branch is compiled, and the predicates of every branch are evaluated
+    together. The per branch outcomes are stacked into one boolean vector,
+    and reduced with a single count, rather than through nested conds.
+
+    Branches made only of static checks, such as on shape or dtype, are
+    resolved in python while tracing. If every branch resolves this way,
+    so does the combinator, and it returns a plain bool, just like the
+    checks inside it.
+
+    Only when the whole combinator fails is an exception made. It is an
+    ExceptionGroup holding the exception of the first failing node of
+    each failing branch.
+
+    Example
+    =======
+
+    ```
+    validator = Finite() & (IsDtype("int32") | IsDtype("float32"))
+    ```
+    """
+    def __init__(self, required: int, *branches: Validator):
+        """
+        :param required: How many of the branches must pass
+        :param branches: The heads of the branch chains
+        """
+        if not branches:
+            raise ValueError("At least one branch must be provided")
+        if not 0 <= required <= len(branches):
+            raise ValueError(f"Cannot require {required} of {len(branches)} branches to pass")
+        self.required = required
+        self.branches = branches
+        self.compiled_branches: Tuple[CompiledValidator, ...] = tuple(CompiledValidator(branch)
+                                                                      for branch in branches)
+
+    @staticmethod
+    def _find_static_failure(branch: CompiledValidator, operand: Any, **kwargs) -> Optional[int]:
+        # Walks the branch in python for as long as every outcome is static.
+        # Gives the index of the failing node, the length of the branch if it
+        # passed, or None once something turns out to be traced.
+        for index, node in enumerate(branch.nodes):
+            passed = node._execute_predicate(operand, **kwargs)
+            if not Validator._is_static(passed):
+                return None
+            if not passed:
+                return index
+            continues = node._execute_chain_predicate(**kwargs)
+            if not Validator._is_static(continues):
+                return None
+            if not continues:
+                break
+        return len(branch.nodes)
+
+    def _evaluate_branch(self, branch: CompiledValidator, operand: Any, **kwargs) -> Any:
+        failure_index = self._find_static_failure(branch, operand, **kwargs)
+        if failure_index is not None:
+            return failure_index == len(branch.nodes)
+        return jnp.all(branch._evaluate_chain(operand, **kwargs))
+
+    def _evaluate_branches(self, operand: Any, **kwargs) -> List[Any]:
+        """
+        Evaluates every branch at once.
+
+        :param operand: The operand to validate
+        :param kwargs: The kwargs conditioning the validation
+        :return: One outcome per branch. True means the branch passed. Branches
+                 which could be resolved statically give a python bool.
+        """
+        return [self._evaluate_branch(branch, operand, **kwargs) for branch in self.compiled_branches]
+
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        passed = self._evaluate_branches(operand, **kwargs)
+        if all(Validator._is_static(item) for item in passed):
+            return sum(bool(item) for item in passed) >= self.required
+        return jnp.sum(jnp.stack([jnp.asarray(item, dtype=bool) for item in passed])) >= self.required
+
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        # Runs on the host, or while tracing if the failure was static, so
+        # the branches can just be evaluated again to find out which failed,
+        # and where.
+        passed = np.asarray(self._evaluate_branches(operand, **kwargs))
+        exceptions: List[Exception] = []
+        for branch, branch_passed in zip(self.compiled_branches, passed):
+            if branch_passed:
+                continue
+            failure_index = self._find_static_failure(branch, operand, **kwargs)
+            if failure_index is None:
+                failure_index = int(branch._find_failure_index(operand, **kwargs))
+            node = branch.nodes[failure_index]
+            payload = node._execute_summarize(operand, **kwargs)
+            exceptions.append(node._execute_create_exception(payload, **kwargs))
+        msg = (f"Expected at least {self.required} of {len(self.branches)} branches to pass, "
+               f"but only {int(passed.sum())} did")
+        return ExceptionGroup(msg, exceptions)
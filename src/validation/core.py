@@ -1,17 +1,25 @@
 import textwrap
+import weakref
+import contextvars
 import cachetools
 import cachetools.keys
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 from typing import Any, Optional, List, Dict, Tuple, Callable, Type, Hashable, Generator, Union
 
-from .state import get_success_callback, get_exception_callback, get_cache
+from .state import (get_success_callback, get_exception_callback, set_success_callback,
+                    set_exception_callback, get_cache, get_execution_backend,
+                    is_validation_enabled, get_interning_table, get_link_table)
 from .types import Operand
+from .chain import Chain
 
+import numpy as np
 import jax.tree_util
 from jax import tree_util
+from jax import numpy as jnp
 from jax.tree_util import PyTreeDef
+from jax.experimental import checkify as jax_checkify
 
 ####
 # Define validation error, and validation functions.
@@ -91,958 +99,137 @@ def create_initialization_exception(subclass_name: str,
     message = format_exception_message(subclass_name, subtask, details)
     return ValidatorException(subclass_name, task, message)
 
-class LinkListNode:
+def create_subclass_code_exception(validator: Any,
+                                   code_feature: str,
+                                   details: str
+                                   ) -> ValidatorException:
     """
-    A statically defined linked list node mechanism,
-    this is designed to implement the linked list
-    part of the equation.
+    Creates an exception indicating subclass provided code, such as
+    a predicate, misbehaved while validating.
 
+    :param validator: The validator whose code misbehaved
+    :param code_feature: Which code feature, such as 'predicate', is misbehaving
+    :param details: Any error message details
+    :return: The exception
     """
+    subclass_name = type(validator).__name__
+    task = "Validating the user provided operand"
+    subtask = f"Executing or using subclass provided code called '{code_feature}'"
+    message = format_exception_message(subclass_name, subtask, details)
+    return ValidatorException(subclass_name, task, message)
 
-    ##
-    # Define the central features of each node
-    #
-    # There exists a next_node feature and a
-    # rebind factory. This is particular to the node
-    #
-    # There also exists a attr class and
-    # instance cache that will be common across all LinkListNode
-    # instances
-    ###
-    next_node: 'LinkListNode'
-    NodeBindingFactory: 'NodeBindingFactory'
-    attr_cache = get_cache("LinkAttrCache")
-    instance_cache = get_cache("LinkInstanceCache")
-
-    ##
-    # Define some relatively simple properties.
-    ##
-
-    @property
-    def has_next_node(self)->bool:
-        return self.next_node is not None
-
-    ###
-    # Setup various utility methods.
-    #
-    # This is very important as it ensures the caching mechanism
-    # can distinguish between different methods
-    ###
-    def method_key_factory(self, name: str):
-        """
-        Creates a method key factory, which has the
-        name of the method included in the hashing process
-
-        This should hopefully ensure we do not confuse different
-        methods with the same arguments
-        :param name: The name of the method
-        :return: A method key, bound to the method with that name
-        """
-
-        def method_key(self, *args, **kwargs):
-            args = [self, name, *args]
-            return cachetools.keys.hashkey(*args, **kwargs)
-
-        return method_key
-
-    def rebind_node(self, node: Optional['LinkListNode'])->'LinkListNode':
-        """
-        A very important method, this rebinds a provided node to point
-        at a different node instead
+def create_subclass_code_did_not_run_exception(validator: Any,
+                                               code_feature: str
+                                               ) -> ValidatorException:
+    details = f"""\
+    The provided code did not run successfully. It is possible that
+    your code was malformed, you did not provide needed kwargs, or even
+    that jit is acting up
+    """
+    return create_subclass_code_exception(validator, code_feature, details)
+
+def create_subclass_code_returned_wrong_type_exception(validator: Any,
+                                                       code_feature: str,
+                                                       required: str,
+                                                       observed: Any,
+                                                       ) -> ValidatorException:
+    details = f"""\
+    The provided code ran just fine, however it did not return the
+    correct type. The required type was '{required}', but what was
+    observed was '{type(observed)}
+    """
+    return create_subclass_code_exception(validator, code_feature, details)
 
-        :param node: The node to point at
-        :return: A node with the same value, pointing to the new location
-        """
-        return self.__factory_key.bind_key(node)
+class WeakKeyItem:
+    """
+    Stands in for a validator within a cache key, without keeping it
+    alive. It is only equal to items standing in for the very same
+    validator, and once that validator is collected, it is equal to
+    nothing at all, so a reused id can never produce a false hit.
+    """
+    __slots__ = ("reference", "hash_value")
 
+    def __init__(self, item: Any):
+        self.reference = weakref.ref(item)
+        self.hash_value = id(item)
 
-    ##
-    # Setup the attributes and features that need to be cached
-    # in the attr cache.
-    #
-    # These will not  return new instances
-    ##
-    @cachetools.cached(attr_cache, method_key_factory("length"))
-    def __len__(self) -> int:
-        if not self.has_next_node:
-            return 1
-        return len(self.next_node) + 1
-    @cachetools.cached(attr_cache, method_key_factory("key"))
-    def key(self)->Tuple['NodeBindingFactory', ...]:
-        if len(self) == 1:
-            return (self.__factory_key,)
-        return tuple([self.__factory_key, *self.next_node.key()])
-    @cachetools.cached(attr_cache, method_key_factory("hash"))
     def __hash__(self) -> int:
-        return hash(self.key())
-
-    ##
-    # Other actions may result in the return of an instance or even
-    # a new instance. These are cached in the instance cache instead
-    ##
-    def __iter__(self)->Generator['LinkListNode']:
-        yield self
-        if self.has_next_node:
-            for item in iter(self):
-                yield item
-
-    @cachetools.cached(attr_cache, method_key_factory("as_list"))
-    def as_keylist(self)->List['NodeBindingFactory']:
-        return list(self.key())
-
-    @cachetools.cached(instance_cache, method_key_factory("from_list"))
-    @classmethod
-    def from_keylist(cls, items: List['NodeBindingFactory'])-> 'LinkListNode':
-        if len(items) == 1:
-            subnode = None
-        else:
-            subnode = cls.from_keylist(items[1:])
-        return items[0].bind_key(subnode)
+        return self.hash_value
 
-    # TODO: The following is not terribly elegant
-    #
-    # It gets the job done, but might need replacing if cache rebuilds happen often.
-
-    @cachetools.cached(instance_cache, method_key_factory("getitem"))
-    def __getitem__(self, item: Union[int, slice])->'LinkListNode':
-        return list(self.__iter__())[item]
-    @cachetools.cached(instance_cache, method_key_factory("append"))
-    def append(self, item: 'LinkListNode')->'LinkListNode':
-        items = self.as_keylist()
-        items.append(item)
-        return self.from_keylist(items)
-    @cachetools.cached(instance_cache, method_key_factory("insert"))
-    def insert(self, index: int, value: 'LinkListNode')->'LinkListNode':
-        items = self.as_keylist()
-        inserting = value.as_keylist()
-        items = items[:index] + inserting + items[index:]
-        return self.from_keylist(items)
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, WeakKeyItem):
+            return NotImplemented
+        item = self.reference()
+        return item is not None and item is other.reference()
 
-    def __init__(self,
-                 next_node: 'LinkListNode',
-                 node_key_factory: 'NodeBindingFactory',
-                 ):
-        self.next_node = next_node
-        self.__factory_key = node_key_factory
+def make_method_key(name: str) -> Callable[..., Hashable]:
+    """
+    Creates a cache key function which includes the name of the
+    method in the key. This ensures different methods called with
+    the same arguments cannot be confused in a shared cache.
 
+    Validators within the key are only weakly referenced. An edit
+    may return the validator itself, or a chain ending in it, and
+    the key must not then keep its own value alive forever.
 
+    :param name: The name of the method
+    :return: A key function, for use with cachetools.cached
+    """
+    def weaken(item: Any) -> Any:
+        return WeakKeyItem(item) if isinstance(item, Validator) else item
+    def method_key(self, *args, **kwargs):
+        args = tuple(weaken(item) for item in args)
+        kwargs = {key: weaken(item) for key, item in kwargs.items()}
+        return cachetools.keys.hashkey(weaken(self), name, *args, **kwargs)
+    return method_key
+
+# Set while the branches of a traced jax.lax.cond are being traced. A static
+# failure found there is not known to happen at run time, since the branch
+# may not be taken, and so must be deferred into a callback like any other.
+_within_traced_branch: contextvars.ContextVar = contextvars.ContextVar("within_traced_branch", default=False)
 
 ##
 # Define tree util node spec class
 ###
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class ValidatorNodeSpec:
+    """
+    The value held by a single node of a validator chain, sans
+    any link information. A chain is stored as a persistent
+    sequence of these, head first. See chain.py.
+
+    Equality only looks at the class identity and the flattened
+    constructor parameters, along with the type of each parameter.
+    1, 1.0 and True compare and hash equal in python, but need not
+    build validators that behave the same. The hash is computed once,
+    when the spec is made.
+    """
     type: Type['Validator']
     args: Any
     kwargs: Any
-
-class AbstractValidator(ABC):
-    """
-    Define the abstract protocol that will be fufilled
-    by subclasses here
-    """
-    @abstractmethod
-    def chain_predicate(self, operand: Operand, **kwargs: Any)->bool:
-        """
-        A logical method that a subclass of validator must fufill in order
-        for its logic to operate properly
-
-        The chain predicate controls whether or not to continue validation if
-        the validation mechanism is passed.
-
-        :param operand: The operand, in case chain predicate depends on it
-        :param kwargs: The current kwargs. Can be used during condition
-        :return: A bool or scalar bool array
-        """
-        pass
-
-    @abstractmethod
-    def predicate(self, operand: Any, **kwargs) -> bool:
-        """
-        Abstract method a subclass must implement. This
-        should return true if validation is passed, and
-        false otherwise
-
-        :param operand: The operand that failed
-        :param kwargs: The kwargs situation for the operand
-        :return: A bool or scalar bool array
-        """
-        pass
-
-    @abstractmethod
-    def create_exception(self, operand: Any, **kwargs) -> Exception:
-        """
-        Abstract method that subclasses must implement to perform validation checks
-        on the given operand. This method should return an exception to be raised and otherwise handled. It
-        will only be triggered when the predicate fails.
-
-        It should NOT raise the exception itself.
-
-        :param operand: The operand to be validated.
-        :param kwargs: Additional keyword arguments that may be needed for validation.
-                       These arguments are accessible to all validators in the chain.
-        :return: A bool or scalar bool array, and an exception to raise if failing
-        """
-        pass
-
-    @abstractmethod
-    def handle_exception(self, exception: Exception, **kwargs) -> Exception:
-        """
-        Handles an exception detected from further down in the
-        validation chain. Does something with it. Must pass back
-        an exception, but the exception need not be the same one.
-
-        :param exception: The exception from downstream. You may log, throw,
-                          or otherwise cause side effects. It is recommended
-                          to log into kwargs if you do so
-        :return: Either an error, in which case the error chain continues, or None,
-                 which suppresses the error. You may even transform the original
-                 error, and return the new error.
-        """
-        return exception
-
-
-
-#####
-# It is difficult to contain all mechanisms of core in a single class without it getting unwieldy
-#
-# We define the following node mechanism to allow us to wrap the user-provided functions
-####
-
-class SubclassMethodsInterface:
-    """
-    This class is a value validation-focused node that contains
-    the features of relevance extracted from a particular subclass.
-
-    For the most part, this just means the bound methods responsible
-    for performing validation. However, it also may include in the
-    future other methods, and at the moment includes the name of
-    the subclass so error messages will look pretty.
-
-    Regardless, anything that interacts with a subclass's code
-    or fields must go through this class.
-
-    Methods
-    =======
-
-    Ignoring internal methods, the following are provided
-
-    - predicate: Whether validation passed
-    - create_exception: A bound exception factory function
-    - handle_exception: Two things, first emit side effects and also emit new (or old) error
-    - chain_predicate: Whether to continue validation/.
-
-    Initialization
-    ==============
-
-    Initialization consists of providing the subclass name, and then
-    the subclass's version of the validation function listed above.
-
-    """
-    _exception_predicate_name: str = 'predicate'
-    _exception_factory_name: str = 'create_exception'
-    _exception_handle_name: str = 'handle_exception'
-    _exception_chain_name: str = 'chain_predicate'
-    _node_cache: Dict[Hashable, 'SubclassMethodsInterface'] = {}
-
-    #####
-    # Create error formatting functions. We will have many
-    # cases where we need to either tell the user you gave us code
-    # that does not run, or returned the wrong type.
-    #
-    # Following DRY, these are extracted into common methods
-    ####
-    def create_subclass_code_exception(self,
-                                       code_feature: str,
-                                       details: str) -> ValidatorException:
-        """
-        A helper class, it tries
-        :param subclass_name: The validator subclass of concern
-        :param code_feature: Which code feature, such as 'predicate', is misbehaving
-        :param details: Any error message details
-        :return: The exception
-        """
-        task = "Validating the user provided operand"
-        subtask = f"Executing or using subclass provided code called '{code_feature}'"
-        message = format_exception_message(self.subclass_name, subtask, details)
-        return ValidatorException(self.subclass_name, task, message)
-
-    def create_subclass_code_did_not_run_exception(self,
-                                                   code_feature: str
-                                                   ) -> ValidatorException:
-        details = f"""\
-        The provided code did not run successfully. It is possible that
-        your code was malformed, you did not provide needed kwargs, or even
-        that jit is acting up
-        """
-        return self.create_subclass_code_exception(code_feature, details)
-
-    def create_subclass_code_returned_wrong_type_exception(self,
-                                                           code_feature: str,
-                                                           required: str,
-                                                           observed: Any,
-                                                           ) -> ValidatorException:
-        details = f"""\
-        The provided code ran just fine, however it did not return the 
-        correct type. The required type was '{required}', but what was
-        observed was '{type(observed)}
-        """
-        return self.create_subclass_code_exception(code_feature, details)
-    #####
-    # Validation is required for every one of the important responsibilities
-    # subclasses
-    #
-    # These provide access points that are validated.
-    ####
-
-    def predicate(self, operand: Operand, **kwargs: Any)->bool:
-        """
-        Checks if the predicate is satisfied. Also, provides
-        feedback when the user-provided predicate is insane
-
-        :param operand: The operand to validate
-        :param kwargs: The kwargs conditioning the validation
-        :return: A bool or bool array
-        :raise ValidatorException: If the predicate specified did not run
-        :raise ValidatorException: If the predicate ran, but did not return a bool type.
-        """
-        try:
-            outcome = self._predicate(operand, **kwargs)
-        except Exception as err:
-            raise self.create_subclass_code_did_not_run_exception(self._exception_predicate_name) from err
-        if not isinstance(outcome, bool):
-            raise self.create_subclass_code_returned_wrong_type_exception(self._exception_predicate_name,
-                                                                          required='bool',
-                                                                          observed=outcome)
-        return outcome
-
-    def create_exception(self, operand: Operand, **kwargs: Any)->Exception:
-        """
-        Create an exception which will be managed by the chain of
-        responsibility, and validate that the exception is sane
-
-        :param operand: The operand to validate
-        :param kwargs: The Kwargs conditioning the validation
-        :return: An exception for the situation
-        :raise ValidatorException: If the user-provided create exception mechanism did not run
-        :raise ValidatorException: If the the user provided mechanism ran, but did not return 
-                an exception
-        """
-        try:
-            outcome = self._create_exception(operand, **kwargs)
-        except Exception as err:
-            raise self.create_subclass_code_did_not_run_exception(self._exception_factory_name) from err
-        if not isinstance(outcome, Exception):
-            raise self.create_subclass_code_returned_wrong_type_exception(self._exception_factory_name,
-                                                                          required='Exception',
-                                                                          observed=outcome)
-        return outcome
-
-
-    def handle_exception(self, exception: Exception, **kwargs: Any)->Exception:
-        """
-        Handles some action that an exception can cause or encourage
-
-        :param exception: The exception to handle
-        :param kwargs: The kwargs influencing this exception
-        :return: An exception, either the same one or a different one
-        :raise ValidatorException: If the user-provided handle exception mechanism could not be run
-        :raise ValidatorException: If the the user provided mechanism ran, but did not return
-                an exception
-        """
-        try:
-            outcome = self._handle_exception(exception, **kwargs)
-        except Exception as err:
-            raise self.create_subclass_code_did_not_run_exception(self._exception_handle_name) from err
-        if not isinstance(outcome, Exception):
-            raise self.create_subclass_code_returned_wrong_type_exception(self._exception_handle_name,
-                                                                          required="Exception",
-                                                                          observed = outcome)
-        return outcome
-
-    def chain_predicate(self, operand: Exception, **kwargs: Any)->bool:
-        """
-        Checks into whether the chain predicate says to continue further in the
-        chain of responsibility
-
-        :param operand: The operand being validated
-        :param kwargs: The kwargs conditioning the validation
-        :return: A bool or bool array
-        :raise ValidatorException: If the user-provided chain predicate mechanism did not run
-        :raise ValidatorException: If the the user provided mechanism ran, but did not return
-                a bool
-        """
-        try:
-            outcome = self._chain_predicate(operand, **kwargs)
-        except Exception as err:
-            raise self.create_subclass_code_did_not_run_exception(self._exception_chain_name) from err
-        if not isinstance(outcome, bool):
-            raise self.create_subclass_code_returned_wrong_type_exception(self._exception_chain_name,
-                                                                          required='bool',
-                                                                          observed=outcome)
-        return outcome
-
-    def __init__(self, subclass: AbstractValidator):
-
-        self.subclass_name = type(subclass).__name__
-        self._predicate = subclass.predicate
-        self._create_exception = subclass.create_exception
-        self._handle_exception = subclass.handle_exception
-        self._chain_predicate = subclass.chain_predicate
-
-@dataclass(frozen=True)
-class NodeBindingFactory:
-    """
-    A validator node may be subclassed, and the subclass must
-    be reproducable multiple times in factory-like fashion
-    but possibly pointing towards a different node.
-
-    """
-    ##
-    # Define the fields that the constructor key can store
-    # These will be some extra info for pretty printing, and
-    # the features needed to rebuild the node, sans what the
-    # next link would be
-    ##
-
-    name: str
-    cls_type: Type['ListNode']
     params_flat: Tuple[Hashable, ...]
+    params_types: Tuple[type, ...]
     params_treedef: PyTreeDef
-    def __hash__(self)->int:
-        key = (self.cls_type, self.params_flat, self.params_treedef)
-        return hash(key)
-
-    ###
-    # Define the methods usable for making a key,
-    # or binding the key back into a node
-    ##
-    @classmethod
-    def make_key(cls, node: 'ListNode', *args, **kwargs)-> 'ConstructorNodeKey':
-        """
-        Creates a constructor key capable of rebuilding the current
-        node if needed, and capable of representing the current
-        node in hashable situations.
-
-        :param instance: The instance to represent
-        :param args: The args used to create the instance
-        :param kwargs: The kwargs used to create the instance
-        :return: A constructor key, related to the situation
-        """
-        cls_type = node.__class__
-        name = cls.__name__
-        constructor_params = (args, kwargs)
-        flat_constructor_params, constructor_treedef = jax.tree_util.tree_flatten(constructor_params)
-        return cls(name=name,
-                   cls_type=cls_type,
-                   params_flat = tuple(flat_constructor_params),
-                   params_treedef=constructor_treedef)
-    def bind_key(self, node: Optional['ListNode'])->'ListNode':
-        """
-        Takes an existing constructor key and binds it to a particular node,
-        returning an instance.
-
-        :param node: The next node to consider. Can be a listnode or none
-        :return: The new listnode, with same arguments and bound to Node
-        """
-        args, kwargs = jax.tree_util.tree_unflatten(self.params_treedef, self.params_flat)
-        instance = self.cls_type(node, *args, **kwargs)
-        return instance
-
-
-HandleCallback = Callable[[Exception, ...], Exception]
-SuccessCallback = Callable[[Operand, ...], None]
-class LogicNode:
-    """
-    Background
-    ==========
-
-    Internally and conceptually, validation is implemented
-    using the chain-of-responsibility pattern. This means there is a
-    linked list, and each element of the linked list has a particular
-    responsibility
-
-    This implements the linking mechanism, and also implements the
-    logic to bind the list of links into a
-
-    Purpose
-    =======
-
-    This class is that linked list.
-
-    It is dedicated to providing logic for the validator-specific
-    mechanisms, and for calling into the next node if it exists. It
-    must also call into the success or failure callbacks, if provided.
-
-    Logic - Recurrent vs actual
-    ===========================
-
-    Jax is a little tricky to run flow control against if you
-    want to maintain jit compatibility.
-
-    To ensure compatibility is maintained, we use flow control with
-    a switch based architecture, and have switch cases validation completely
-    passed, validation failed
-
-    Additionally, exception generation and handling is executed under python
-    by means of a debug callback.
-    """
-
-
-
-    ####
-    # It is exceptionally difficult to logically organize
-    # complex flow control using jax.
-    #
-    # We use a switch statement for the flow control cases
-    # in this class. The following bits of code will
-    # make the switch cases
-    ####
-    def did_validation_pass(self, operand: Operand, kwargs: Dict[str, Any])->bool:
-        return self.subclass_functions.predicate(operand, **kwargs)
-    def can_continue_chain(self, operand: Operand, kwargs: Dict[str,Any])->bool:
-        if self.next_node is None:
-            return False
-        return self.subclass_functions.chain_predicate(operand, **kwargs)
-    def make_switch_case(self, operand: Operand, kwargs: Dict[str, Any])->int:
-        """
-        Creates one of three switch cases in index format, since
-        jax likes indices rather than branches. We define three cases -
-
-        0: Failure case. An error was reached
-        1: Success case. Validation is done
-        2: Chain can be continued like normal
-        """
-        case = 0
-        case = case + self.did_validation_pass(operand, kwargs) # Is one if passed, zero otherwise
-        case = case + case*self.can_continue_chain(operand, kwargs) # In case prior passed,
-        return case
-
-    ####
-    # Because jax is functional, making the logic work requires
-    # a few factory methods and an exception branch must be
-    # defined here
-    ####
-
-    def wrap_handle_callback(self, handle_callback: HandleCallback)->HandleCallback:
-        """
-        Wraps a handle callback to instead first call into
-        this node's handle method, then call into the last
-        node.
-
-        :param handle_callback: The current handle callback
-        :return: The new wrapped version
-        """
-        def wrapped_handle_callback(exception: Exception, **kwargs):
-            # First runs the handle method on this node, then
-            # calls into the handle callback from the last node
-            exception = self.subclass_functions.handle_exception(exception, **kwargs)
-            handle_callback(exception, **kwargs)
-        return wrapped_handle_callback
-
-    def run_exception_branch(self,
-                             operand: Operand,
-                             handle_callback: HandleCallback,
-                             success_callback: SuccessCallback,
-                             kwargs: Dict[str, Any]
-                             ):
-        """
-        This is part interface, part logic, and is executed if an exception
-        state is reached. It will create the exception, then call into the
-        handling callback
-        """
-        exception = self.subclass_functions.create_exception(operand, **kwargs)
-        handle_callback(exception, **kwargs)
-
-    ###
-    # Primary validation logic
-    ###
-    def run_validation(self,
-                       operand: Operand,
-                       handle_callback: HandleCallback,
-                       success_callback: SuccessCallback,
-                       kwargs: Dict[str, Any]) -> object:
-        ##
-        # Validation is performed with what is effectively a recurrent
-        # architecture, that calls into subsequent code. For reasons
-        # of jax compatibility, a switch statement is used for flow control.
-        # There are two base cases, then a recurrent case:
-        #
-        # switch_index: 0: Base case, exception detected
-        # switch_index: 1: Base case, all validation passed
-        # switch_index: 2: Recurrent case, calls into next node.
-        #
-        ###
-
-        handle_callback = self.wrap_handle_callback(handle_callback)
-        switch_index = self.make_switch_case(operand, kwargs)
-        switch_cases = [jax.tree_util.Partial(jax.debug.callback, self.run_exception_branch),
-                        success_callback,
-                        self.next_node.run_validation]
-        jax.lax.switch(switch_index,
-                       switch_cases,
-                       operand,
-                       handle_callback,
-                       success_callback,
-                       kwargs
-                       )
-
-    def __init__(self,
-                 subclass_bindings: SubclassMethodsInterface,
-                 next_node: Optional['LogicNode'] = None
-                 ):
-        """
-        This should rarely ever be called directly
-        :param subclass_bindings: The subclass methods interface containing the subclass methods
-        :param next_node: The next logic node in the linked list.
-        """
-        self.subclass_functions = subclass_bindings
-        self.next_node = next_node
-    def __call__(self,
-                 operand: Operand,
-                 final_exception_callback: Optional[HandleCallback],
-                 final_success_callback: Optional[HandleCallback],
-                 kwargs: Dict[str, Any],
-                 ):
-        """
-        Executes the validation contained within the chain.
-
-        :param operand: The operand to be validated
-        :param final_exception_callback: The final callback to be called into when traversing the exception branch
-        :param final_success_callback: The final callback to be called into when successful at validating
-        :param kwargs: The kwargs, in dictionary form, that were captured when the user called
-        """
-        self.run_validation(operand, final_exception_callback, final_success_callback, kwargs)
-
-
-class ListNode(AbstractValidator, LogicNode):
-    """
-
-    """
-
-    attributes_cache = get_cache("ListNodeAttr")
-    instance_cache = get_cache("ListNodeInstance")
-    next_node: 'ListNode'
-
-
+    hash_value: int = field(repr=False)
 
-
-    ###
-    # Define some important cache manipulation mechanism
-    #
-    # Primarily, we define the method key factory. This will insert
-    # data on the name of a method into the cache hashing mechanism, ensuring
-    # different methods called with the same arguments cannot be confused
-    #
-    # We also define here
-    ##
-
-    def __method_key_factory(self, name: str):
-        """
-        Creates a method key factory, which has the
-        name of the method included in the hashing process
-
-        This should hopefully ensure we do not confuse different
-        methods with the same arguments
-        :param name: The name of the method
-        :return: A method key, bound to the method with that name
-        """
-
-        def method_key(self, *args, **kwargs):
-            args = [self, name, *args]
-            return cachetools.keys.hashkey(*args, **kwargs)
-
-        return method_key
-
-    ##
-    # Define a few magic methods used to manipulate lists
-    #
-    # Since these traverse the list, they are cached in the attributes
-    # cache mechanism.
-    ##
-    @cachetools.cached(attributes_cache, __method_key_factory("hash"))
     def __hash__(self) -> int:
-        if not self.has_next_node:
-            return 1
-        return self.next_node.__detect_length() + 1
-    @cachetools.cached(attributes_cache, __method_key_factory("length"))
-    def __len__(self) -> int:
-        if not self.has_next_node:
-            return 1
-        return self.next_node.__detect_length() + 1
-    @cachetools.cached(attributes_cache, __method_key_factory("iter"))
-    def __iter__(self):
-        yield self
-        if self.has_next_node:
-            for item in self.next_node:
-                yield item
-
-
-
-
-    ###
-    # Define internal linked list walking methods
-    # used to compute various quantities and perform
-    # various tasks.
-    #
-    # We also define the pytree conversions here as well
-    ###
-    @cachetools.cached()
-    def chain_key(self)->Tuple[ConstructorNodeKey, ...]:
-        """
-        Creates a hashable key that completely represents the chain of events that
-        lead to this node being in place. That will include the constructor key used
-        by myself, and by child nodes.
-        :return:
-        """
-        node_key = ConstructorNodeKey.make_key(self, self.__args, self.__kwargs)
-        if not self.has_next_node:
-            return (node_key,)
-        return tuple([node_key, *self.next_node.chain_key()])
-
-
-    @staticmethod
-    def from_chain_key(chain_key: Tuple[ConstructorNodeKey, ...])->'ListNode':
-        chain = list(chain_key)
-        node = None
-        while chain:
-            key = chain.pop()
-            node = key.bind_key(node)
-        return node
-
-    def tree_flatten_with_keys(self):
-        raise NotImplementedError()
-
-    @classmethod
-    def tree_unflatten(cls, aux_data, children):
-        raise NotImplementedError()
-
-    ##
-    # Define the node manipulation methods
-    #
-    # These tend to be very expensive, as they may
-    # involve rebuilding the entire linked list,
-    # and so are cached.
-    ##
-    @cachetools.cached(instance_cache, __method_key_factory("rebind_node"))
-    def rebind_node(self, node: 'ListNode')-> 'ListNode':
-        """
-        Reproduces the values of the current node, but
-        with the link pointing to a different next node
-
-        :param node: The Node to point to
-        :return: A new node pointing to that link instead
-        """
-        # Essentially, this is a factory mechanism that reproduces the
-        # args and kwargs passed in, but with a different node
-        return self.__class__(node,
-                              *self.__args,
-                              **self.__kwargs)
-    @staticmethod
-    def _append(self: 'ListNode', other: 'ListNode'):
-        self_list = self.
-
-    @cachetools.cached(instance_cache, __method_key_factory("append"))
-    def append(self, node: 'ListNode')->'ListNode':
-        """
-        Appends a validation sequence onto another
-        validation sequence
-
-        :param node: The node to append
-        :return: The revised sequence
-        """
-        self_list = self.chain_key
-        if self.chain_representation is None:
-        if not node.has_next_node:
-            # Base case reached, rebind
-            return self.rebind_node(node)
-        # Append to subnode, then rebind.
-        subnode = self.next_node.append(node)
-        return self.rebind_node(subnode)
-
-    @cachetools.cached(instance_cache, __method_key_factory("insert"))
-    def insert(self, index: int, node: 'ListNode')->'ListNode':
-        """
-        Inserts one list into another without breaking
-        the links.
-
-        Returns a new instance
-        :param index: The index to set to
-        :param node: The node to insert there
-        :return: The new list node
-        """
-        if index == 0:
-            # Base case, append myself onto inserted chain
-            return node.append(self)
-        # Recurrent descent case. Travel to link, insert
-        # there, rebuild with new case
-        subnode = self.next_node.insert(index - 1, node)
-        return self.rebind_node(subnode)
-
-    def __init__(self,
-                 next_node: 'ListNode',
-                 *args,
-                 **kwargs
-                 ):
-
-        # Define and initialize the logic of the LogicNode
-        #
-        # Also sets up the linked list for the first time
-        subclass_bindings = SubclassMethodsInterface(self)
-        constructor_node = ConstructorNodeKey(self.__class_)
-        super().__init__(subclass_bindings, next_node)
-
-        # Store away arguments and keyword arguments
-        # These can be used in factory methods to create
-        # new instances pointing to different nodes
-        self.__args = args
-        self.__kwargs = kwargs
-
-        # Store away something else
-
-    # Define properties and related phenomenon properties
-    @property
-    def has_next_node(self) -> bool:
-        return self.next_node is not None
-
-class ValdationExecuter:
-    """
-    This contains the validator linked list
-    and callbacks. It is the actual interface
-    used to call into the validation logic.
-    """
-    cache = get_cache("LogicNodesCache")
-    @classmethod
-    def build_list(cls, nodes: List[SubclassMethodsInterface]):
-        """
-        Builds the validator nodes, using the cache
-        to shortcut the process wherever possible.
-
-        :param nodes: The nodes list to build
-        :return: The validator linked list logic.
-        """
-
-        if len(nodes) == 1:
-            # If the passed node has been observed before, the cache
-            # should just fetch it.
-            #
-            # this is the base case
-            return cls.cache.fetch(LogicNode, nodes[0], None)
-
-        # Fetch the subnode, and then build the current node.
-        subnode = cls.cache.fetch(cls.build_list, nodes[1:])
-        return cls.cache.fetch(LogicNode, subnode)
-
-    def __init__(self,
-                nodes: List['Validator'],
-                ):
-        """
-        Initialization should consist of the nodes list,
-        which is a list of SubclassFeaturesNodes, and
-        the existing
-        :param nodes: The list of nodes to execute during validation
-        :param final_exception_callback: The final callback to execute when failing
-        :param final_success_callback: The final callback to execute when success.
-        """
-
-        # Get context elements from global state.
-        final_exception_callback = get_exception_callback()
-        final_success_callback = get_success_callback()
-
-        # Create default callbacks if required
-        if final_exception_callback is None:
-            final_exception_callback = lambda exception, **kwargs : None
-        if final_success_callback is None:
-            final_success_callback = lambda operand, **kwargs : None
-
-        # Convert validators into subclass nodes
-
-        nodes = [SubclassMethodsInterface(item) for item in nodes]
-
-        # Store
-        self.validator_function = self.build_list(nodes)
-        self.final_exception_callback = final_exception_callback
-        self.final_success_callback = final_success_callback
-    def __call__(self,
-                 operand: Operand,
-                 **kwargs
-                 ):
-        """
-        Executes validation.
-
-        :param operand: The operand to validate
-        :param kwargs: The kwargs conditioning the validation.
-        """
-        self.validator_function(operand,
-                        self.final_exception_callback,
-                        self.final_success_callback,
-                        kwargs)
-
-class Validator(AbstractValidator):
-
-    ###
-    # Two important methods are lazily initialized
-    # if needed
-    ###
-    cache = get_cache("Validator")
-    @property
-    def validate(self):
-        if self._validate is None:
-            self.__post_init_hook__()
-        return self._validate
-
-    @property
-    def links(self)->List['Validator']:
-        if self._links is None:
-            self.__post_init_hook__()
-        return self._links
-
-    def __post_init_hook__(self, nodes: Optional['Validator'] = None):
-        if nodes is None:
-            nodes = [self]
-        self._links = nodes
-        self._validate = ValdationExecuter(nodes)
-
-    def rebind_links(self,
-               nodes: List['Validator']
-               )->'Validator':
-        instance = self.cache.fetch(self.constructor, *self.__args, **self.__kwargs)
-        instance.__post_init_hook__(nodes)
-        return instance
-
-    def append(self, validator: 'Validator')->'Validator':
-        links = self.links + validator.links
-        instance = self.rebind(links)
-        return instance
-    @classmethod
-    def constructor(cls, *args, **kwargs):
-        instance = cls(*args, **kwargs)
-        instance.__args = args
-        instance.__kwargs = kwargs
-        return instance
-    def __new__(cls, *args, **kwargs):
-        instance = super().__new__(cls)
-
-        instance = cls.cache.fetch(cls.constructor, *args, **kwargs)
-
-        instance.__args = args
-        return instance
-
-    def __init__(self, next_validator: Optional['Validator']):
-    def __init__(self):
-        self.__link_setup_run: bool = False
-        self._links: List['Validator'] = [self]
-        self._validate: Optional[ValdationExecuter] = None
-
-    def append(self, validator: 'Validator')->'Validator':
-        links = self._links
-        links = links + validator.links
-        instance = type(self)(*self.__args, **self.__kwargs)
+        return self.hash_value
 
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, ValidatorNodeSpec):
+            return NotImplemented
+        return (self.hash_value == other.hash_value
+                and self.type is other.type
+                and self.params_flat == other.params_flat
+                and self.params_types == other.params_types
+                and self.params_treedef == other.params_treedef)
 
 
 # Begin main definition
+
 class Validator(ABC):
     """
     Abstract base class for creating validators. Validators can be used to perform
@@ -1251,64 +438,83 @@ class Validator(ABC):
     #
     # Instead, new objects end up being returned.
 
-    next_validator: 'Validator'
+    _nodespec: ValidatorNodeSpec
+    _key: Chain
+    _flattened: Tuple[Tuple[()], Chain]
+    _next_validator: Optional['Validator']
     hash_value: int
-    __args: List[Any]
-    __kwargs: Dict[str, Any]
 
-    __exception_callback: Callable = lambda exception, **kwargs: None
-    __success_callback: Callable = lambda operand: operand
+    # Set once the user's __init__ has run, so it is never run again
+    _initialized: bool = False
+
+    # Set to True by validators whose predicate always passes, and which
+    # only exist to handle exceptions or gate the chain. Optimize uses it.
+    passthrough: bool = False
+
+    # The relative cost of evaluating the predicate, in arbitrary units, and
+    # whether the node may be moved past its neighbours. Reorder_by_cost uses these.
+    cost: float = 1.0
+    reorderable: bool = False
+
+    @property
+    def next_validator(self) -> Optional['Validator']:
+        # The chain itself is the flat tuple of node specs. The node
+        # object for the tail is only built the first time it is
+        # asked for, and then kept.
+        if self._next_validator is None and self._key.length > 1:
+            self._next_validator = Validator._from_key(self._key[1:])
+        return self._next_validator
 
     @property
     def has_next(self) -> bool:
-        return self.next_validator is not None
+        return self._key.length > 1
 
     @classmethod
     def set_global_exception_callback(cls,
-                                      callback: Callable[[Exception, ...], None]):
+                                      callback: Optional[Callable[[Exception, ...], None]]):
         """
         Sets a globally active exception callback connected to
-        every validator.
+        every validator. This is the same setting as state's
+        set_exception_callback, and ExceptionCallbackContextManager
+        overrides it within a context.
 
-        This callback will be provided
         :param callback: A callable that accepts an exception, and any number
-                         of kwargs.
+                         of kwargs. Or None, for no callback.
         """
-        cls.__exception_callback = callback
+        set_exception_callback(callback)
 
     def get_root_exception_callback(self) -> Callable[[Exception, ...], None]:
         """
-        Gets the root, or final, exception callback. If
-        None, we make a lambda to accept the call
+        Gets the root, or final, exception callback, as currently
+        set in state. If None, we make a lambda to accept the call
         :return:
         """
-        if self.__success_callback is not None:
-            return self.__success_callback
-        return lambda exceptions, **kwargs: None
+        callback = get_exception_callback()
+        if callback is not None:
+            return callback
+        return lambda exception, **kwargs: None
 
     @classmethod
     def set_global_success_callback(cls,
                                     callback: Optional[Callable[[Any, ...], None]]):
         """
-        Sets up a globally active exception callback for every validator
-        in existance. Conceptually, this goes off anytime no validaton fails
+        Sets up a globally active success callback for every validator
+        in existance. Conceptually, this goes off anytime no validaton fails.
+        This is the same setting as state's set_success_callback.
 
         :param callback: The callback, which should accept an operand and any
-               number of kwargs
+               number of kwargs. Or None, for no callback.
         """
-        cls.__success_callback = callback
+        set_success_callback(callback)
 
-    def get_success_callback(self) -> Callable[[Any, ...], None]:
+    def get_success_callback(self) -> Optional[Callable[[Any, ...], None]]:
         """
-        Gets the success callback, and returns a no-op lambda
-        if not yet set
+        Gets the success callback, as currently set in state.
 
         :return: The success callback, which will accept an operand
-        and any number of kwargs
+        and any number of kwargs. None if not set.
         """
-        if self.__success_callback is not None:
-            return self.__success_callback
-        return lambda operand, **kwargs: None
+        return get_success_callback()
 
     #################
     # Define initialization routines.
@@ -1330,11 +536,11 @@ class Validator(ABC):
     #
     ###################
     def _get_constructor_parameters(self) -> Tuple[List[Any], Dict[str, Any]]:
-        return self.__args, self.__kwargs
+        return self._nodespec.args, self._nodespec.kwargs
 
     @classmethod
     def _get_unique_class_identifier(cls) -> str:
-        return f'{cls.__module__}.{cls.__name__}'
+        return f'{cls.__module__}.{cls.__qualname__}'
 
     @classmethod
     def _create_hash(cls,
@@ -1377,51 +583,106 @@ class Validator(ABC):
         # subclass as it is brought online
         #
         # We must patch init anytime we subclass it to transparently accept and remove
-        # "_next_validator" from the parameters that will be reaching the
-        # user's __function__. The value '_next_validator' is sometimes passed
-        # along when building a class by methods within this parent related to maintaining
-        # the linked list. It is consumed in __new__. However, user __init__ functions will
-        #  never need to know about that, and so we remove it before they see it.
+        # "_next_validator" and "_chain" from the parameters that will be reaching the
+        # user's __function__. These are sometimes passed along when building a class by
+        # methods within this parent related to maintaining the chain. They are consumed
+        # in __new__. However, user __init__ functions will never need to know about that,
+        # and so we remove them before they see it.
         #
         # We also register the subclass with tree util.
 
+        #
+        # The instance is fully initialized inside __new__, before it is interned.
+        # Python then calls __init__ again on whatever __new__ returned, including
+        # on every cache hit, and those calls are skipped.
+
         original_init = cls.__init__
 
         def __init__(self, *args, **kwargs):
-            if "_next_validator" in kwargs:
-                kwargs.pop("_next_validator")
+            if self._initialized:
+                return
+            kwargs.pop("_next_validator", None)
+            kwargs.pop("_chain", None)
             original_init(self, *args, **kwargs)
 
         cls.__init__ = __init__
         jax.tree_util.register_pytree_node_class(cls)
 
-    def __new__(cls, *args, _next_validator: Optional['Validator'] = None, **kwargs, ):
-
-        # Process the incoming arguments. This means stripping
-        # kwargs of _next_validator, which is not something the implementer
-        # should see, quantify the tree structure of the incoming constructor
-        # arguments so we can setup a factory, and making a cache id by hashing
-        # the above.
-
+    @classmethod
+    def _make_nodespec(cls, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> ValidatorNodeSpec:
+        """
+        Quantifies the tree structure of the constructor arguments and
+        builds the node spec for them. The args and kwargs stored on the
+        spec are rebuilt from the leaves, so later changes to the caller's
+        containers cannot change clone behavior.
+        """
         constructor_parameter_leaves, constructor_treedef = tree_util.tree_flatten((args, kwargs))
-        next_validator: Optional[Validator]
-        cache_id = cls._create_hash(constructor_treedef, constructor_parameter_leaves, _next_validator)
+        constructor_parameter_types = tuple(type(leaf) for leaf in constructor_parameter_leaves)
+        hash_value = cls._create_hash(constructor_treedef, constructor_parameter_leaves, None)
+        hash_value = hash((hash_value, constructor_parameter_types))
+        (args, kwargs) = tree_util.tree_unflatten(constructor_treedef, constructor_parameter_leaves)
+        return ValidatorNodeSpec(cls,
+                                 args,
+                                 kwargs,
+                                 tuple(constructor_parameter_leaves),
+                                 constructor_parameter_types,
+                                 constructor_treedef,
+                                 hash_value)
+
+    @staticmethod
+    def _from_key(key: Chain) -> 'Validator':
+        """
+        Builds, or fetches from the interning table, the validator
+        whose chain is exactly the given chain of node specs.
+        """
+        head = key.first
+        return head.type(*head.args,
+                         _chain=key,
+                         **head.kwargs)
+
+    def __new__(cls,
+                *args,
+                _next_validator: Optional['Validator'] = None,
+                _chain: Optional[Chain] = None,
+                **kwargs):
+
+        # Process the incoming arguments. This means making the node spec
+        # for this node, and placing it in front of the chain it links to.
+        # When a chain is being rebuilt, the whole chain is passed in
+        # directly instead, and the args are those of its first node.
+
+        interning_table = get_interning_table()
+        link = None
+        if _chain is None:
+            nodespec = cls._make_nodespec(args, kwargs)
+
+            # Consing a chain is the expensive part of a lookup. The link table
+            # is probed first, on the node spec and the identity of the next
+            # validator. An entry only lives as long as its validator, which
+            # holds on to the next validator, so the id cannot have been reused.
+            # A bounded interning table may have forgotten the instance though,
+            # in which case it must not be handed out again.
+            link = (nodespec, id(_next_validator))
+            instance = get_link_table().get(link)
+            if instance is not None and (interning_table.maxsize is None
+                                         or interning_table.get(instance._key) is instance):
+                return instance
+            tail = _next_validator._key if _next_validator is not None else None
+            _chain = Chain.cons(nodespec, tail)
 
         # We either get an already existing instance that is constructed
         # with the provided arguments.
         #
-        # Or we setup a new instance, and cache it
+        # Or we setup a new instance, and intern it. The lookup compares
+        # the chains structurally, so a hash collision cannot return the
+        # wrong instance.
 
-        if cache_id in _validator_cache:
-            return _validator_cache[cache_id]
+        instance = interning_table.get(_chain)
+        if instance is not None:
+            return cls._link(link, instance, _next_validator)
 
         # This means a cache miss
-
-        # Make a sanitized version of the input arguments. These
-        # can no longer have side effects that will change clone
-        # behavior
-        (args, kwargs) = tree_util.tree_unflatten(constructor_treedef, constructor_parameter_leaves)
-
+        #
         # Create the instance
         #
         # We specify the level in the inheritance
@@ -1431,16 +692,33 @@ class Validator(ABC):
         instance = super(Validator, cls).__new__(cls)
 
         # Attach fields
-        instance.next_validator = _next_validator
-        instance.__args = args
-        instance.__kwargs = kwargs
-        instance.hash_value = cache_id
-
-        # Cache it
-        _validator_cache[cache_id] = instance
+        instance._nodespec = _chain.first
+        instance._key = _chain
+        instance._flattened = ((), _chain)
+        instance._next_validator = _next_validator
+        instance.hash_value = _chain.hash_value
+
+        # Run the user's init, through the patched __init__ (see __init_subclass__),
+        # which strips out the chain features. This happens before the instance
+        # is interned, so no other thread can ever see it half built.
+        cls.__init__(instance, *args, **kwargs)
+        instance._initialized = True
+
+        # Intern it. Another thread may have interned the same chain
+        # in the meantime, in which case its instance wins, and this
+        # one is discarded.
+        instance = interning_table.setdefault(_chain, instance)
+        return cls._link(link, instance, _next_validator)
 
-        # Return it. The patched __init__ (see __init_subclass__) will strip out the
-        # feature _next_validator, then the user's init will take over.
+    @staticmethod
+    def _link(link: Optional[Tuple['ValidatorNodeSpec', int]],
+              instance: 'Validator',
+              next_validator: Optional['Validator']) -> 'Validator':
+        # Records instance in the link table. Only an instance holding on
+        # to the very next validator the link was made from may be recorded,
+        # since otherwise that validator could die, and its id be reused.
+        if link is not None and instance._next_validator is next_validator:
+            get_link_table().setdefault(link, instance)
         return instance
 
     #################
@@ -1460,123 +738,329 @@ class Validator(ABC):
 
         :return: A constructor spec
         """
-        args, kwargs = self._get_constructor_parameters()
-        return ValidatorNodeSpec(self.__class__,
-                                 args,
-                                 kwargs)
+        return self._nodespec
 
     def _get_nodespecs(self) -> List[ValidatorNodeSpec]:
         """
-        Recursively executes a nodespec search
-        and return a list in the order they
-        were found
-
-        NOTE: This will reverse the node order, but
-        this is okay as we want that anyhow when
-        we rebuild the nodes.
+        Returns the node specs of the chain, in
+        chain order, starting from this node.
         """
-        if self.next_validator is None:
-            return [self.make_node_spec()]
-        nodespec = self.next_validator._get_nodespecs()
-        nodespec.append(self.make_node_spec())
-        return nodespec
+        return list(self._key)
 
     def tree_flatten(self) -> Tuple[Any, Any]:
         """
         A validator list is defined in terms of the nodes that it has and
-        the arguments that its constructors will receive
+        the arguments that its constructors will receive. Since validators
+        are immutable, this is computed once at construction. The aux data
+        is the chain of node specs, whose hash is precomputed, so jax can
+        compare treedefs cheaply.
 
         :return: The flattened keys representing what was on
                  the node
         :return: The auxilary tree data, used to reconstruct
                  the node
         """
-        return (), tuple(self._get_nodespecs())
+        return self._flattened
 
     @classmethod
     def tree_unflatten(cls,
-                       aux_data: Tuple[ValidatorNodeSpec, ...],
+                       aux_data: Chain,
                        unused: Any
                        ) -> 'Validator':
         """
         Unflattens and reconstructs the original validator.
 
-        Since the aux data will contain the nodes in reversed
-        order, we just create and insert. This is efficient for
-        a linked list.
+        The aux data is the key the validator is interned under,
+        so this is normally a single lookup. The chain is only
+        rebuilt if the validator has since been garbage collected.
 
         :param aux_data: The auxilary data
         :param unused: Completely unused here
         :return: The original validator
         """
-
-        current_node = None
-        for nodespec in aux_data:
-            current_node = nodespec.type(
-                *nodespec.args,
-                _next_validator=current_node,
-                **nodespec.kwargs
-            )
-        return current_node
+        instance = get_interning_table().get(aux_data)
+        if instance is not None:
+            return instance
+        return Validator._from_key(aux_data)
 
     ###
     # Define linked list management mechanism. This includes magic
     # compositional shortcuts
     ###
 
-    def fetch(self, item: int)->'Validator':
+    def __len__(self) -> int:
+        return self._key.length
+
+    # Every edit below returns an interned chain, and is memoized
+    # in the edit cache. Reapplying an edit, such as capping many
+    # chains with the same terminal every step, costs one lookup.
+    # The cache is weak, and its keys only weakly reference the
+    # validators in them, so it does not keep unused chains alive.
+
+    edit_cache = get_cache("ValidatorEdits", weak=True)
+
+    def _normalize_index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Validator index out of range for chain of length {len(self)}")
+        return index
+
+    def _normalize_split(self, index: int) -> int:
+        # Splits must leave a node on both sides, as there is no empty validator
+        if index < 0:
+            index += len(self)
+        if not 0 < index < len(self):
+            raise IndexError(f"Cannot split a chain of length {len(self)} at {index}. "
+                             f"Both sides must keep at least one node")
+        return index
+
+    @cachetools.cached(edit_cache, key=make_method_key("fetch"), lock=edit_cache.lock)
+    def fetch(self, item: int) -> 'Validator':
         """
         Fetch a particular validator node if it is
-        available
+        available. The node is returned on its own,
+        without the rest of the chain behind it.
 
-        :param item:
-        :return:
+        :param item: The index of the node. Negative indices count from the end.
+        :return: The validator node at that position
+        :raises IndexError: If there is no such node
+        """
+        return Validator._from_key(Chain.from_items([self._key[self._normalize_index(item)]]))
+
+    @cachetools.cached(edit_cache, key=make_method_key("slice"), lock=edit_cache.lock)
+    def _slice(self, start: int, stop: int) -> 'Validator':
+        if start >= stop:
+            raise IndexError(f"Slice [{start}:{stop}] of a chain of length {len(self)} would be empty")
+        return Validator._from_key(self._key.slice(start, stop))
+
+    def __getitem__(self, item: Union[int, slice]) -> 'Validator':
+        """
+        Indexing fetches a single node. Slicing returns
+        the chain of the nodes in the slice. Slices
+        with a step are not supported.
+
+        :param item: An index, or a slice
+        :return: The validator node, or chain
         """
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise ValueError("Validator chains can only be sliced with a step of 1")
+            return self._slice(start, stop)
+        return self.fetch(item)
+
+    @cachetools.cached(edit_cache, key=make_method_key("append"), lock=edit_cache.lock)
     def append(self, validator: 'Validator') -> 'Validator':
         """
         Appends the validator provided onto the end of
         the linked list, and returns a totally independent
         list that does the same job.
 
-        :param validator: The validator to append
-        :return: A new validator node, with the new validator
-                 appended to the end of the list.
+        :param validator: The validator to append
+        :return: A new validator node, with the new validator
+                 appended to the end of the list.
+        """
+        return Validator._from_key(self._key.concat(validator._key))
+
+    @cachetools.cached(edit_cache, key=make_method_key("insert"), lock=edit_cache.lock)
+    def insert(self, index: int, validator: 'Validator') -> 'Validator':
+        """
+        Inserts a validator, or a whole chain, so that it
+        starts at the given index.
+
+        :param index: Where to insert. An index equal to the length appends.
+        :param validator: The validator to insert
+        :return: The new chain
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index <= len(self):
+            raise IndexError(f"Cannot insert at {index} in a chain of length {len(self)}")
+        return Validator._from_key(self._key.insert(index, validator._key))
+
+    @cachetools.cached(edit_cache, key=make_method_key("remove"), lock=edit_cache.lock)
+    def remove(self, index: int) -> 'Validator':
+        """
+        Removes the node at the given index.
+
+        :param index: The node to remove
+        :return: The chain without that node
+        :raises ValueError: If this would leave an empty chain
+        """
+        index = self._normalize_index(index)
+        if len(self) == 1:
+            raise ValueError("Cannot remove the only node of a chain")
+        return Validator._from_key(self._key.remove(index))
+
+    @cachetools.cached(edit_cache, key=make_method_key("replace"), lock=edit_cache.lock)
+    def replace(self, index: int, validator: 'Validator') -> 'Validator':
+        """
+        Replaces the node at the given index with a validator. If
+        that validator is a chain, all of its nodes take the place
+        of the one node.
+
+        :param index: The node to replace
+        :param validator: What to put there instead
+        :return: The new chain
+        """
+        index = self._normalize_index(index)
+        left, right = self._key.split(index)
+        _, right = right.split(1)
+        chain = validator._key if left is None else left.concat(validator._key)
+        return Validator._from_key(chain.concat(right))
+
+    def split(self, index: int) -> Tuple['Validator', 'Validator']:
+        """
+        Splits the chain in two, before the given index.
+
+        :param index: Where the second chain starts
+        :return: The chain up to the index, and the chain from it on
+        """
+        index = self._normalize_split(index)
+        return self._slice(0, index), self._slice(index, len(self))
+
+    def without_head(self) -> 'Validator':
+        """
+        :return: The chain without its first node
+        """
+        if len(self) == 1:
+            raise ValueError("Cannot remove the only node of a chain")
+        return self._slice(1, len(self))
+
+    def without_tail(self) -> 'Validator':
+        """
+        :return: The chain without its last node
+        """
+        if len(self) == 1:
+            raise ValueError("Cannot remove the only node of a chain")
+        return self._slice(0, len(self) - 1)
+
+    def walk(self, f: Callable) -> Any:
+        """
+        Walks over the list, applying
+        some function to the node
+        and returning the result
+        """
+        node = self
+        while node is not None:
+            yield f(node)
+            node = node.next_validator
+
+    def __and__(self, other: 'Validator') -> 'Validator':
+        """
+        Supports chaining this validator with another validator using the `&` operator.
+        This method adds the `other` validator to the end of the current chain.
+
+        Example:
+            validator = PositiveValidator() & EvenValidator()
+            # Now `validator` will first check if the operand is positive, and then if it is even.
+
+        :param other: Another instance of Validator to be chained.
+        :return: The current instance with the `other` validator added to the end of the chain.
+        """
+        return self.append(other)
+
+    def __or__(self, other: 'Validator') -> 'Validator':
+        """
+        Supports branching between this validator and another using the `|` operator.
+        The result passes if either side passes. Longer runs of `|` collapse
+        into a single combinator, rather than nesting.
+
+        Example:
+            validator = IsDtype("int32") | IsDtype("float32")
+            # Now `validator` passes if the operand is either an int32 or a float32.
+
+        :param other: Another instance of Validator to branch with.
+        :return: A new single node validator, evaluating both branches.
+        """
+        from .combinators import NOf
+        if isinstance(self, NOf) and len(self) == 1 and self.required == 1:
+            return Validator.any_of(*self.branches, other)
+        return Validator.any_of(self, other)
+
+    @staticmethod
+    def n_of(required: int, *validators: 'Validator') -> 'Validator':
+        """
+        Combines several validator chains into one node, which passes
+        when at least 'required' of them pass. The branches are all
+        evaluated together, as one stacked boolean reduction.
+
+        :param required: How many of the branches must pass
+        :param validators: The heads of the branch chains
+        :return: A new single node validator
+        """
+        from .combinators import NOf
+        return NOf(required, *validators)
+
+    @staticmethod
+    def any_of(*validators: 'Validator') -> 'Validator':
+        """
+        Combines several validator chains into one node, which
+        passes when any of them pass.
+
+        :param validators: The heads of the branch chains
+        :return: A new single node validator
+        """
+        return Validator.n_of(1, *validators)
+
+    @staticmethod
+    def all_of(*validators: 'Validator') -> 'Validator':
+        """
+        Combines several validator chains into one node, which passes
+        when all of them pass. Unlike chaining with `&`, every branch
+        is evaluated, and every failing branch is reported.
+
+        :param validators: The heads of the branch chains
+        :return: A new single node validator
+        """
+        return Validator.n_of(len(validators), *validators)
+
+    def optimize(self) -> Tuple['Validator', 'OptimizationReport']:
         """
-        args, kwargs = self._get_constructor_parameters()
-        next_validator = self.next_validator
-        if next_validator is not None:
-            next_validator = next_validator.append(validator)
-        else:
-            next_validator = validator
+        Canonicalizes the chain into an equivalent, shorter one. This
+        matters for programmatically assembled chains, where the same
+        checks tend to show up more than once.
 
-        return self.__class__(*args,
-                              _next_validator=next_validator,
-                              **kwargs)
+        - Nodes identical to an earlier node are removed
+        - Nodes subsumed by a stricter node, as declared through subsumes, are removed
+        - Passthroughs with no effect are removed, and runs of the rest are merged into one node
 
-    def walk(self, f: Callable) -> Any:
+        Nodes which handle exceptions are never removed, and subsumed
+        nodes are not moved past anything that could stop the chain.
+
+        :return: The optimized chain, and an OptimizationReport of what was removed
         """
-        Walks over the list, applying
-        some function to the node
-        and returning the result
+        from .optimizer import optimize
+        return optimize(self)
+
+    def profile(self, operand: Any, repeats: int = 5, **kwargs) -> Tuple[float, ...]:
         """
-        yield f(self)
-        if self.has_next:
-            for item in self.next_validator.walk(f):
-                yield item
+        Measures the real cost of each node's predicate against an example
+        operand. Each predicate is jit compiled on its own, and then timed.
+        The result may be handed to reorder_by_cost.
 
-    def __and__(self, other: 'Validator') -> 'Validator':
+        :param operand: An example operand, representative of what will be validated
+        :param repeats: How many times to time each predicate. The fastest run is kept
+        :param kwargs: The kwargs conditioning the validation
+        :return: The seconds taken by each node's predicate, in chain order
         """
-        Supports chaining this validator with another validator using the `&` operator.
-        This method adds the `other` validator to the end of the current chain.
+        from .optimizer import profile
+        return profile(self, operand, repeats, **kwargs)
 
-        Example:
-            validator = PositiveValidator() & EvenValidator()
-            # Now `validator` will first check if the operand is positive, and then if it is even.
+    def reorder_by_cost(self, costs: Optional[Tuple[float, ...]] = None) -> 'Validator':
+        """
+        Moves the cheapest checks to the front, so failing operands are caught
+        before the expensive reductions run. Only runs of consecutive nodes that
+        declare reorderable are sorted, and nodes that handle exceptions or
+        gate the chain never move, so handler order stays the same.
 
-        :param other: Another instance of Validator to be chained.
-        :return: The current instance with the `other` validator added to the end of the chain.
+        :param costs: Optionally, one cost per node, such as from profile.
+                      Otherwise, the cost each node declares is used.
+        :return: The reordered chain
         """
-        return self.append(other)
+        from .optimizer import reorder_by_cost
+        return reorder_by_cost(self, costs)
 
     ##########################
     # Define user overrides and methods access
@@ -1586,7 +1070,38 @@ class Validator(ABC):
     #
     ########################
 
+    def chain_predicate(self, **kwargs) -> bool:
+        """
+        Decides, based on the kwargs, whether validation should continue
+        on to the next validator in the chain. By default, we always continue.
+
+        :param kwargs: The kwargs conditioning the validation
+        :return: A bool. True means continue down the chain
+        """
+        return True
+
+    def subsumes(self, other: 'Validator') -> bool:
+        """
+        Optionally overridden to declare that this validator is stricter
+        than another. Return True only if, for every operand and kwargs,
+        passing this validator means 'other' would pass too. For example, a
+        float32 dtype check subsumes a floating dtype check. By default,
+        nothing is subsumed.
+
+        This is used by optimize, to remove redundant checks.
 
+        :param other: Another single node validator
+        :return: A bool. True means 'other' is redundant next to this one
+        """
+        return False
+
+    @staticmethod
+    def _is_bool_like(outcome: Any) -> bool:
+        # Predicates may return a python bool, or a scalar bool
+        # array when they depend on traced values.
+        if isinstance(outcome, (bool, np.bool_)):
+            return True
+        return isinstance(outcome, jax.Array) and outcome.shape == () and outcome.dtype == jnp.bool_
 
     def _execute_chain_predicate(self, **kwargs) -> bool:
         # A helper function that sanity checks
@@ -1594,8 +1109,8 @@ class Validator(ABC):
         try:
             outcome = self.chain_predicate(**kwargs)
         except Exception as err:
-            raise create_subclass_code_did_not_run_exception(self, 'chain_predicate')
-        if not isinstance(outcome, bool):
+            raise create_subclass_code_did_not_run_exception(self, 'chain_predicate') from err
+        if not self._is_bool_like(outcome):
             raise create_subclass_code_returned_wrong_type_exception(self,
                                                                      code_feature='chain_predicate',
                                                                      required='bool',
@@ -1621,7 +1136,7 @@ class Validator(ABC):
             outcome = self.predicate(operand, **kwargs)
         except Exception as err:
             raise create_subclass_code_did_not_run_exception(self, code_feature='predicate') from err
-        if not isinstance(outcome, bool):
+        if not self._is_bool_like(outcome):
             raise create_subclass_code_returned_wrong_type_exception(self,
                                                                      code_feature='predicate',
                                                                      required='bool',
@@ -1637,7 +1152,8 @@ class Validator(ABC):
         This method should return an exception to be raised and otherwise handled. It
         will only be triggered when the predicate fails.
 
-        :param operand: The operand to be validated.
+        :param operand: The operand to be validated. If summarize is overridden, this
+                        is instead the summary it produced.
         :param kwargs: Additional keyword arguments that may be needed for validation.
                        These arguments are accessible to all validators in the chain.
         :return: A bool or bool array, and an exception to raise if failing
@@ -1658,6 +1174,36 @@ class Validator(ABC):
                                                                      observed=exception)
         return exception
 
+    def summarize(self, operand: Any, **kwargs) -> Any:
+        """
+        Optionally overridden by subclasses. Produces a small, on device summary
+        of why the operand failed, such as a ViolationSummary. When
+        overridden, only the summary is sent to the host on failure, and
+        it is what create_exception receives in place of the operand.
+
+        This keeps failure handling cheap no matter how large the operand is.
+        By default, the whole operand is the summary.
+
+        :param operand: The operand which failed validation
+        :param kwargs: The kwargs conditioning the validation
+        :return: A pytree of small arrays
+        """
+        return operand
+
+    @classmethod
+    def _has_summary(cls) -> bool:
+        return cls.summarize is not Validator.summarize
+
+    def _execute_summarize(self, operand: Any, **kwargs) -> Any:
+        # Get the failure payload that should be sent to the host, and
+        # eventually to create exception, while sanity checking the user's summary.
+        if not self._has_summary():
+            return operand
+        try:
+            return self.summarize(operand, **kwargs)
+        except Exception as err:
+            raise create_subclass_code_did_not_run_exception(self, code_feature='summarize') from err
+
     def handle_exception(self, exception: Exception, **kwargs) -> Exception:
         """
         Handles an exception detected from further down in the
@@ -1712,124 +1258,165 @@ class Validator(ABC):
     # which is suppose to handle the error condition
     ##########
 
+    def _report_failure(self,
+                        index: int,
+                        payload: Any,
+                        **kwargs: Any):
+        # Creates the exception of the node at index, then walks it back
+        # up through the handler of every node from there to this one. The
+        # final callback is read from state now, rather than while tracing,
+        # so a context manager entered around a jitted call is respected.
+        path = [self]
+        for _ in range(index):
+            path.append(path[-1].next_validator)
+        exception = path[-1]._execute_create_exception(payload, **kwargs)
+        for node in reversed(path):
+            exception = node._execute_handle(exception, **kwargs)
+        self.get_root_exception_callback()(exception, **kwargs)
+
+    def _case_failed(self,
+                     index: int,
+                     payload: Any,
+                     **kwargs: Any):
+        # Only the failure payload, which is the summary if one
+        # was declared, is sent to the host.
+        jax.debug.callback(lambda payload, **kwargs: self._report_failure(index, payload, **kwargs),
+                           payload,
+                           **kwargs)
+
+    def _static_case_failed(self,
+                            index: int,
+                            payload: Any,
+                            **kwargs: Any):
+        # When the predicate was static, failure is already known while
+        # tracing. The exception chain is then run immediately, rather than
+        # deferred into a debug callback, so a raising handler raises at trace time.
+        # Within a traced branch, it is only known to fail if the branch runs.
+        if _within_traced_branch.get():
+            return self._case_failed(index, payload, **kwargs)
+        self._report_failure(index, payload, **kwargs)
+
     @staticmethod
-    def _base_case_passed(
-            exception_callback: ExceptionCallbackAlias,
-            success_callback: Callable[[Any, ...], None],
-            operand: Any,
-            **kwargs: Any
-    ) -> Any:
-        success_callback(operand, **kwargs)
-        return operand
+    def _report_success(operand: Any, **kwargs: Any):
+        # Runs on the host, and so reads the success callback from state
+        # as it is when the call runs
+        success_callback = get_success_callback()
+        if success_callback is not None:
+            success_callback(operand, **kwargs)
 
-    def _execute_exception_callback(self,
-                                    exception_callback: ExceptionCallbackAlias,
-                                    operand: Any,
-                                    **kwargs: Any
-                                    ) -> Any:
-        jax.debug.print("failed: {operand}", operand=operand)
-        exception = self._execute_create_exception(operand, **kwargs)
-        exception_callback(exception, **kwargs)
-
-    def _base_case_failed(self,
-                          exception_callback: ExceptionCallbackAlias,
-                          success_callback: Callable[[Any, ...], None],
-                          operand: Any,
-                          **kwargs: Any
-                          ) -> Any:
-
-        jax.debug.callback(self._execute_exception_callback,
-                           exception_callback,
-                           operand,
-                           **kwargs)
-        return operand
+    @staticmethod
+    def _case_passed(operand: Any, **kwargs: Any):
+        # Like a failure, a success is only known once the call runs, so the
+        # success callback is deferred to the host.
+        jax.debug.callback(Validator._report_success, operand, **kwargs)
+
+    @staticmethod
+    def _traced_cond(predicate: Any, true_branch: Callable, false_branch: Callable, operand: Any) -> Any:
+        # Runs jax.lax.cond, marking its branches as traced branches while they are traced
+        token = _within_traced_branch.set(True)
+        try:
+            return jax.lax.cond(predicate, true_branch, false_branch, operand)
+        finally:
+            _within_traced_branch.reset(token)
+
+    @classmethod
+    def _run_if(cls, condition: Any, branch: Callable, operand: Any):
+        # Runs branch for its side effects, when condition holds. A static
+        # condition is resolved while tracing, a traced one through a cond.
+        if not cls._is_static(condition):
+            cls._traced_cond(condition, branch, lambda operand: None, operand)
+        elif condition:
+            branch(operand)
+
+    @staticmethod
+    def _is_static(outcome: Any) -> bool:
+        # A concrete python bool, as returned by shape and dtype
+        # checks, can be resolved without ever tracing a branch
+        return isinstance(outcome, (bool, np.bool_))
+
+    @classmethod
+    def _both(cls, first: Any, second: Any) -> Any:
+        # Logical and, kept static whenever the outcome is known while tracing
+        if cls._is_static(first):
+            return second if first else False
+        if cls._is_static(second):
+            return first if second else False
+        return jnp.logical_and(first, second)
+
+    @classmethod
+    def _negate(cls, outcome: Any) -> Any:
+        return not outcome if cls._is_static(outcome) else jnp.logical_not(outcome)
 
     ########
     #
-    # Several branch statements must be handled. This requires functional
-    # usage of jax.lax.cond, and in places if statements. We need to handle
-    # branches for:
+    # The chain is walked in a loop, one node at a time. Rather than
+    # nest a cond for every node, a flag tracks whether validation is
+    # still running at the current node. It starts out as the static
+    # True, and turns traced at the first traced predicate or chain
+    # predicate. From then on, everything a node does sits behind a
+    # cond on the flag:
     #
-    # 1) Did validation pass? (cond statement)
-    # 2) Did the chain predicate say continue? (cond statement)
-    # 3) Is there a next_validator to check?
+    # 1) Is the node reached? Only then is its predicate evaluated.
+    # 2) Did it fail? Then its exception is created and handled.
+    # 3) Did the chain predicate stop validation, or is this the
+    #    last node? Then validation passed.
     #
+    # These conds follow one another, so long chains neither recurse
+    # nor nest. When the flag and the outcomes are static, as with shape
+    # and dtype checks, no cond is emitted and all of this is resolved
+    # at trace time.
     #####
 
-    def _passed_branch(self,
-                       exception_callback: ExceptionCallbackAlias,
-                       success_callback: Callable[[Any, ...], None],
-                       operand: Any,
-                       **kwargs: Any
-                       ) -> Any:
-        """
-        In the case where self validation passed, we need
-        to decide whether to validate further entries in the
-        chain, if they exist. We also need to eventually reach
-        a base case
-
-        :param callback: The growing callback
-        :param operand: The operand to validate
-        :param kwargs: The kwargs conditioning the validation
-        :return:
-        """
-        # We have reached the passed base case if
-        #
-        # 1): There is no next entry.
-        # 2): There is a next entry, but the chain predicate says not to check it
-        #
-        # Otherwise, we will call into the next validator in the chain,
-        # which we now know exists
-
-        if not self.has_next:
-            return self._base_case_passed(exception_callback,
-                                          success_callback,
-                                          operand,
-                                          **kwargs)
-        chain_predicate = self._execute_chain_predicate(**kwargs)
-        return jax.lax.cond(chain_predicate,
-                            self.next_validator._validate,
-                            self._base_case_passed,
-                            exception_callback,
-                            success_callback,
-                            operand,
-                            **kwargs
-                            )
-
     def _validate(self,
-                  exception_callback: ExceptionCallbackAlias,
-                  success_callback: Callable,
+                  report_success: bool,
                   operand: Any,
                   **kwargs) -> Any:
         """
-        This class performs one portion of validation.
+        Performs validation, starting from this node and walking
+        down the chain.
 
-        This includes updating the callback stack if it exists,
-
-        :param wrapped_exception_callback: The currently existing exception callback
-        :param success_callback: The callback to call on success
+        :param report_success: Whether passing calls have to reach the host,
+                               for the success callback
         :param operand: The operand to check
         :param kwargs: The existing kwargs
         :return: The operand returned
         """
-
-        @jax.tree_util.Partial
-        def exception_callback_wrapper(exception: Exception, **kwargs: Any):
-            # Ensures the node's handle function is called, then
-            # pass the result further up the chain.
-
-            exception = self._execute_handle(exception, **kwargs)
-            exception_callback(exception, **kwargs)
-
-        did_validation_pass = self._execute_predicate(operand, **kwargs)
-        output = jax.lax.cond(did_validation_pass,
-                              self._passed_branch,
-                              self._base_case_failed,
-                              exception_callback_wrapper,
-                              success_callback,
-                              operand,
-                              **kwargs)
-        return output
+        reached = True
+        index = 0
+        node = self
+        while True:
+            if self._is_static(reached):
+                passed = node._execute_predicate(operand, **kwargs)
+            else:
+                passed = self._traced_cond(
+                    reached,
+                    lambda operand: jnp.asarray(node._execute_predicate(operand, **kwargs), dtype=bool),
+                    lambda operand: jnp.asarray(True),
+                    operand)
+
+            if self._is_static(reached) and self._is_static(passed) and not passed:
+                payload = node._execute_summarize(operand, **kwargs)
+                self._static_case_failed(index, payload, **kwargs)
+                return operand
+            self._run_if(self._both(reached, self._negate(passed)),
+                         lambda operand: self._case_failed(index,
+                                                           node._execute_summarize(operand, **kwargs),
+                                                           **kwargs),
+                         operand)
+
+            # Validation passed if the chain ends here, or the chain predicate
+            # says to stop. Without a success callback, there is nothing to do.
+            reached = self._both(reached, passed)
+            stops = True if not node.has_next else self._negate(node._execute_chain_predicate(**kwargs))
+            if report_success:
+                self._run_if(self._both(reached, stops),
+                             lambda operand: self._case_passed(operand, **kwargs),
+                             operand)
+            reached = self._both(reached, self._negate(stops))
+            if self._is_static(reached) and not reached:
+                return operand
+            index += 1
+            node = node.next_validator
 
     def __call__(self, operand: Any, **kwargs) -> Any:
         """
@@ -1845,10 +1432,648 @@ class Validator(ABC):
                        not know it when creating a validator.
         :return: An Exception if validation fails at any point in the chain, None otherwise.
         """
-        final_exception_callback = self.get_root_exception_callback()
-        final_success_callback = self.get_success_callback()
+        if not is_validation_enabled():
+            return operand
+        if get_execution_backend() == "checkify":
+            return self.checkify()(operand, **kwargs)
+
+        # The callbacks themselves are only read from state on the host, so
+        # context managers entered around a call are respected, even once the
+        # call is jitted. Whether passing calls reach the host at all is decided
+        # while tracing, as in CompiledValidator.
+        return self._validate(get_success_callback() is not None, operand, **kwargs)
+
+    ######################
+    # Define the compiled, or fused, execution mode
+    #
+    # The node by node mechanism above emits a jax.lax.cond per node, and
+    # another per chain predicate check. Compiling instead evaluates every
+    # predicate up front, and resolves the entire chain with one reduction.
+    ##########
+
+    def compile(self, functional: bool = False, aggregate: bool = False) -> 'CompiledValidator':
+        """
+        Compiles the validation chain into a fused form. The compiled
+        validator behaves like the original when called, but lowers
+        to a single predicate reduction and a single host callback
+        no matter how long the chain is.
+
+        :param functional: If true, no host callback is made at all. Instead, calling
+                           returns the operand and a ValidationErrorState, which can
+                           be carried through jax control flow and checked later.
+        :param aggregate: If true, validation does not stop at the first failure. Every
+                          failing node creates an exception, and they are handled together
+                          as one ExceptionGroup.
+        :return: A compiled validator, which can be called like this one
+        """
+        if functional and aggregate:
+            raise ValueError("The functional and aggregate modes cannot be combined")
+        if functional:
+            return FunctionalValidator(self)
+        if aggregate:
+            return AggregateValidator(self)
+        return CompiledValidator(self)
+
+    def checkify(self) -> 'CheckifyValidator':
+        """
+        Converts the validation chain to run on the checkify backend. Each
+        predicate becomes a jax.experimental.checkify check, which composes
+        with jit, vmap, and pmap.
+
+        The result must be called under checkify.checkify. The returned
+        checkify error is then passed to CheckifyValidator.handle_error
+        to run the create and handle exception chain on the host.
+
+        :return: A checkify validator, which can be called like this one
+        """
+        return CheckifyValidator(self)
+
+    def batched(self, axis: int = 0) -> 'BatchedValidator':
+        """
+        Converts the validation chain to validate each example of a batch
+        separately. The chain is vmapped over the batch axis, and calling
+        the result returns the operand alongside a per-example pass mask.
+
+        The handle chain is invoked at most once per call, with a
+        BatchValidationException listing every failing row.
+
+        :param axis: The batch axis of the operand
+        :return: A batched validator
+        """
+        return BatchedValidator(self, axis)
+
+
+@jax.tree_util.register_pytree_node_class
+class ViolationSummary:
+    """
+    A small, fixed size summary of where an operand violated
+    a validator. It is meant to be returned from summarize,
+    so failure handling stays cheap for very large operands.
+
+    Fields
+    ======
+
+    - minimum: The smallest entry of the operand
+    - maximum: The largest entry of the operand
+    - count: How many entries were in violation
+    - first_index: The index, as a tuple, of the first entry in violation
+    """
+    def __init__(self, minimum: Any, maximum: Any, count: Any, first_index: Tuple[Any, ...]):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.count = count
+        self.first_index = first_index
+
+    @classmethod
+    def from_violations(cls, operand: Any, violations: Any) -> 'ViolationSummary':
+        """
+        Summarizes an operand given a mask of its violating entries. This
+        is jit compatible.
+
+        :param operand: The operand which was validated
+        :param violations: A bool array, of the operand's shape, true where in violation
+        :return: The summary
+        """
+        operand = jnp.asarray(operand)
+        violations = jnp.asarray(violations, dtype=bool)
+        first_index = jnp.unravel_index(jnp.argmax(violations.ravel()), violations.shape)
+        return cls(jnp.min(operand), jnp.max(operand), jnp.sum(violations), tuple(first_index))
+
+    def __repr__(self) -> str:
+        first_index = tuple(int(item) for item in self.first_index)
+        return (f"ViolationSummary(minimum={self.minimum}, maximum={self.maximum}, "
+                f"count={self.count}, first_index={first_index})")
+
+    def tree_flatten(self) -> Tuple[Any, Any]:
+        return (self.minimum, self.maximum, self.count, self.first_index), None
+
+    @classmethod
+    def tree_unflatten(cls, aux_data: Any, children: Any) -> 'ViolationSummary':
+        return cls(*children)
+
+
+class BatchValidationException(Exception):
+    """
+    Raised when some examples of a batch fail validation.
+
+    It carries the indices of every failing row, and
+    the exception created for the first failing row,
+    which is also set as the cause.
+    """
+    def __init__(self, failing_indices: List[int], exception: Exception):
+        super().__init__(f"Validation failed on batch rows {failing_indices}: {exception}")
+        self.failing_indices = failing_indices
+        self.exception = exception
+        self.__cause__ = exception
+
+
+class CompiledValidator:
+    """
+    A validation chain lowered into a fused form.
+
+    Every node's predicate is evaluated up front and stacked into a
+    boolean vector. A node counts as passed if its predicate held, or if
+    an earlier chain predicate stopped validation before it was reached.
+    Static chain predicates are resolved while tracing, and traced ones gate
+    the rest of the chain behind a cond, so sampled or suppressed predicates
+    cost nothing on the calls that skip them. A single argmin then locates
+    the first failing node, and one host callback keyed on that index creates
+    and handles the exception. That callback sits behind a single cond,
+    so a passing call never reaches the host.
+
+    Since predicates are evaluated without branching on each other,
+    they should be free of side effects. This is usually the case anyhow.
+    """
+    def __init__(self, validator: Validator):
+        """
+        :param validator: The head of the validation chain to compile
+        """
+        self.validator = validator
+        self.nodes: Tuple[Validator, ...] = tuple(validator.fetch(i) for i in range(len(validator)))
+
+    @staticmethod
+    def _get_final_callbacks() -> Tuple[Callable, Callable]:
+        # Fetch the final callbacks from the global state, creating
+        # default callbacks if required
+        final_exception_callback = get_exception_callback()
+        final_success_callback = get_success_callback()
+        if final_exception_callback is None:
+            final_exception_callback = lambda exception, **kwargs: None
+        if final_success_callback is None:
+            final_success_callback = lambda operand, **kwargs: None
+        return final_exception_callback, final_success_callback
+
+    def _evaluate_chain(self, operand: Any, **kwargs: Any) -> jax.Array:
+        """
+        Evaluates the predicates of the chain, in a way that is jit
+        compatible. Predicates behind a traced chain predicate are only
+        executed on calls where that chain predicate lets them be reached.
 
-        return self._validate(final_exception_callback,
-                              final_success_callback,
-                              operand,
-                              **kwargs)
+        :param operand: The operand to validate
+        :param kwargs: The kwargs conditioning the validation
+        :return: A bool vector, one entry per node. False means that
+                 node was reached, and failed.
+        """
+        # The chain is cut into segments, each ending at a node whose chain
+        # predicate is traced. Nodes with a static chain predicate that continues
+        # are stacked into the segment. Every segment after the first sits behind
+        # a cond on whether the traced chain predicates before it all continued.
+        # The conds follow one another rather than nest, so long chains neither
+        # recurse nor build nested branches.
+        segments = []
+        reached = None
+        index = 0
+        while index < len(self.nodes):
+            start = index
+            continues = True
+            while index < len(self.nodes):
+                node = self.nodes[index]
+                index += 1
+                if index == len(self.nodes):
+                    break
+                continues = node._execute_chain_predicate(**kwargs)
+                if not Validator._is_static(continues) or not continues:
+                    break
+
+            evaluated = lambda: self._evaluate_segment(start, index, operand, **kwargs)
+            if reached is None:
+                segments.append(evaluated())
+            else:
+                skipped = lambda: jnp.ones([index - start], dtype=bool)
+                segments.append(jax.lax.cond(reached, evaluated, skipped))
+
+            if Validator._is_static(continues):
+                if not continues:
+                    segments.append(jnp.ones([len(self.nodes) - index], dtype=bool))
+                    break
+            else:
+                reached = continues if reached is None else jnp.logical_and(reached, continues)
+        return jnp.concatenate(segments)
+
+    def _evaluate_segment(self, start: int, stop: int, operand: Any, **kwargs: Any) -> jax.Array:
+        # Evaluates the predicates of the nodes from start up to stop, as one stacked vector
+        return jnp.stack([jnp.asarray(node._execute_predicate(operand, **kwargs), dtype=bool).reshape([])
+                          for node in self.nodes[start:stop]])
+
+    def _find_failure_index(self, operand: Any, **kwargs: Any) -> jax.Array:
+        """
+        Finds the index of the first failing node in the chain, in a way
+        that is jit compatible.
+
+        :param operand: The operand to validate
+        :param kwargs: The kwargs conditioning the validation
+        :return: A scalar int array. It is the index of the first failing
+                 node, or the length of the chain if validation passed.
+        """
+        passed = self._evaluate_chain(operand, **kwargs)
+        first_failure = jnp.argmin(passed)
+        return jnp.where(passed[first_failure], len(self.nodes), first_failure)
+
+    @staticmethod
+    def _callback_on_failure(failed: Any, callback: Callable, *args: Any, **kwargs: Any):
+        """
+        Makes the host callback only when validation failed, so a passing
+        call transfers nothing to the host. If a success callback is set,
+        it has to hear about passing calls too, and the callback is always made.
+
+        :param failed: A scalar bool array. Whether validation failed
+        :param callback: The host function to call
+        :param args: The args for the callback
+        :param kwargs: The kwargs for the callback
+        """
+        if get_success_callback() is not None:
+            jax.debug.callback(callback, *args, **kwargs)
+            return
+        jax.lax.cond(failed,
+                     lambda: jax.debug.callback(callback, *args, **kwargs),
+                     lambda: None)
+
+    def _make_payloads(self, operand: Any, **kwargs: Any) -> Tuple[Any, ...]:
+        """
+        Computes the failure summary of every node which declares one. Nodes
+        without a summary get None, and will instead be handed the operand.
+
+        :param operand: The operand to validate
+        :param kwargs: The kwargs conditioning the validation
+        :return: A tuple with one summary, or None, per node
+        """
+        return tuple(node._execute_summarize(operand, **kwargs) if node._has_summary() else None
+                     for node in self.nodes)
+
+    def _needs_operand(self, **kwargs: Any) -> bool:
+        # The whole operand only has to reach the host if a success callback
+        # is going to want to see it, or if some node that can fail has no
+        # summary. Passthrough nodes never fail, and nodes behind a chain
+        # predicate that is statically False are never reached.
+        if get_success_callback() is not None:
+            return True
+        for node in self.nodes:
+            if not node.passthrough and not node._has_summary():
+                return True
+            continues = node._execute_chain_predicate(**kwargs)
+            if Validator._is_static(continues) and not continues:
+                return False
+        return False
+
+    def _dispatch(self, failure_index: Any, payloads: Tuple[Any, ...], operand: Any, **kwargs: Any):
+        """
+        Runs on the host, after the failure index is known. Calls
+        the success callback if nothing failed. Otherwise, creates
+        the failing node's exception and walks it back up the
+        chain of handlers.
+
+        :param failure_index: The index computed by _find_failure_index
+        :param payloads: The summaries computed by _make_payloads
+        :param operand: The operand that was validated. May be None, if no node or callback needs it
+        :param kwargs: The kwargs conditioning the validation
+        """
+        final_exception_callback, final_success_callback = self._get_final_callbacks()
+        failure_index = int(failure_index)
+        if failure_index == len(self.nodes):
+            final_success_callback(operand, **kwargs)
+            return
+
+        failed_node = self.nodes[failure_index]
+        payload = payloads[failure_index] if failed_node._has_summary() else operand
+        exception = failed_node._execute_create_exception(payload, **kwargs)
+        for node in reversed(self.nodes[:failure_index + 1]):
+            exception = node._execute_handle(exception, **kwargs)
+        final_exception_callback(exception, **kwargs)
+
+    def __call__(self, operand: Any, **kwargs: Any) -> Any:
+        """
+        Executes the compiled validation chain against the operand.
+
+        :param operand: The operand to be validated.
+        :param kwargs: Additional keyword arguments for validation, passed to each validator
+                       in the chain.
+        :return: The operand
+        """
+        if not is_validation_enabled():
+            return operand
+        failure_index = self._find_failure_index(operand, **kwargs)
+        payloads = self._make_payloads(operand, **kwargs)
+        shipped_operand = operand if self._needs_operand(**kwargs) else None
+        self._callback_on_failure(failure_index != len(self.nodes),
+                                  self._dispatch, failure_index, payloads, shipped_operand, **kwargs)
+        return operand
+
+
+@jax.tree_util.register_pytree_node_class
+class ValidationErrorState:
+    """
+    The outcome of a functional validation pass, as a tiny pytree
+    of device arrays.
+
+    It records whether validation failed, and the index of the
+    node that failed. Since it is a pytree of fixed shape, it can
+    be returned from jit, or carried through jax.lax.scan and
+    jax.lax.while_loop, without ever synchronizing with the host.
+
+    Only once the state is actually inspected on the host is the
+    python exception materialized, by means of the failing node's
+    create_exception.
+
+    Fields
+    ======
+
+    - failure_index: A scalar int32 array. The failing node, or the chain length if passed.
+    - failed: A scalar bool array. Whether validation failed.
+    - validator: The validator chain the state is about. This is static.
+    """
+    def __init__(self,
+                 failure_index: Any,
+                 failed: Any,
+                 validator: Validator
+                 ):
+        self.failure_index = failure_index
+        self.failed = failed
+        self.validator = validator
+
+    @classmethod
+    def passed(cls, validator: Validator) -> 'ValidationErrorState':
+        """
+        Creates a state in which nothing has failed yet. This is
+        what you want as the initial carry of a loop.
+
+        :param validator: The validator chain the state is about
+        :return: A passing error state
+        """
+        length = len(validator)
+        return cls(jnp.asarray(length, dtype=jnp.int32), jnp.asarray(False), validator)
+
+    def merge(self, other: 'ValidationErrorState') -> 'ValidationErrorState':
+        """
+        Merges two error states, keeping the earliest recorded failure.
+        This is jit compatible, and is how the state should be
+        accumulated across loop iterations.
+
+        :param other: The later error state
+        :return: The merged error state
+        """
+        failure_index = jnp.where(self.failed, self.failure_index, other.failure_index)
+        return ValidationErrorState(failure_index, self.failed | other.failed, self.validator)
+
+    def get_exception(self, operand: Any, **kwargs: Any) -> Optional[Exception]:
+        """
+        Materializes the exception on the host, if validation failed.
+
+        Note that this synchronizes with the device.
+
+        :param operand: The operand which failed validation
+        :param kwargs: The kwargs conditioning the validation
+        :return: The exception made by the failing node, or None if passed
+        """
+        if not bool(self.failed):
+            return None
+        node = self.validator.fetch(int(self.failure_index))
+        payload = node._execute_summarize(operand, **kwargs)
+        return node._execute_create_exception(payload, **kwargs)
+
+    def handle(self, operand: Any, **kwargs: Any):
+        """
+        Runs the exception, if any, through the handle chain and final
+        callbacks, exactly as the compiled validator would have done.
+
+        Note that this synchronizes with the device.
+
+        :param operand: The operand which was validated
+        :param kwargs: The kwargs conditioning the validation
+        """
+        compiled = CompiledValidator(self.validator)
+        payloads = compiled._make_payloads(operand, **kwargs)
+        compiled._dispatch(self.failure_index, payloads, operand, **kwargs)
+
+    def tree_flatten(self) -> Tuple[Any, Any]:
+        return (self.failure_index, self.failed), self.validator
+
+    @classmethod
+    def tree_unflatten(cls, aux_data: Validator, children: Any) -> 'ValidationErrorState':
+        return cls(*children, aux_data)
+
+
+class FunctionalValidator(CompiledValidator):
+    """
+    A compiled validation chain that makes no host callback.
+
+    Calling it returns the operand, and a ValidationErrorState
+    describing the outcome. It is then up to the caller to
+    inspect or handle the error state, whenever that is convenient.
+    """
+    def __call__(self, operand: Any, **kwargs: Any) -> Tuple[Any, ValidationErrorState]:
+        """
+        Executes the compiled validation chain against the operand.
+
+        :param operand: The operand to be validated.
+        :param kwargs: Additional keyword arguments for validation, passed to each validator
+                       in the chain.
+        :return: The operand, and the error state of the validation
+        """
+        if not is_validation_enabled():
+            return operand, ValidationErrorState.passed(self.validator)
+        failure_index = self._find_failure_index(operand, **kwargs).astype(jnp.int32)
+        failed = failure_index != len(self.nodes)
+        return operand, ValidationErrorState(failure_index, failed, self.validator)
+
+
+class CheckifyValidator(CompiledValidator):
+    """
+    A validation chain lowered onto jax.experimental.checkify.
+
+    Every predicate is evaluated as in the compiled mode, then each
+    node emits a checkify check with a message unique to that node
+    of that chain.
+    Checkify functionalizes these into an error value, which has no
+    host callback and works under vmap.
+
+    After running under checkify.checkify, the error is mapped back
+    to the failing node by handle_error, which then creates and
+    handles the exception as usual.
+    """
+    def __init__(self, validator: Validator):
+        """
+        :param validator: The head of the validation chain to convert
+        """
+        super().__init__(validator)
+        # The chain is interned, so its id tells it apart from any other
+        # chain checked in the same function, even one with the same node types.
+        chain_id = f"{id(validator):x}"
+        self.messages: Tuple[str, ...] = tuple(f"Validation failed on node {index} ({type(node).__name__}) "
+                                               f"of chain {chain_id}"
+                                               for index, node in enumerate(self.nodes))
+
+    def find_failing_node(self, error: jax_checkify.Error) -> int:
+        """
+        Maps a checkify error back onto the node that raised it.
+
+        :param error: The error returned by checkify.checkify
+        :return: The index of the failing node, or the chain length if none failed.
+        """
+        message = error.get()
+        if message is None:
+            return len(self.nodes)
+        for index, node_message in enumerate(self.messages):
+            if message.startswith(node_message):
+                return index
+        raise ValueError(f"Checkify error was not raised by this validation chain: {message}")
+
+    def handle_error(self, error: jax_checkify.Error, operand: Any, **kwargs: Any):
+        """
+        Runs on the host. Creates and handles the exception of whatever
+        node failed, or calls the success callback if none did.
+
+        :param error: The error returned by checkify.checkify
+        :param operand: The operand that was validated
+        :param kwargs: The kwargs conditioning the validation
+        """
+        payloads = self._make_payloads(operand, **kwargs)
+        self._dispatch(self.find_failing_node(error), payloads, operand, **kwargs)
+
+    def __call__(self, operand: Any, **kwargs: Any) -> Any:
+        """
+        Executes the validation chain as a sequence of checkify checks.
+
+        :param operand: The operand to be validated.
+        :param kwargs: Additional keyword arguments for validation, passed to each validator
+                       in the chain.
+        :return: The operand
+        """
+        if not is_validation_enabled():
+            return operand
+        passed = self._evaluate_chain(operand, **kwargs)
+        for index, message in enumerate(self.messages):
+            jax_checkify.check(passed[index], message)
+        return operand
+
+
+class BatchedValidator(CompiledValidator):
+    """
+    A validation chain vmapped over the batch axis of the operand.
+
+    Each example is validated separately, so one bad row no longer
+    fails the whole batch. Calling returns the operand and a bool
+    mask of the examples which passed, which can be used to drop
+    failing rows on device.
+
+    Only if some row failed does a single host callback receive the failure
+    index of every row. The exception for the first failing row is then created,
+    wrapped in a BatchValidationException listing every failing row, and
+    then run through the handle chain once.
+    """
+    def __init__(self, validator: Validator, axis: int = 0):
+        """
+        :param validator: The head of the validation chain to batch
+        :param axis: The batch axis of the operand
+        """
+        super().__init__(validator)
+        self.axis = axis
+
+    def _dispatch_batch(self, failure_indices: Any, payloads: Tuple[Any, ...], operand: Any, **kwargs: Any):
+        """
+        Runs on the host. Handles every failing row of the batch at once.
+
+        :param failure_indices: The failure index of each row
+        :param payloads: The per row summaries computed by _make_payloads
+        :param operand: The batched operand that was validated. May be None, if no node or callback needs it
+        :param kwargs: The kwargs conditioning the validation
+        """
+        final_exception_callback, final_success_callback = self._get_final_callbacks()
+        failure_indices = np.asarray(failure_indices)
+        failing_rows = np.nonzero(failure_indices != len(self.nodes))[0]
+        if len(failing_rows) == 0:
+            final_success_callback(operand, **kwargs)
+            return
+
+        first_row = int(failing_rows[0])
+        failure_index = int(failure_indices[first_row])
+        failed_node = self.nodes[failure_index]
+        if failed_node._has_summary():
+            payload = jax.tree_util.tree_map(lambda leaf: leaf[first_row], payloads[failure_index])
+        else:
+            payload = np.take(np.asarray(operand), first_row, axis=self.axis)
+        exception = failed_node._execute_create_exception(payload, **kwargs)
+        exception = BatchValidationException(failing_rows.tolist(), exception)
+        for node in reversed(self.nodes[:failure_index + 1]):
+            exception = node._execute_handle(exception, **kwargs)
+        final_exception_callback(exception, **kwargs)
+
+    def __call__(self, operand: Any, **kwargs: Any) -> Tuple[Any, jax.Array]:
+        """
+        Executes the validation chain against each example of the operand.
+
+        :param operand: The batched operand to be validated.
+        :param kwargs: Additional keyword arguments for validation, passed to each validator
+                       in the chain. These are not batched.
+        :return: The operand, and a bool mask which is true for the examples that passed
+        """
+        if not is_validation_enabled():
+            return operand, jnp.ones(jnp.shape(operand)[self.axis], dtype=bool)
+        find_failure_index = lambda row: self._find_failure_index(row, **kwargs)
+        make_payloads = lambda row: self._make_payloads(row, **kwargs)
+        failure_indices = jax.vmap(find_failure_index, in_axes=self.axis)(operand)
+        payloads = jax.vmap(make_payloads, in_axes=self.axis)(operand)
+        shipped_operand = operand if self._needs_operand(**kwargs) else None
+        self._callback_on_failure(jnp.any(failure_indices != len(self.nodes)),
+                                  self._dispatch_batch, failure_indices, payloads, shipped_operand, **kwargs)
+        return operand, failure_indices == len(self.nodes)
+
+
+class AggregateValidator(CompiledValidator):
+    """
+    A compiled validation chain that reports every failing node at once.
+
+    The chain is evaluated in one sweep, exactly as when compiled, but
+    the whole failure mask is sent to the host rather than just the
+    first failing index. Each failing node then creates its exception,
+    and the exceptions are bundled into a single ExceptionGroup which
+    flows through the handle chain once.
+
+    Nodes after a chain predicate that said to stop are still never
+    considered to have failed.
+    """
+    def _dispatch_aggregate(self, passed: Any, payloads: Tuple[Any, ...], operand: Any, **kwargs: Any):
+        """
+        Runs on the host. Creates an exception for every failing node,
+        and handles them together.
+
+        :param passed: The bool vector computed by _evaluate_chain
+        :param payloads: The summaries computed by _make_payloads
+        :param operand: The operand that was validated. May be None, if no node or callback needs it
+        :param kwargs: The kwargs conditioning the validation
+        """
+        final_exception_callback, final_success_callback = self._get_final_callbacks()
+        failing_nodes = np.nonzero(~np.asarray(passed))[0].tolist()
+        if not failing_nodes:
+            final_success_callback(operand, **kwargs)
+            return
+
+        exceptions = []
+        for index in failing_nodes:
+            failed_node = self.nodes[index]
+            payload = payloads[index] if failed_node._has_summary() else operand
+            exceptions.append(failed_node._execute_create_exception(payload, **kwargs))
+        exception = ExceptionGroup(f"Validation failed on {len(exceptions)} validators", exceptions)
+
+        # Every handler upstream of a failure sees the group, once
+        for node in reversed(self.nodes[:failing_nodes[-1] + 1]):
+            exception = node._execute_handle(exception, **kwargs)
+        final_exception_callback(exception, **kwargs)
+
+    def __call__(self, operand: Any, **kwargs: Any) -> Any:
+        """
+        Executes the compiled validation chain against the operand, collecting
+        every failure.
+
+        :param operand: The operand to be validated.
+        :param kwargs: Additional keyword arguments for validation, passed to each validator
+                       in the chain.
+        :return: The operand
+        """
+        if not is_validation_enabled():
+            return operand
+        passed = self._evaluate_chain(operand, **kwargs)
+        payloads = self._make_payloads(operand, **kwargs)
+        shipped_operand = operand if self._needs_operand(**kwargs) else None
+        self._callback_on_failure(~jnp.all(passed),
+                                  self._dispatch_aggregate, passed, payloads, shipped_operand, **kwargs)
+        return operand
@@ -0,0 +1,235 @@
+import time
+import jax
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+from .core import Validator
+from .chain import Chain
+
+
+@dataclass(frozen=True)
+class Removal:
+    """
+    One node that was taken out of a chain by optimize.
+
+    :param index: Where the node sat in the original chain
+    :param validator: The single node that was removed
+    :param reason: Why it could be removed
+    """
+    index: int
+    validator: Validator
+    reason: str
+
+
+@dataclass(frozen=True)
+class OptimizationReport:
+    """
+    A record of what optimize did to a chain.
+
+    :param original_length: The number of nodes before optimizing
+    :param optimized_length: The number of nodes after optimizing
+    :param removed: Every removed node, in the order they appeared in the chain
+    """
+    original_length: int
+    optimized_length: int
+    removed: Tuple[Removal, ...]
+
+    def __str__(self) -> str:
+        lines = [f"Optimized chain from {self.original_length} to {self.optimized_length} nodes"]
+        for removal in self.removed:
+            lines.append(f"    {removal.index}: {type(removal.validator).__name__}, {removal.reason}")
+        return "\n".join(lines)
+
+
+class MergedPassthrough(Validator):
+    """
+    A single passthrough node standing in for a run of consecutive
+    passthrough nodes. It handles exceptions with each merged node in
+    turn, from last to first, just as the run would have, and only
+    continues down the chain if every merged node would have.
+    """
+    passthrough = True
+
+    def __init__(self, *nodes: Validator):
+        """
+        :param nodes: The single node validators being merged, in chain order
+        """
+        self.nodes = nodes
+
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return True
+
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return Exception("This should never happen")
+
+    def chain_predicate(self, **kwargs) -> bool:
+        outcome = True
+        for node in self.nodes:
+            continues = node._execute_chain_predicate(**kwargs)
+            if continues is False:
+                return False
+            outcome = outcome & continues
+        return outcome
+
+    def handle_exception(self, exception: Exception, **kwargs) -> Exception:
+        for node in reversed(self.nodes):
+            exception = node._execute_handle(exception, **kwargs)
+        return exception
+
+
+def _has_handler(node: Validator) -> bool:
+    return type(node).handle_exception is not Validator.handle_exception
+
+
+def _has_chain_predicate(node: Validator) -> bool:
+    return type(node).chain_predicate is not Validator.chain_predicate
+
+
+def _drop_redundant(nodes: List[Tuple[int, Validator]],
+                    removed: List[Removal]
+                    ) -> List[Tuple[int, Validator]]:
+    # A node is redundant if an identical or stricter node was already
+    # checked earlier in the chain. Predicates are pure, so reaching the
+    # node means it would pass. Nodes that handle exceptions are kept,
+    # since dropping them would change what the handlers see.
+    kept = []
+    for index, node in nodes:
+        if not _has_handler(node):
+            if any(other is node for _, other in kept):
+                removed.append(Removal(index, node, "duplicate of an earlier node"))
+                continue
+            if not _has_chain_predicate(node) and any(other.subsumes(node) for _, other in kept):
+                removed.append(Removal(index, node, "subsumed by an earlier node"))
+                continue
+        kept.append((index, node))
+    return kept
+
+
+def _drop_subsumed(nodes: List[Tuple[int, Validator]],
+                   removed: List[Removal]
+                   ) -> List[Tuple[int, Validator]]:
+    # A node is also redundant if a stricter node comes later, so long as
+    # nothing in between could stop the chain or handle the exception.
+    # Failures then surface from the stricter node instead.
+    kept = []
+    for position, (index, node) in enumerate(nodes):
+        if not _has_handler(node) and not _has_chain_predicate(node):
+            stricter = None
+            for _, other in nodes[position + 1:]:
+                if _has_handler(other) or _has_chain_predicate(other):
+                    break
+                if other.subsumes(node):
+                    stricter = other
+                    break
+            if stricter is not None:
+                removed.append(Removal(index, node, f"subsumed by a later {type(stricter).__name__}"))
+                continue
+        kept.append((index, node))
+    return kept
+
+
+def _collapse_passthroughs(nodes: List[Tuple[int, Validator]],
+                           removed: List[Removal]
+                           ) -> List[Tuple[int, Validator]]:
+    # Passthroughs that neither handle exceptions nor stop the chain do
+    # nothing at all. The rest are merged into one node per run.
+    kept = []
+    run: List[Tuple[int, Validator]] = []
+
+    def flush():
+        if len(run) == 1:
+            kept.append(run[0])
+        elif run:
+            merged = []
+            for index, node in run:
+                merged.extend(node.nodes if isinstance(node, MergedPassthrough) else [node])
+                removed.append(Removal(index, node, "merged into a neighbouring passthrough"))
+            kept.append((run[0][0], MergedPassthrough(*merged)))
+        run.clear()
+
+    for index, node in nodes:
+        if not node.passthrough:
+            flush()
+            kept.append((index, node))
+        elif not _has_handler(node) and not _has_chain_predicate(node):
+            removed.append(Removal(index, node, "passthrough with no effect"))
+        else:
+            run.append((index, node))
+    flush()
+    return kept
+
+
+def optimize(validator: Validator) -> Tuple[Validator, OptimizationReport]:
+    """
+    Canonicalizes a validation chain. See Validator.optimize
+
+    :param validator: The head of the chain to optimize
+    :return: The optimized chain, and a report of what was removed
+    """
+    nodes = [(index, validator.fetch(index)) for index in range(len(validator))]
+    removed: List[Removal] = []
+    kept = _drop_redundant(nodes, removed)
+    kept = _drop_subsumed(kept, removed)
+    kept = _collapse_passthroughs(kept, removed)
+    if not kept:
+        # A chain cannot be empty, so keep the head around.
+        kept = [nodes[0]]
+        removed = [removal for removal in removed if removal.index != 0]
+    removed.sort(key=lambda removal: removal.index)
+
+    optimized = Validator._from_key(Chain.from_items(node._nodespec for _, node in kept))
+    report = OptimizationReport(len(validator), len(optimized), tuple(removed))
+    return optimized, report
+
+
+def profile(validator: Validator, operand: Any, repeats: int = 5, **kwargs) -> Tuple[float, ...]:
+    """
+    Times each node's predicate. See Validator.profile
+
+    :param validator: The head of the chain to profile
+    :param operand: An example operand
+    :param repeats: How many times to time each predicate
+    :param kwargs: The kwargs conditioning the validation
+    :return: The seconds taken by each node's predicate, in chain order
+    """
+    costs = []
+    for index in range(len(validator)):
+        node = validator.fetch(index)
+        predicate = jax.jit(lambda operand: node._execute_predicate(operand, **kwargs))
+        jax.block_until_ready(predicate(operand))
+        runs = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            jax.block_until_ready(predicate(operand))
+            runs.append(time.perf_counter() - start)
+        costs.append(min(runs))
+    return tuple(costs)
+
+
+def reorder_by_cost(validator: Validator, costs: Optional[Tuple[float, ...]] = None) -> Validator:
+    """
+    Sorts reorderable runs of the chain by cost. See Validator.reorder_by_cost
+
+    :param validator: The head of the chain to reorder
+    :param costs: Optionally, one cost per node. Otherwise, declared costs are used
+    :return: The reordered chain
+    """
+    nodes = [validator.fetch(index) for index in range(len(validator))]
+    if costs is None:
+        costs = [node.cost for node in nodes]
+    if len(costs) != len(nodes):
+        raise ValueError(f"Expected {len(nodes)} costs, one per node, but got {len(costs)}")
+
+    # Nodes that handle exceptions or stop the chain split the chain into
+    # segments. Only the reorderable nodes within a segment are sorted.
+    # The sort is stable, so ties keep their declared order.
+    ordered = []
+    segment = []
+    for node, cost in zip(nodes, costs):
+        if node.reorderable and not _has_handler(node) and not _has_chain_predicate(node):
+            segment.append((cost, len(segment), node))
+            continue
+        ordered.extend(node for _, _, node in sorted(segment, key=lambda item: item[:2]))
+        segment.clear()
+        ordered.append(node)
+    ordered.extend(node for _, _, node in sorted(segment, key=lambda item: item[:2]))
+    return Validator._from_key(Chain.from_items(node._nodespec for node in ordered))
@@ -1,5 +1,6 @@
 import jax
 import builtins
+import threading
 from typing import Tuple, Any, Type, List
 from dataclasses import dataclass
 
@@ -15,6 +16,7 @@ class ExceptionRepresentation:
 
 
 already_registered = set()
+registration_lock = threading.Lock()
 def register_exception(exception: Exception):
     """
     Modifies jax's understanding of what an error is so
@@ -23,8 +25,6 @@ def register_exception(exception: Exception):
 
     :param exception: The exception to register and prepare
     """
-    if exception in already_registered:
-        return None
     def flatten_error(exception: Exception)->Tuple[Any, ExceptionRepresentation]:
         representation = ExceptionRepresentation(type(exception), exception.args)
         return (), representation
@@ -32,8 +32,13 @@ def register_exception(exception: Exception):
     def unflatten_error(auxilary: ExceptionRepresentation, flatten: Any)->Exception:
         return auxilary.build()
 
-    jax.tree_util.register_pytree_node(exception, flatten_error, unflatten_error)
-    already_registered.add(exception)
+    # Jax refuses to register a type twice, so the check and
+    # the registration must happen together.
+    with registration_lock:
+        if exception in already_registered:
+            return None
+        jax.tree_util.register_pytree_node(exception, flatten_error, unflatten_error)
+        already_registered.add(exception)
 
 # Patch all default errors to be jittable
 #for name in dir(builtins):
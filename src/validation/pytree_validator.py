@@ -1,13 +1,14 @@
 import jax
 import textwrap
 from jax import tree_util
+from jax import numpy as jnp
 from jax.tree_util import PyTreeDef, KeyPath, KeyEntry
 from typing import Tuple, Optional, Union, Any, List, Dict, Sequence
+from .core import Validator, CompiledValidator
 from .tensor_validator import TensorValidator
-from dataclasses import dataclass
-@dataclass
-class Schema:
-    schema: Any
+from .schema import Schema
+from .tree_plan import (TreeMatchError, ValidationPlan, get_plan, bind_compiled,
+                        group_leaves, find_group_failures, validate_each, validate_grouped)
 
 class InternalTreeValidatorError(Exception):
 
@@ -46,6 +47,8 @@ class PyTreeValidator(TensorValidator):
           tensors found within a PyTree. It will be applied AFTER any
           schema-specific validator.
     broadcast: A bool. Indicates whether or not to broadcast schemas
+    grouped: A bool. Indicates whether leaves sharing a validator, shape, and
+             dtype are stacked and validated together, under jax.vmap
 
     manipulation
     ------------
@@ -57,6 +60,7 @@ class PyTreeValidator(TensorValidator):
                  header: Optional[TensorValidator] = None,
                  tail: Optional[TensorValidator] = None,
                  broadcast_schema: bool = True,
+                 grouped: bool = False,
                  ):
 
         """
@@ -67,6 +71,9 @@ class PyTreeValidator(TensorValidator):
                        applied to ALL branch
         :param tail:
         :param broadcast_schema:
+        :param grouped: Whether to validate leaves in vmapped groups, rather than one
+                        by one. Worthwhile when one validator is broadcast over many
+                        leaves of the same shape.
         """
         super().__init__()
         assert isinstance(schema, (str, Schema))
@@ -74,28 +81,20 @@ class PyTreeValidator(TensorValidator):
         self.header = header
         self.tail = tail
         self.broadcast = broadcast_schema
+        self.grouped = grouped
     def apply_nonlocal_validation(self,
-                        validator: Optional[TensorValidator]
-                        )->TensorValidator:
-        if validator is None:
-            validator = PassthroughValidator()
-        validator = self.header & validator & self.tail
+                        validator: Optional[Validator]
+                        )->Optional[Validator]:
+        # The header, the schema validator, and the tail are each optional.
+        # None comes back when there is nothing at all to apply to a leaf.
+        parts = [part for part in (self.header, validator, self.tail) if part is not None]
+        if not parts:
+            return None
+        validator = parts[0]
+        for part in parts[1:]:
+            validator = validator & part
         return validator
 
-    def _is_same_path(self,
-                      schema: Tuple[KeyEntry, ...],
-                      operand: Tuple[KeyEntry, ...]
-                      )->bool:
-        return schema == operand
-    def _is_broadcastable(self,
-                          schema_path: Tuple[KeyEntry,...],
-                          operand_path: Tuple[KeyEntry,...]
-                          )->bool:
-        # A schema is broadcastbale with an operand
-        # when the path, up to the schema node, is
-        # the same
-        length = len(schema_path)
-        return schema_path == operand_path[:length]
     def _format_path_message(self,
                           path: Tuple[KeyEntry,...],
                           )->str:
@@ -135,132 +134,81 @@ class PyTreeValidator(TensorValidator):
         else:
             schema = kwargs[self.schema]
         return schema
-    def get_leaves(self,
-                   schema: PyTreeDef,
-                   operand: PyTreeDef
-                   )->Tuple[
-                             List[Tuple[KeyPath, Any]],
-                             List[Tuple[KeyPath, Any]]
-                            ]:
-        # To get all the leaves we need to succesfully
-        # compare the two trees, we MUST capture leafs
-        # ending in None. We define a special utility function
-        # then capture and return
 
-        include_none_as_leaf = lambda x: x is None
-        schema_leafs = tree_util.tree_leaves_with_path(schema, include_none_as_leaf)
-        operand_leafs = tree_util.tree_leaves_with_path(operand)
-
-        if len(schema_leafs) > len(operand_leafs):
-           msg = f"""
-           An issue was detected while retrieving
-           the leaves.
-           
-           The schema under consideration was provided
-           with a number of leaves, including nones,
-           equal to '{len(schema_leafs)}. However, the
-           operand had less leaves, at '{len(operand_leafs)}'
-           
-           This must mean incompatibility, as the schema
-           can neither be broadcast nor exactly match.
-           """
-           msg = textwrap.dedent(msg)
-           raise InternalTreeValidatorError(msg, None)
-
-        return schema_leafs, operand_leafs
+    def _get_plan(self, operand: Any, **kwargs) -> Tuple[ValidationPlan, List[Any], List[Any]]:
+        # Which schema validator applies to which operand leaf only depends
+        # on the tree structures. The plan for this pair of structures is
+        # made once, cached, and from then on is a flat list of pairs.
+        schema = self.get_schema(**kwargs)
+        return get_plan(schema.schema, operand, self.broadcast, schema.trie)
 
     ## Fufill contract
     #
     # When subclassing tensor_validator we promise
-    # to implement validate, make_message, and make_exception
-    def validate(self, operand: PyTreeDef, **kwargs)->Optional[Tuple[Dict[str, Any],
-                                                                     Optional[Exception]]
-                                                               ]:
+    # to implement predicate and exception_factory
+    def predicate(self, operand: Any, **kwargs) -> bool:
         """
-
-        :param operand:
-        :param kwargs:
-        :return:
+        Passes if every leaf passes its validator. Structural problems
+        are known while tracing, and fail statically.
         """
-
-
-        # Set up certain variables as outer-level
-        # locals. This will prove useful later on
-        # if we throw an error. It also ensures
-        # variables are shared across the try/except
-        schema = None
-        schema_path, schema_validator = None, None
-        operand_path, operand_value = None, None
-
         try:
-            # Try to validate. If all of the code runs
-            # without throwing, validation was successful.
-            #
-            # The only kind of error that is thrown by code
-            # in this section by the class itself is the
-            # InternalTreeValidatorError which will contain
-            # the primary issue.
-
-            schema = self.get_schema(**kwargs)
-            schema = schema.schema
-            schema_leaves, operand_leaves = self.get_leaves(schema, operand)
-
-            schema_path, schema_validator = schema_leaves.pop()
-            validator = self.apply_nonlocal_validation(schema_validator)
-            while schema_leaves and operand_leaves:
-
-                operand_path, operand_value = operand_leaves.pop()
-
-                #If not tree broadcasting, we update the path
-                #
-                # If we ARE tree broadcasting, the same schema validator
-                # needs to be applied across many operand_values, so we
-                # do not update the schema_path or validator.
-                #
-                # If neither, we have encountered a broken tree. Tell the
-                # user.
-                #
-                # Keep in mind most of the error details are not tacked on
-                # here. Information such as the schema path and such
-                # are tacked on in the except branch and elsewhere
-
-                if self._is_same_path(schema_path, operand_path):
-                    schema_path, schema_validator = schema_leaves.pop()
-                    validator = self.apply_nonlocal_validation(validator)
-                elif not self._is_broadcastable(schema_path, operand_path):
-                    msg = "Schema tree was not broadcast with, or the same shape as, operand tree"
-                    raise InternalTreeValidatorError(msg, None)
-
-                # Apply our actual validator. Raise if needed
-                validation_result = validator(operand_value, **kwargs)
-                if validation_result is not None:
-                    msg = "Validation failed when applied to operand. See child error messages"
-                    raise InternalTreeValidatorError(msg, None)
-
+            plan, schema_leaves, operand_leaves = self._get_plan(operand, **kwargs)
+        except (TreeMatchError, InternalTreeValidatorError):
+            return False
+
+        if self.grouped:
+            # Every group is validated in one vmapped pass
+            outcomes = []
+            for group in group_leaves(plan, schema_leaves, operand_leaves, self.apply_nonlocal_validation):
+                compiled = CompiledValidator(group.validator)
+                failure_indices = find_group_failures(group, compiled, operand_leaves, **kwargs)
+                outcomes.append(jnp.all(failure_indices == len(compiled.nodes)))
+        else:
+            outcomes = [jnp.all(compiled._evaluate_chain(operand_leaves[leaf_index], **kwargs))
+                        for leaf_index, compiled in bind_compiled(plan, schema_leaves,
+                                                                  self.apply_nonlocal_validation)]
+        if not outcomes:
+            return True
+        return jnp.all(jnp.stack(outcomes))
+
+    def exception_factory(self, operand: Any, **kwargs) -> Exception:
+        """
+        Runs once validation has failed, on the host, or while tracing
+        if the failure was structural. Works out what went wrong, and
+        where, and reports the exceptions of every failing leaf together.
+        """
+        info_dictionary: Dict[str, Any] = {}
+        suberror = None
+        try:
+            plan, schema_leaves, operand_leaves = self._get_plan(operand, **kwargs)
+        except TreeMatchError as err:
+            info_dictionary["issue"] = err.msg
+            if err.schema_path is not None:
+                info_dictionary["schema_path"] = err.schema_path
+            if err.operand_path is not None:
+                info_dictionary["operand_path"] = err.operand_path
         except InternalTreeValidatorError as err:
-            # All internal error emissions are performed in terms of thre
-            # InternalTreeValidatorError, which will contain the issue and
-            # any subissues as well.
-            #
-            # In this location, we use that information, along with the current
-            # environment, to tack on a bunch more detaisl.
-
-            info_dictionary = {"issue": err.msg}
-            if schema_path is not None:
-                info_dictionary["schema_path"] = schema_path
-            if operand_path is not None:
-                info_dictionary["operand_path"] = operand_path
-            if operand_value is not None:
-                info_dictionary["operand_type"] = type(operand_value)
-            return info_dictionary, err.suberror
-
-    def make_message(self,
-                     operand: Any,
-                     arguments: Tuple[Dict[str, Any], Optional[Exception]],
-                     context_string: str,
-                     **kwargs) -> str:
+            info_dictionary["issue"] = err.msg
+        else:
+            validate = validate_grouped if self.grouped else validate_each
+            failures = validate(plan, schema_leaves, operand_leaves,
+                                wrap=self.apply_nonlocal_validation, **kwargs)
+            msg = f"Validation failed on {len(failures)} leaves of the operand. See child error messages"
+            info_dictionary["issue"] = msg
+            if failures:
+                first = failures[0]
+                info_dictionary["schema_path"] = first.schema_path
+                info_dictionary["operand_path"] = first.operand_path
+                info_dictionary["operand_type"] = type(operand_leaves[first.leaf_index])
+                suberror = ExceptionGroup(msg, [failure.exception for failure in failures])
+
+        error = TreeValidatorError(self.make_message(info_dictionary))
+        if suberror is not None:
+            error.__cause__ = suberror
+        return error
+
+    def make_message(self, message_construction_info: Dict[str, Any]) -> str:
         message = "An issue occurred while validating a pytree with a PyTreeValidator \n"
-        message_construction_info, _ = arguments
         if "schema_path" in message_construction_info:
             msg = f"""
             The issue occurred while examining a schema
@@ -285,24 +233,12 @@ class PyTreeValidator(TensorValidator):
             msg = f"""
             The operand that failed was of type:
             """
-            type_message = f"    {message_construction_info['operand_type']}"
+            type_message = f"    {message_construction_info['operand_type']}\n"
             msg = textwrap.dedent(msg)
-            msg = msg + type_message
+            message += msg + type_message
         if "issue" in message_construction_info:
             msg = textwrap.dedent(message_construction_info["issue"])
             msg = textwrap.indent(msg, "    ")
             msg = "The actual issue was:\n" + msg
             message += msg
         return message
-    def make_exception(self,
-                       message: str,
-                       arguments: Tuple[Dict[str, Any], Optional[Exception]]
-                       ) -> Exception:
-        """
-        Fufill contract to be a tensor validator
-        """
-        _, sub_exception = arguments
-        error = TreeValidatorError(message)
-        if sub_exception is not None:
-            error.__cause__ = sub_exception
-        return error
\ No newline at end of file
@@ -0,0 +1,78 @@
+import jax
+from jax import numpy as jnp
+from typing import Any, Optional
+from .core import Validator
+
+
+class SampledValidator(Validator):
+    """
+    A passthrough meta validator that only lets validation continue
+    down the chain for a sampled fraction of calls. It is in the spirit
+    of SuppressErrorsWhenFlagged, but decides on device.
+
+    Place it in front of an expensive chain, and the rest of the chain
+    will only be evaluated on roughly 'rate' of the calls. The decision goes
+    through chain_predicate, so a skipped call costs a single scalar compare.
+
+    The decision is drawn from one of two kwargs, passed in when validating:
+
+    - A PRNG key, under the kwarg named by 'key_kwarg'
+    - A step counter, under the kwarg named by 'step_kwarg'
+
+    Either way, the seed is folded in, so the decision is deterministic for
+    a given key or step, and reproduces in tests. If both are provided, the key
+    is used.
+
+    Example
+    =======
+
+    ```
+    validator = SampledValidator(rate=0.01, seed=3) & Finite() & Probability()
+    validator(operand, step=step)
+    ```
+    """
+    passthrough = True
+
+    def __init__(self,
+                 rate: float,
+                 seed: int = 0,
+                 key_kwarg: str = "key",
+                 step_kwarg: str = "step"
+                 ):
+        """
+        :param rate: The fraction of calls, between 0 and 1, on which to continue validating
+        :param seed: The seed, folded into the key or step, for deterministic sampling
+        :param key_kwarg: The name of the kwarg a PRNG key may be found under
+        :param step_kwarg: The name of the kwarg a step counter may be found under
+        """
+        self.rate = rate
+        self.seed = seed
+        self.key_kwarg = key_kwarg
+        self.step_kwarg = step_kwarg
+
+    def _draw_uniform(self, **kwargs: Any) -> jax.Array:
+        # Get a deterministic uniform sample out of whichever of
+        # the key or step kwargs was provided.
+        if self.key_kwarg in kwargs:
+            key = jax.random.fold_in(kwargs[self.key_kwarg], self.seed)
+        elif self.step_kwarg in kwargs:
+            key = jax.random.fold_in(jax.random.PRNGKey(self.seed), kwargs[self.step_kwarg])
+        else:
+            msg = f"SampledValidator requires either the '{self.key_kwarg}' or '{self.step_kwarg}' kwarg"
+            raise KeyError(msg)
+        return jax.random.uniform(key)
+
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return True
+
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return Exception("This should never happen")
+
+    def chain_predicate(self, **kwargs) -> bool:
+        # Rates of zero or one are resolved statically, without
+        # touching the kwargs at all.
+        if self.rate >= 1.0:
+            return True
+        if self.rate <= 0.0:
+            return False
+        return self._draw_uniform(**kwargs) < self.rate
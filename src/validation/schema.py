@@ -1,8 +1,10 @@
 import jax
 import textwrap
 from jax import tree_util
+from functools import cached_property
 from typing import Tuple, Optional, Union, Any, List, Dict, Sequence
-from .patching import Validator
+from .core import Validator
+from .tree_plan import KeyPathTrie
 
 
 
@@ -63,7 +65,8 @@ class Schema:
 
     Schemas support pytree broadcasting by
     prefix tree, much like jax tree mapping
-    does.
+    does. An Each node in the schema is a wildcard,
+    matching every child at its level.
     """
 
     @staticmethod
@@ -82,4 +85,11 @@ class Schema:
 
     def __init__(self, schema: Any):
         tree_util.tree_map(self.is_valid_leaf, schema)
-        self.schema = schema
\ No newline at end of file
+        self.schema = schema
+
+    @cached_property
+    def trie(self) -> KeyPathTrie:
+        """
+        The schema leaves, indexed by key path. Built once per schema.
+        """
+        return KeyPathTrie.from_schema(self.schema)
\ No newline at end of file
@@ -8,8 +8,14 @@ This may include things like context, or caches.
 """
 
 
-from typing import Tuple, Type, Any, Optional, Callable, Dict
-
+from typing import Tuple, Type, Any, Optional, Callable, Dict, Hashable, Iterator, List, MutableMapping
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+
+import sys
+import threading
+import contextvars
+import weakref
 import cachetools
 
 from .types import Operand
@@ -18,18 +24,449 @@ import jax.lax
 import jax.tree_util
 from jax._src.tree_util import PyTreeDef
 
+###
+# Define the interning table. This is a hash-consing
+# table validators are deduplicated through.
+###
+
+class InterningTable:
+    """
+    A hash-consing table. Maps a key onto the one live object
+    built for it, so that building an identical object twice
+    returns the same instance.
+
+    Values are only weakly referenced. Once nothing else is
+    using an object, it is garbage collected and its entry
+    drops out of the table. Lookups go through dict equality
+    on the key, so a hash collision can never return the
+    wrong object.
+
+    Optionally, the table can also be bounded. It then keeps
+    at most maxsize entries, forgetting the least recently
+    used first. A forgotten object keeps working, it just
+    will no longer be reused.
+
+    The table is safe to use from many threads. Every mutation
+    happens under a lock, and setdefault offers insert if absent,
+    so two threads interning the same key end up sharing one object.
+    """
+    def __init__(self, maxsize: Optional[int] = None):
+        """
+        :param maxsize: The maximum number of entries, or None for no bound
+        """
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, weakref.ref] = OrderedDict()
+        self._pending: List[Tuple[Hashable, weakref.ref]] = []
+
+    def _make_reference(self, key: Hashable, value: Any) -> weakref.ref:
+        # The callback may run on any thread, at any allocation. If the lock
+        # is free, the entry is removed right away. Otherwise, possibly because
+        # this very thread is midway through changing the table, the removal
+        # is recorded and carried out by whoever holds the lock, through _purge.
+        table_reference = weakref.ref(self)
+        def on_collected(reference: weakref.ref):
+            table = table_reference()
+            if table is None:
+                return
+            table._pending.append((key, reference))
+            if table.lock.acquire(blocking=False):
+                try:
+                    table._purge()
+                finally:
+                    table.lock.release()
+        return weakref.ref(value, on_collected)
+
+    def _purge(self):
+        # Removes entries whose objects were collected, unless the
+        # entry has already been replaced or evicted. Call under the lock.
+        while self._pending:
+            key, reference = self._pending.pop()
+            if self._entries.get(key) is reference:
+                del self._entries[key]
+
+    def _enforce_bound(self):
+        if self.maxsize is None:
+            return
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Gets the live object stored under key.
+
+        :param key: The key to look up
+        :return: The object, or None if there is no live object for the key
+        """
+        reference = self._entries.get(key)
+        if reference is None:
+            return None
+        value = reference()
+        if value is not None and self.maxsize is not None:
+            with self.lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Stores value as the object for key, replacing any existing one.
+
+        :param key: The key to store under
+        :param value: The object. Must support weak references.
+        """
+        with self.lock:
+            self._purge()
+            self._entries[key] = self._make_reference(key, value)
+            self._entries.move_to_end(key)
+            self._enforce_bound()
+            self._purge()
+
+    def setdefault(self, key: Hashable, value: Any) -> Any:
+        """
+        Stores value as the object for key, unless a live object is
+        already stored there. This is atomic.
+
+        :param key: The key to store under
+        :param value: The object. Must support weak references.
+        :return: The object now stored under key. Either the existing one, or value
+        """
+        with self.lock:
+            self._purge()
+            reference = self._entries.get(key)
+            existing = reference() if reference is not None else None
+            if existing is not None:
+                if self.maxsize is not None:
+                    self._entries.move_to_end(key)
+                return existing
+            self._entries[key] = self._make_reference(key, value)
+            self._entries.move_to_end(key)
+            self._enforce_bound()
+            self._purge()
+            return value
+
+    def set_maxsize(self, maxsize: Optional[int]):
+        """
+        Changes the bound, evicting entries right away if needed.
+
+        :param maxsize: The maximum number of entries, or None for no bound
+        """
+        with self.lock:
+            self.maxsize = maxsize
+            self._enforce_bound()
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+            self._pending.clear()
+
+    def memory_usage(self) -> int:
+        """
+        Approximates the bytes held by the table itself. This counts the
+        index, its keys and the weak references. The objects are not
+        counted, as the table does not keep them alive.
+
+        :return: The approximate size, in bytes
+        """
+        with self.lock:
+            self._purge()
+            size = sys.getsizeof(self._entries)
+            for key, reference in self._entries.items():
+                size += sys.getsizeof(key) + sys.getsizeof(reference)
+            return size
+
+    def __len__(self) -> int:
+        with self.lock:
+            self._purge()
+            return len(self._entries)
+
+    def __iter__(self):
+        with self.lock:
+            self._purge()
+            return iter(list(self._entries))
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    # The mapping protocol lets the table back cachetools.cached,
+    # memoizing results only for as long as they are in use.
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.put(key, value)
+
+###
+# Define the named caches. Each wraps a cachetools cache, or an
+# interning table, chosen by a policy, and counts how it is used.
+###
+
+cache_kinds = ("lru", "lfu", "ttl", "unbounded", "weak")
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    Describes how a named cache should behave.
+
+    :param kind: One of cache_kinds. "weak" keeps values only while something
+                 else is using them, as with the interning table.
+    :param maxsize: The maximum number of entries, or None for no bound. Ignored by "unbounded"
+    :param maxbytes: The maximum approximate bytes of the values, or None for no bound
+    :param ttl: For "ttl" caches, how many seconds an entry lives
+    """
+    kind: str = "lfu"
+    maxsize: Optional[int] = 2000
+    maxbytes: Optional[int] = None
+    ttl: Optional[float] = None
+
+    def __post_init__(self):
+        if self.kind not in cache_kinds:
+            raise ValueError(f"Cache kind must be one of {cache_kinds}, but got '{self.kind}'")
+        if self.kind == "ttl" and self.ttl is None:
+            raise ValueError("A ttl cache requires ttl to be set")
+        if self.kind == "weak" and self.maxbytes is not None:
+            raise ValueError("A weak cache does not own its values, so cannot be bounded by bytes")
+
+@dataclass
+class CacheStats:
+    """
+    Usage counters for a named cache. Evictions count entries
+    dropped to respect the policy, such as by size or age.
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+def _entry_size(key: Hashable, value: Any) -> int:
+    # A shallow estimate, which is what sys.getsizeof offers.
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+class ManagedCache(MutableMapping):
+    """
+    A named cache, as handed out by get_cache. It behaves as a mapping,
+    so it can back cachetools.cached, while counting hits, misses, and
+    evictions. The policy can be changed after creation, in place, so
+    code already holding the cache picks the change up.
+
+    Every operation happens under the cache's lock. Pass it along as
+    cachetools.cached(cache, lock=cache.lock) so concurrent misses
+    settle on one stored result, through setdefault.
+    """
+    def __init__(self, name: str, policy: CachePolicy):
+        """
+        :param name: The name the cache is registered under
+        :param policy: How the cache should behave
+        """
+        self.name = name
+        self.lock = threading.RLock()
+        self.stats = CacheStats()
+        self.configure(policy)
+
+    def configure(self, policy: CachePolicy):
+        """
+        Changes the policy. The entries are dropped, as the
+        new cache may not be able to hold them.
+
+        :param policy: How the cache should behave
+        """
+        if policy.kind == "weak":
+            cache = InterningTable(policy.maxsize)
+        else:
+            if policy.maxbytes is not None:
+                # Cachetools can only bound one quantity. Bytes are bounded by
+                # it, and entries are bounded here, in __setitem__.
+                bound, getsizeof = policy.maxbytes, sys.getsizeof
+            elif policy.maxsize is None or policy.kind == "unbounded":
+                bound, getsizeof = float("inf"), None
+            else:
+                bound, getsizeof = policy.maxsize, None
+            if policy.kind == "lru":
+                cache = cachetools.LRUCache(bound, getsizeof)
+            elif policy.kind == "lfu":
+                cache = cachetools.LFUCache(bound, getsizeof)
+            elif policy.kind == "ttl":
+                cache = cachetools.TTLCache(bound, policy.ttl, getsizeof=getsizeof)
+            else:
+                cache = cachetools.Cache(bound, getsizeof)
+        with self.lock:
+            self.policy = policy
+            self._cache = cache
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self.lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                self.stats.misses += 1
+                raise
+            self.stats.hits += 1
+            return value
+
+    def _store(self, key: Hashable, value: Any):
+        # Stores while counting whatever the store evicted. Call under the lock.
+        expected = len(self._cache) + (key not in self._cache)
+        self._cache[key] = value
+        if self.policy.maxbytes is not None and self.policy.maxsize is not None and self.policy.kind != "unbounded":
+            while len(self._cache) > self.policy.maxsize:
+                self._cache.popitem()
+        self.stats.evictions += max(expected - len(self._cache), 0)
+
+    def __setitem__(self, key: Hashable, value: Any):
+        with self.lock:
+            self._store(key, value)
+
+    def setdefault(self, key: Hashable, value: Any = None) -> Any:
+        """
+        Stores value under key, unless something is already stored there.
+        This is atomic, so the first of several racing threads wins.
+
+        :param key: The key to store under
+        :param value: The value to store
+        :return: The value now stored under key
+        """
+        with self.lock:
+            if isinstance(self._cache, InterningTable):
+                return self._cache.setdefault(key, value)
+            if key in self._cache:
+                return self._cache[key]
+            try:
+                self._store(key, value)
+            except ValueError:
+                # Too large to ever be cached, as with cachetools itself.
+                pass
+            return value
+
+    def __delitem__(self, key: Hashable):
+        with self.lock:
+            del self._cache[key]
+
+    def __iter__(self) -> Iterator[Hashable]:
+        with self.lock:
+            return iter(list(self._cache))
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self._cache)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            return key in self._cache
+
+    def clear(self):
+        """
+        Drops every entry, and resets the counters.
+        """
+        with self.lock:
+            self._cache.clear()
+            self.stats = CacheStats()
+
+    def memory_usage(self) -> int:
+        """
+        Approximates the bytes held by the entries. For weak
+        caches, the values are not counted.
+
+        :return: The approximate size, in bytes
+        """
+        with self.lock:
+            if isinstance(self._cache, InterningTable):
+                return self._cache.memory_usage()
+            return sum(_entry_size(key, value) for key, value in list(self._cache.items()))
+
+    def report(self) -> Dict[str, Any]:
+        """
+        :return: The policy, current size, and counters, as a dict
+        """
+        with self.lock:
+            return {"policy": asdict(self.policy),
+                    "entries": len(self),
+                    "bytes": self.memory_usage(),
+                    **asdict(self.stats),
+                    "hit_rate": self.stats.hit_rate}
+
+###
+# Define context local settings. These have a process wide default,
+# which may be overridden within a thread or asyncio task.
+###
+
+_unset = object()
+
+class ContextSetting:
+    """
+    A setting with a process wide default, which can be overridden in
+    the current context alone. Overrides are held in a contextvars.ContextVar,
+    so they follow the thread or asyncio task that made them, and can be
+    pushed and popped in O(1) without any lock. Threads and tasks that never
+    override the setting see the default.
+    """
+    def __init__(self, name: str, default: Any):
+        """
+        :param name: The name of the setting, for the ContextVar
+        :param default: The process wide default
+        """
+        self.default = default
+        self.override: contextvars.ContextVar = contextvars.ContextVar(name, default=_unset)
+
+    def get(self) -> Any:
+        value = self.override.get()
+        return self.default if value is _unset else value
+
+    def set(self, value: Any):
+        """
+        Changes the setting as seen from here. Within an override, only
+        the override changes. Otherwise, the process wide default does.
+        """
+        if self.override.get() is _unset:
+            self.default = value
+        else:
+            self.override.set(value)
+
+    def push(self, value: Any) -> contextvars.Token:
+        """
+        Overrides the setting in the current context.
+
+        :return: A token, for pop to restore the previous value with
+        """
+        return self.override.set(value)
+
+    def pop(self, token: contextvars.Token):
+        self.override.reset(token)
+
 ###
 # Define module fields all in one place
 #
 ##
 class StateData:
-    def get_cache(self, name: str):
-        if name not in self.
+    def get_cache(self, name: str, weak: bool = False) -> ManagedCache:
+        cache = self.caches.get(name)
+        if cache is not None:
+            return cache
+        with self.lock:
+            if name not in self.caches:
+                policy = self.cache_policies.get(name)
+                if policy is None:
+                    policy = CachePolicy("weak", maxsize=None) if weak else CachePolicy(maxsize=cache_size)
+                self.caches[name] = ManagedCache(name, policy)
+            return self.caches[name]
 
     def __init__(self):
-        self.caches: Dict[str, 'Cache'] = {}
-        self.final_callback: Optional[Callable[[Exception, ...], None]] = None
-        self.success_callback: Optional[Callable[[Operand, ...], None]] = None
+        self.lock = threading.RLock()
+        self.caches: Dict[str, ManagedCache] = {}
+        self.cache_policies: Dict[str, CachePolicy] = {}
+        self.interning_table: InterningTable = InterningTable()
+        self.link_table: InterningTable = InterningTable()
+        self.final_callback = ContextSetting("final_callback", None)
+        self.success_callback = ContextSetting("success_callback", None)
+        self.execution_backend = ContextSetting("execution_backend", "callback")
+        self.validation_enabled = ContextSetting("validation_enabled", True)
 state = StateData()
 
 ###
@@ -39,7 +476,7 @@ state = StateData()
 cache_size = 2000
 
 
-def get_cache(name: str):
+def get_cache(name: str, weak: bool = False) -> ManagedCache:
     """
     Fetches a cache associated with something.
 
@@ -47,11 +484,92 @@ def get_cache(name: str):
     same name, you get the same cache.
 
     :param name: The name of the cache
+    :param weak: If set, and the cache does not exist yet and has no policy
+                 set, it is made with the "weak" policy. Values then stay
+                 cached only as long as something else is using them.
     :return: The cache entity.
     """
-    if name not in state.caches:
-        state.caches[name] = cachetools.LFUCache(cache_size)
-    return state.caches[name]
+    return state.get_cache(name, weak)
+
+def set_cache_policy(name: str, policy: CachePolicy):
+    """
+    Sets the policy of a named cache. If the cache already exists, it is
+    reconfigured in place and its entries dropped. Otherwise, the policy is
+    used once it is first fetched.
+
+    :param name: The name of the cache
+    :param policy: How the cache should behave
+    """
+    with state.lock:
+        state.cache_policies[name] = policy
+        if name in state.caches:
+            state.caches[name].configure(policy)
+
+def get_cache_policy(name: str) -> Optional[CachePolicy]:
+    """
+    Gets the policy a named cache has, or will have once fetched.
+
+    :param name: The name of the cache
+    :return: The policy, or None if the cache does not exist and no policy was set
+    """
+    if name in state.caches:
+        return state.caches[name].policy
+    return state.cache_policies.get(name)
+
+def cache_report() -> Dict[str, Dict[str, Any]]:
+    """
+    Reports on every registered cache. Each entry holds the policy, the
+    number of entries, their approximate bytes, and the hit, miss, and
+    eviction counters.
+
+    :return: A dict mapping each cache name onto its report
+    """
+    with state.lock:
+        caches = list(state.caches.items())
+    return {name: cache.report() for name, cache in caches}
+
+def clear_caches():
+    """
+    Empties every registered cache and resets its counters. This is
+    mostly useful between tests. The interning table is left alone, as
+    clearing it would let identical live validators stop being identical.
+    """
+    with state.lock:
+        caches = list(state.caches.values())
+    for cache in caches:
+        cache.clear()
+
+def get_interning_table() -> InterningTable:
+    """
+    Fetches the table validator instances are interned in. This
+    can be used to inspect how many chains are currently alive,
+    and roughly how much memory the table is using.
+
+    :return: The interning table
+    """
+    return state.interning_table
+
+def get_link_table() -> InterningTable:
+    """
+    Fetches the table that maps a node spec, together with the identity
+    of the interned validator it links to, onto the interned validator
+    for the resulting chain. It lets construction skip building a chain
+    when the validator already exists.
+
+    :return: The link table
+    """
+    return state.link_table
+
+
+def set_interning_bound(maxsize: Optional[int]):
+    """
+    Bounds the interning table to at most maxsize chains, forgetting the
+    least recently used ones first. None removes the bound, in which case
+    entries only disappear when their validators are garbage collected.
+
+    :param maxsize: The maximum number of interned chains, or None
+    """
+    state.interning_table.set_maxsize(maxsize)
 
 ###
 # Define final exception callback methods and also create
@@ -67,7 +585,7 @@ def set_exception_callback(callback: Optional[Callable[[Exception, ...], None]])
     :param callback: A callback that accepts an exception and a kwarg collection, or None
     """
     #TODO: wrap in validator here?
-    state.final_callback = callback
+    state.final_callback.set(callback)
 
 def get_exception_callback()->Optional[Callable[[Exception, ...], None]]:
     """
@@ -76,7 +594,7 @@ def get_exception_callback()->Optional[Callable[[Exception, ...], None]]:
 
     :return: A callback that accepts an exception and kwarg collection, or None
     """
-    return state.final_callback
+    return state.final_callback.get()
 
 class ExceptionCallbackContextManager:
     def __init__(self, new_callback: Optional[Callable[[Exception, ...], None]]):
@@ -86,14 +604,13 @@ class ExceptionCallbackContextManager:
         :param new_callback: The new exception callback to set when entering the context.
         """
         self.new_callback = new_callback
-        self.old_callback = None
+        self.token = None
 
     def __enter__(self):
         """
-        Set the new exception callback and save the old one.
+        Set the new exception callback, for the current thread or task only.
         """
-        self.old_callback = get_exception_callback()  # Save the old callback
-        set_exception_callback(self.new_callback)  # Set the new callback
+        self.token = state.final_callback.push(self.new_callback)  # Override the callback
         return self  # You can return anything here, or nothing
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -104,11 +621,75 @@ class ExceptionCallbackContextManager:
         :param exc_val: The exception value, if an exception was raised.
         :param exc_tb: The traceback, if an exception was raised.
         """
-        set_exception_callback(self.old_callback)  # Restore the old callback
+        state.final_callback.pop(self.token)  # Restore the old callback
         # Return False to propagate any exceptions that occurred in the context
         return False
 
 
+###
+# Define the global methods, and context manager,
+# for turning validation off entirely
+###
+
+def set_validation_enabled(enabled: bool):
+    """
+    Turns validation on or off globally. When off, calling a validator
+    returns the operand untouched, at trace time. Nothing is traced, hashed,
+    or added to the jaxpr, so jitted code is exactly as if no validators existed.
+
+    Since the setting is read while tracing, and is not part of the jit
+    cache key, it only affects functions traced after it changes. A function
+    jitted and called before the change keeps validating, or not, exactly as
+    when it was traced. To switch an already jitted function, make the
+    switch one of its static arguments, and enter ValidationEnabledContextManager
+    inside it, or jit it again.
+
+    :param enabled: Whether validation should run
+    """
+    state.validation_enabled.set(enabled)
+
+def is_validation_enabled() -> bool:
+    """
+    Gets whether validation is currently turned on
+    :return: True if validators should run
+    """
+    return state.validation_enabled.get()
+
+class ValidationEnabledContextManager:
+    """
+    Turns validation on or off within the context. Like set_validation_enabled,
+    this only affects functions traced within the context. Calling a function
+    that was already jitted runs it as it was traced.
+    """
+    def __init__(self, enabled: bool):
+        """
+        Initialize the context manager with whether validation should run.
+
+        :param enabled: Whether validation should run inside the context.
+        """
+        self.enabled = enabled
+        self.token = None
+
+    def __enter__(self):
+        """
+        Turn validation on or off, for the current thread or task only.
+        """
+        self.token = state.validation_enabled.push(self.enabled)  # Override the setting
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Restore the old setting when exiting the context.
+
+        :param exc_type: The exception type, if an exception was raised in the context.
+        :param exc_val: The exception value, if an exception was raised.
+        :param exc_tb: The traceback, if an exception was raised.
+        """
+        state.validation_enabled.pop(self.token)  # Restore the old setting
+        # Do not suppress exceptions, if any occurred within the context
+        return False
+
+
 ###
 # Define the global methods, and context manager,
 # for handling success callbacks
@@ -124,14 +705,14 @@ def set_success_callback(callback: Optional[Callable[[Operand, ...], None]]):
     :param callback: A callback accepting the Operand and **kwargs. Or none, to have no callback
     """
     #TODO: wrap in validator here?
-    state.success_callback = callback
+    state.success_callback.set(callback)
 
 def get_success_callback():
     """
     This gets the current success callback context, whatever it might be
     :return: A callback accepting the Operand and **kwargs. Or none.
     """
-    return state.success_callback
+    return state.success_callback.get()
 
 class SuccessCallbackContextManager:
     def __init__(self, new_callback: Optional[Callable[[Operand, ...], None]]):
@@ -141,14 +722,13 @@ class SuccessCallbackContextManager:
         :param new_callback: The new success callback to set when entering the context.
         """
         self.new_callback = new_callback
-        self.old_callback = None
+        self.token = None
 
     def __enter__(self):
         """
-        Set the new success callback and save the old one.
+        Set the new success callback, for the current thread or task only.
         """
-        self.old_callback = get_success_callback()  # Save the old callback
-        set_success_callback(self.new_callback)  # Set the new callback
+        self.token = state.success_callback.push(self.new_callback)  # Override the callback
         return self  # You can return anything here, or nothing
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -159,6 +739,129 @@ class SuccessCallbackContextManager:
         :param exc_val: The exception value, if an exception was raised.
         :param exc_tb: The traceback, if an exception was raised.
         """
-        set_success_callback(self.old_callback)  # Restore the old callback
+        state.success_callback.pop(self.token)  # Restore the old callback
+        # Do not suppress exceptions, if any occurred within the context
+        return False
+
+
+###
+# Define the global methods, and context manager,
+# for selecting the execution backend validation runs on
+###
+
+execution_backends = ("callback", "checkify")
+
+def _check_execution_backend(backend: str):
+    if backend not in execution_backends:
+        raise ValueError(f"Execution backend must be one of {execution_backends}, but got '{backend}'")
+
+def set_execution_backend(backend: str):
+    """
+    Selects the execution backend used when a validator is called. The options are
+
+    - "callback": The default. Exceptions are created and handled under a jax.debug.callback
+    - "checkify": Each predicate becomes a jax.experimental.checkify check. Validation must
+                  then be run under checkify.checkify, and the error handled afterwards.
+
+    :param backend: The name of the backend to use
+    """
+    _check_execution_backend(backend)
+    state.execution_backend.set(backend)
+
+def get_execution_backend() -> str:
+    """
+    Gets the name of the currently selected execution backend
+    :return: The backend name
+    """
+    return state.execution_backend.get()
+
+class ExecutionBackendContextManager:
+    def __init__(self, new_backend: str):
+        """
+        Initialize the context manager with the new execution backend.
+
+        :param new_backend: The new execution backend to select when entering the context.
+        """
+        self.new_backend = new_backend
+        self.token = None
+
+    def __enter__(self):
+        """
+        Select the new execution backend, for the current thread or task only.
+        """
+        _check_execution_backend(self.new_backend)
+        self.token = state.execution_backend.push(self.new_backend)  # Override the backend
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Restore the old execution backend when exiting the context.
+
+        :param exc_type: The exception type, if an exception was raised in the context.
+        :param exc_val: The exception value, if an exception was raised.
+        :param exc_tb: The traceback, if an exception was raised.
+        """
+        state.execution_backend.pop(self.token)  # Restore the old backend
         # Do not suppress exceptions, if any occurred within the context
         return False
+
+
+###
+# Define snapshots of the context local settings, so they
+# can be carried over into another thread or task
+###
+
+@dataclass(frozen=True)
+class StateSnapshot:
+    """
+    The context local settings, as seen at one moment. Capturing is cheap,
+    and entering the snapshot as a context manager applies it as overrides
+    in the current thread or task, restoring whatever was there on exit.
+
+    This is how per request settings reach a worker thread, since plain
+    threads do not inherit context variables.
+
+    ```
+    snapshot = StateSnapshot.capture()
+    def work():
+        with snapshot:
+            validator(operand)
+    executor.submit(work)
+    ```
+    """
+    final_callback: Optional[Callable[[Exception, ...], None]]
+    success_callback: Optional[Callable[[Operand, ...], None]]
+    execution_backend: str
+    validation_enabled: bool
+
+    @classmethod
+    def capture(cls) -> 'StateSnapshot':
+        """
+        :return: The settings, as seen from the current thread or task
+        """
+        return cls(state.final_callback.get(),
+                   state.success_callback.get(),
+                   state.execution_backend.get(),
+                   state.validation_enabled.get())
+
+    def _settings(self) -> Tuple[Tuple[ContextSetting, Any], ...]:
+        return ((state.final_callback, self.final_callback),
+                (state.success_callback, self.success_callback),
+                (state.execution_backend, self.execution_backend),
+                (state.validation_enabled, self.validation_enabled))
+
+    def __enter__(self) -> 'StateSnapshot':
+        # A snapshot may be entered by many threads at once, so the
+        # tokens live in a context variable rather than on the snapshot.
+        tokens = tuple(setting.push(value) for setting, value in self._settings())
+        _snapshot_tokens.set(_snapshot_tokens.get() + (tokens,))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        stack = _snapshot_tokens.get()
+        _snapshot_tokens.set(stack[:-1])
+        for (setting, _), token in reversed(list(zip(self._settings(), stack[-1]))):
+            setting.pop(token)
+        return False
+
+_snapshot_tokens: contextvars.ContextVar = contextvars.ContextVar("snapshot_tokens", default=())
@@ -1,4 +1,4 @@
-from patching import Validator
+from .core import Validator
 from abc import ABC, abstractmethod
 from typing import Any, Optional, Tuple, Dict, Union
 
@@ -34,6 +34,10 @@ class TensorValidator(Validator, ABC):
         :return: An exception type
         """
 
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        # Fulfills the Validator contract in terms of the factory
+        return self.exception_factory(operand, **kwargs)
+
     def validate(self, operand: Any, **kwargs) -> Optional[Exception]:
         if not self.predicate(operand, **kwargs):
             return self.exception_factory(operand, **kwargs)
@@ -0,0 +1,524 @@
+"""
+The validation plan module works out, once per tree structure, which
+schema validator governs each leaf of an operand pytree.
+
+Matching a schema against an operand only depends on the two tree
+structures, never on the leaf values. A plan is therefore computed the
+first time a pair of structures is seen, and cached under the pair of
+treedefs. Later calls flatten both trees, look the plan up, and walk a
+flat list of (leaf index, validator) pairs.
+
+To make a plan, the schema is indexed into a trie keyed on key entries.
+Each operand leaf then finds its most specific schema leaf in a single
+descent. Wildcard entries, made with Each, match any key at their level.
+
+When one validator is broadcast over many leaves, walking the pairs means
+thousands of tiny dispatches. The leaves can instead be grouped by validator,
+shape and dtype, stacked, and validated once per group under jax.vmap.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import jax
+from jax import numpy as jnp
+from jax import tree_util
+from jax.tree_util import KeyPath, PyTreeDef
+
+from .core import Validator, CompiledValidator
+from .state import get_cache
+
+
+class TreeMatchError(Exception):
+    """
+    Raised when an operand tree is neither the same shape as,
+    nor broadcastable with, a schema tree.
+    """
+    def __init__(self,
+                 msg: str,
+                 schema_path: Optional[KeyPath] = None,
+                 operand_path: Optional[KeyPath] = None
+                 ):
+        super().__init__(msg)
+        self.msg = msg
+        self.schema_path = schema_path
+        self.operand_path = operand_path
+
+
+def is_schema_leaf(node: Any) -> bool:
+    # Validators flatten into no leaves at all, and None into an
+    # empty subtree. Both must be kept as leaves of a schema.
+    return node is None or isinstance(node, Validator)
+
+
+@dataclass(frozen=True)
+class ValidationPlan:
+    """
+    The static result of matching a schema tree against an operand tree.
+
+    Fields
+    ======
+
+    schema_paths: The key path of every schema leaf
+    operand_paths: The key path of every operand leaf
+    schema_indices: For every operand leaf, the index of the schema
+                    leaf that governs it
+    unmatched: The schema leaves governing no operand leaf, which face a
+               None or an empty container in the operand. These must be
+               None, which the structures alone cannot tell
+    """
+    schema_paths: Tuple[KeyPath, ...]
+    operand_paths: Tuple[KeyPath, ...]
+    schema_indices: Tuple[int, ...]
+    unmatched: Tuple[int, ...] = ()
+
+    def check(self, schema_leaves: Sequence[Optional[Validator]]):
+        """
+        Checks that no validator of the schema goes unused.
+
+        :param schema_leaves: The flattened schema, as returned by flatten_schema
+        :raise TreeMatchError: If a validator faces nothing in the operand
+        """
+        for schema_index in self.unmatched:
+            if schema_leaves[schema_index] is not None:
+                msg = "Schema tree had a leaf with no corresponding leaves in the operand tree"
+                raise TreeMatchError(msg, schema_path=self.schema_paths[schema_index])
+
+    def bind(self, schema_leaves: Sequence[Optional[Validator]]) -> List[Tuple[int, Optional[Validator]]]:
+        """
+        Pairs every operand leaf with its schema validator.
+
+        :param schema_leaves: The flattened schema, as returned by flatten_schema
+        :return: A list of (operand leaf index, validator) pairs. The validator
+                 is None where the schema had None.
+        """
+        return [(leaf_index, schema_leaves[schema_index])
+                for leaf_index, schema_index in enumerate(self.schema_indices)]
+
+
+def flatten_schema(schema: Any) -> Tuple[List[Optional[Validator]], PyTreeDef]:
+    """
+    :param schema: A pytree ending in validators or None
+    :return: The schema leaves, and the schema treedef
+    """
+    return tree_util.tree_flatten(schema, is_leaf=is_schema_leaf)
+
+
+@dataclass(frozen=True)
+class AnyKey:
+    """
+    The key entry of a wildcard. In a schema path, it
+    stands for any key at all at that level.
+    """
+    def __str__(self) -> str:
+        return "[*]"
+
+
+@tree_util.register_pytree_with_keys_class
+class Each:
+    """
+    A wildcard schema node. Every child of the matching operand
+    node is governed by the same subschema, however many children
+    there are, and whatever their keys.
+
+    For instance, {"layers": Each({"weight": Finite(), "bias": None})}
+    validates the weight of every layer, for any number of layers.
+    """
+    def __init__(self, schema: Any):
+        """
+        :param schema: The subschema applied to every child
+        """
+        self.schema = schema
+
+    def tree_flatten_with_keys(self):
+        return ((AnyKey(), self.schema),), None
+
+    def tree_flatten(self):
+        return (self.schema,), None
+
+    @classmethod
+    def tree_unflatten(cls, aux_data: Any, children: Sequence[Any]) -> 'Each':
+        return cls(*children)
+
+
+class KeyPathTrie:
+    """
+    An index of the leaves of a schema, as a trie keyed on key entries.
+
+    Each trie node maps key entries to child nodes, may have a wildcard
+    child, and may end a schema path, in which case it holds the index
+    of that schema leaf. Matching an operand path is then a single descent
+    rather than a comparison against every schema path.
+
+    Fields
+    ======
+
+    paths: The key path of every schema leaf
+    treedef: The treedef of the schema the trie was built from
+    """
+    def __init__(self):
+        self.children: Dict[Any, 'KeyPathTrie'] = {}
+        self.wildcard: Optional['KeyPathTrie'] = None
+        self.index: Optional[int] = None
+        self.paths: Tuple[KeyPath, ...] = ()
+        self.treedef: Optional[PyTreeDef] = None
+
+    def insert(self, path: KeyPath, index: int):
+        """
+        :param path: The schema path to add. AnyKey entries become wildcards
+        :param index: The schema leaf index to store at the end of the path
+        """
+        node = self
+        for entry in path:
+            if isinstance(entry, AnyKey):
+                if node.wildcard is None:
+                    node.wildcard = KeyPathTrie()
+                node = node.wildcard
+            else:
+                node = node.children.setdefault(entry, KeyPathTrie())
+        node.index = index
+
+    @classmethod
+    def from_schema(cls, schema: Any) -> 'KeyPathTrie':
+        """
+        :param schema: A pytree ending in validators or None
+        :return: The trie indexing every leaf of the schema
+        """
+        schema_leaves, treedef = tree_util.tree_flatten_with_path(schema, is_leaf=is_schema_leaf)
+        trie = cls()
+        trie.paths = tuple(path for path, _ in schema_leaves)
+        trie.treedef = treedef
+        for index, path in enumerate(trie.paths):
+            trie.insert(path, index)
+        return trie
+
+    def match(self, path: KeyPath, broadcast: bool, position: int = 0) -> Optional[int]:
+        """
+        Finds the schema leaf governing an operand path. Exact key entries
+        are preferred over wildcards, and both over broadcasting from a
+        schema leaf higher up.
+
+        :param path: The operand path
+        :param broadcast: Whether a schema leaf may govern the whole subtree below it
+        :param position: Where in the path this node sits
+        :return: The schema leaf index, or None if nothing matches
+        """
+        if position == len(path):
+            return self.index
+        child = self.children.get(path[position])
+        if child is not None:
+            index = child.match(path, broadcast, position + 1)
+            if index is not None:
+                return index
+        if self.wildcard is not None:
+            index = self.wildcard.match(path, broadcast, position + 1)
+            if index is not None:
+                return index
+        return self.index if broadcast else None
+
+
+def make_plan(schema: Any,
+              operand: Any,
+              broadcast: bool,
+              trie: Optional[KeyPathTrie] = None
+              ) -> ValidationPlan:
+    """
+    Matches a schema against an operand, leaf by leaf. Each operand leaf
+    is governed by the most specific schema leaf matching its path or,
+    when broadcasting, a prefix of its path.
+
+    :param schema: A pytree ending in validators or None
+    :param operand: The operand pytree
+    :param broadcast: Whether schema leaves may govern whole subtrees of the operand
+    :param trie: Optionally, the schema already indexed by KeyPathTrie.from_schema
+    :return: The plan
+    :raise TreeMatchError: If the trees are incompatible
+    """
+    if trie is None:
+        trie = KeyPathTrie.from_schema(schema)
+    operand_leaves, _ = tree_util.tree_flatten_with_path(operand)
+    schema_paths = trie.paths
+    operand_paths = tuple(path for path, _ in operand_leaves)
+
+    schema_indices = []
+    used = [False] * len(schema_paths)
+    for operand_path in operand_paths:
+        schema_index = trie.match(operand_path, broadcast)
+        if schema_index is None:
+            msg = "Schema tree was not broadcast with, or the same shape as, operand tree"
+            raise TreeMatchError(msg, operand_path=operand_path)
+        schema_indices.append(schema_index)
+        used[schema_index] = True
+
+    # Operand nodes holding no leaves at all, such as None or an empty
+    # list, leave the schema leaves facing them with nothing to match.
+    hollow_paths = {path for path, node in tree_util.tree_leaves_with_path(operand, is_leaf=is_hollow)
+                    if is_hollow(node)}
+    unmatched = []
+    for schema_index, was_used in enumerate(used):
+        if was_used:
+            continue
+        schema_path = schema_paths[schema_index]
+        if AnyKey() in schema_path:
+            # A wildcard over an empty container matches nothing, and that is fine
+            if schema_path[:schema_path.index(AnyKey())] in hollow_paths:
+                continue
+        elif schema_path in hollow_paths:
+            unmatched.append(schema_index)
+            continue
+        msg = "Schema tree had a leaf with no corresponding leaves in the operand tree"
+        raise TreeMatchError(msg, schema_path=schema_path)
+
+    plan = ValidationPlan(schema_paths, operand_paths, tuple(schema_indices), tuple(unmatched))
+    if schema is not None:
+        plan.check(flatten_schema(schema)[0])
+    return plan
+
+
+def is_hollow(node: Any) -> bool:
+    # None, empty containers, and containers of those
+    return tree_util.tree_structure(node).num_leaves == 0
+
+
+plan_cache = get_cache("ValidationPlans")
+
+
+def get_plan(schema: Any,
+             operand: Any,
+             broadcast: bool,
+             trie: Optional[KeyPathTrie] = None
+             ) -> Tuple[ValidationPlan, List[Optional[Validator]], List[Any]]:
+    """
+    Gets the plan for matching a schema against an operand, making
+    it only if this pair of structures has not been seen before.
+
+    :param schema: A pytree ending in validators or None
+    :param operand: The operand pytree
+    :param broadcast: Whether schema leaves may govern whole subtrees of the operand
+    :param trie: Optionally, a trie cached alongside the schema. It is only
+                 used if it was built from a schema of the same structure.
+    :return: The plan, the schema leaves, and the operand leaves
+    :raise TreeMatchError: If the trees are incompatible
+    """
+    schema_leaves, schema_treedef = flatten_schema(schema)
+    operand_leaves, operand_treedef = tree_util.tree_flatten(operand)
+    key = (schema_treedef, operand_treedef, broadcast)
+    plan = plan_cache.get(key)
+    if plan is None:
+        if trie is not None and trie.treedef != schema_treedef:
+            trie = None
+        plan = plan_cache.setdefault(key, make_plan(schema, operand, broadcast, trie))
+    else:
+        # Which leaves are None is not part of the structure
+        plan.check(schema_leaves)
+    return plan, schema_leaves, operand_leaves
+
+
+@dataclass(frozen=True)
+class LeafGroup:
+    """
+    Operand leaves that share a validator, a shape, and a dtype,
+    and so can be stacked and validated in one pass.
+
+    Fields
+    ======
+
+    validator: The validator governing every leaf of the group
+    leaf_indices: The operand leaf indices in the group, in order
+    stacked: Whether the leaves are stacked and vmapped over. Leaves
+             which are not arrays, such as strings, cannot be, and get
+             a group of their own
+    """
+    validator: Validator
+    leaf_indices: Tuple[int, ...]
+    stacked: bool = True
+
+
+@dataclass(frozen=True)
+class LeafFailure:
+    """
+    A leaf which failed grouped validation, scattered
+    back to where it sits in the operand.
+    """
+    leaf_index: int
+    operand_path: KeyPath
+    schema_path: KeyPath
+    exception: Exception
+
+
+def bind_compiled(plan: ValidationPlan,
+                  schema_leaves: Sequence[Optional[Validator]],
+                  wrap: Optional[Callable[[Optional[Validator]], Optional[Validator]]] = None
+                  ) -> List[Tuple[int, CompiledValidator]]:
+    """
+    Pairs every operand leaf with its compiled schema validator. Each
+    distinct schema validator is wrapped and compiled only once. Leaves
+    with no validator are left out.
+
+    :param plan: The plan, from get_plan
+    :param schema_leaves: The schema leaves, from get_plan
+    :param wrap: Optionally, applied to each schema validator first, such as to add a header and tail
+    :return: A list of (operand leaf index, compiled validator) pairs
+    """
+    compiled: Dict[int, Optional[CompiledValidator]] = {}
+    pairs = []
+    for leaf_index, schema_index in enumerate(plan.schema_indices):
+        if schema_index not in compiled:
+            validator = schema_leaves[schema_index]
+            validator = wrap(validator) if wrap is not None else validator
+            compiled[schema_index] = CompiledValidator(validator) if validator is not None else None
+        if compiled[schema_index] is not None:
+            pairs.append((leaf_index, compiled[schema_index]))
+    return pairs
+
+
+def make_leaf_failure(plan: ValidationPlan,
+                      leaf_index: int,
+                      nodes: Sequence[Validator],
+                      failure_index: int,
+                      leaf: Any,
+                      **kwargs
+                      ) -> LeafFailure:
+    """
+    Creates the exception of a failing leaf, and runs it through the
+    handlers of the chain, just as if the leaf had been validated alone.
+
+    :param plan: The plan, from get_plan
+    :param leaf_index: The operand leaf which failed
+    :param nodes: The nodes of the compiled validator governing the leaf
+    :param failure_index: The index of the node which failed
+    :param leaf: The operand leaf
+    :param kwargs: The kwargs conditioning the validation
+    :return: The failure, located in both trees
+    """
+    failed_node = nodes[failure_index]
+    payload = failed_node._execute_summarize(leaf, **kwargs)
+    exception = failed_node._execute_create_exception(payload, **kwargs)
+    for node in reversed(nodes[:failure_index + 1]):
+        exception = node._execute_handle(exception, **kwargs)
+    return LeafFailure(leaf_index,
+                       plan.operand_paths[leaf_index],
+                       plan.schema_paths[plan.schema_indices[leaf_index]],
+                       exception)
+
+
+def validate_each(plan: ValidationPlan,
+                  schema_leaves: Sequence[Optional[Validator]],
+                  operand_leaves: Sequence[Any],
+                  wrap: Optional[Callable[[Optional[Validator]], Optional[Validator]]] = None,
+                  **kwargs
+                  ) -> List[LeafFailure]:
+    """
+    Validates every operand leaf on its own, and creates the
+    exceptions of those which failed. This runs on the host.
+
+    :param plan: The plan, from get_plan
+    :param schema_leaves: The schema leaves, from get_plan
+    :param operand_leaves: The operand leaves, from get_plan
+    :param wrap: Optionally, applied to each schema validator first, such as to add a header and tail
+    :param kwargs: The kwargs conditioning the validation
+    :return: The failures, in operand leaf order
+    """
+    failures = []
+    for leaf_index, compiled in bind_compiled(plan, schema_leaves, wrap):
+        leaf = operand_leaves[leaf_index]
+        failure_index = int(compiled._find_failure_index(leaf, **kwargs))
+        if failure_index != len(compiled.nodes):
+            failures.append(make_leaf_failure(plan, leaf_index, compiled.nodes, failure_index, leaf, **kwargs))
+    return failures
+
+
+def is_array_leaf(leaf: Any) -> bool:
+    # Only these have a shape and dtype, and can be stacked. Anything else,
+    # strings included, would be misread by jnp.result_type, or rejected
+    return isinstance(leaf, (jax.Array, np.ndarray, np.generic, bool, int, float, complex))
+
+
+def group_leaves(plan: ValidationPlan,
+                 schema_leaves: Sequence[Optional[Validator]],
+                 operand_leaves: Sequence[Any],
+                 wrap: Optional[Callable[[Optional[Validator]], Optional[Validator]]] = None
+                 ) -> List[LeafGroup]:
+    """
+    Groups the operand leaves by validator, shape, and dtype. Leaves
+    with no validator are left out. Leaves which are not arrays, or python
+    scalars, have no shape or dtype, and are each placed in a group of their own.
+
+    :param plan: The plan, from get_plan
+    :param schema_leaves: The schema leaves, from get_plan
+    :param operand_leaves: The operand leaves, from get_plan
+    :param wrap: Optionally, applied to each schema validator first, such as to add a header and tail
+    :return: The groups, in order of their first leaf
+    """
+    groups: Dict[Tuple[Validator, Any, Any], List[int]] = {}
+    wrapped: Dict[int, Optional[Validator]] = {}
+    for leaf_index, schema_index in enumerate(plan.schema_indices):
+        if schema_index not in wrapped:
+            validator = schema_leaves[schema_index]
+            wrapped[schema_index] = wrap(validator) if wrap is not None else validator
+        validator = wrapped[schema_index]
+        if validator is None:
+            continue
+        leaf = operand_leaves[leaf_index]
+        if is_array_leaf(leaf):
+            key = (validator, jnp.shape(leaf), jnp.result_type(leaf))
+        else:
+            # The leaf index keeps the key unique
+            key = (validator, None, leaf_index)
+        groups.setdefault(key, []).append(leaf_index)
+    return [LeafGroup(key[0], tuple(indices), key[1] is not None) for key, indices in groups.items()]
+
+
+def find_group_failures(group: LeafGroup,
+                        compiled: CompiledValidator,
+                        operand_leaves: Sequence[Any],
+                        **kwargs
+                        ) -> jax.Array:
+    """
+    Stacks the leaves of a group, and evaluates the validator against
+    all of them at once under jax.vmap. This is jit compatible. A group
+    which is not stacked holds a single leaf, which is validated alone.
+
+    :param group: The group to validate
+    :param compiled: The group's validator, compiled
+    :param operand_leaves: The operand leaves, from get_plan
+    :param kwargs: The kwargs conditioning the validation. These are not batched
+    :return: For each leaf of the group, the index of the first failing node of
+             the validator, or the validator's length if the leaf passed
+    """
+    if not group.stacked:
+        return jnp.stack([compiled._find_failure_index(operand_leaves[leaf_index], **kwargs)
+                          for leaf_index in group.leaf_indices])
+    stacked = jnp.stack([operand_leaves[leaf_index] for leaf_index in group.leaf_indices])
+    return jax.vmap(lambda leaf: compiled._find_failure_index(leaf, **kwargs))(stacked)
+
+
+def validate_grouped(plan: ValidationPlan,
+                     schema_leaves: Sequence[Optional[Validator]],
+                     operand_leaves: Sequence[Any],
+                     wrap: Optional[Callable[[Optional[Validator]], Optional[Validator]]] = None,
+                     **kwargs
+                     ) -> List[LeafFailure]:
+    """
+    Validates every operand leaf, one vmapped pass per group. Failing
+    leaves then have their exceptions created and handled, one by one,
+    just as if they had been validated alone.
+
+    :param plan: The plan, from get_plan
+    :param schema_leaves: The schema leaves, from get_plan
+    :param operand_leaves: The operand leaves, from get_plan
+    :param wrap: Optionally, applied to each schema validator first, such as to add a header and tail
+    :param kwargs: The kwargs conditioning the validation
+    :return: The failures, in operand leaf order
+    """
+    failures = []
+    for group in group_leaves(plan, schema_leaves, operand_leaves, wrap):
+        compiled = CompiledValidator(group.validator)
+        failure_indices = np.asarray(find_group_failures(group, compiled, operand_leaves, **kwargs))
+        nodes = compiled.nodes
+        for row in np.nonzero(failure_indices != len(nodes))[0]:
+            leaf_index = group.leaf_indices[row]
+            failures.append(make_leaf_failure(plan, leaf_index, nodes, int(failure_indices[row]),
+                                              operand_leaves[leaf_index], **kwargs))
+    failures.sort(key=lambda failure: failure.leaf_index)
+    return failures
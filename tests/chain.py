@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from src.validation import chain as chain_module
+from src.validation.chain import Chain
+
+
+class TestChain(unittest.TestCase):
+    def assertBalanced(self, chain: Chain):
+        def height(node):
+            if node is None:
+                return 0
+            left, right = height(node.left), height(node.right)
+            self.assertLessEqual(abs(left - right), 1)
+            self.assertEqual(node.height, max(left, right) + 1)
+            self.assertTrue(1 <= len(node.chunk.items) <= chain_module.chunk_size)
+            return node.height
+        height(chain)
+
+    def test_reading(self):
+        chain = Chain.from_items(range(100))
+        self.assertEqual(list(chain), list(range(100)))
+        self.assertEqual(len(chain), 100)
+        self.assertEqual(chain[37], 37)
+        self.assertEqual(chain[-1], 99)
+        self.assertEqual(chain.first, 0)
+        self.assertEqual(list(chain[10:20]), list(range(10, 20)))
+        with self.assertRaises(IndexError):
+            chain[100]
+
+    def test_hash_independent_of_construction(self):
+        built = Chain.from_items(range(100))
+        consed = None
+        for i in reversed(range(100)):
+            consed = Chain.cons(i, consed)
+        concatenated = Chain.from_items(range(40)).concat(Chain.from_items(range(40, 100)))
+        for other in (consed, concatenated):
+            self.assertEqual(hash(other), hash(built))
+            self.assertEqual(other, built)
+        self.assertNotEqual(Chain.from_items(range(1, 101)), built)
+
+    def test_editing_matches_lists(self):
+        rng = random.Random(0)
+        reference = list(range(50))
+        chain = Chain.from_items(reference)
+        for _ in range(500):
+            operation = rng.randrange(5)
+            index = rng.randrange(len(reference))
+            if operation == 0:
+                items = [rng.randrange(1000) for _ in range(rng.randrange(1, 40))]
+                chain = chain.insert(index, Chain.from_items(items))
+                reference[index:index] = items
+            elif operation == 1 and len(reference) > 1:
+                chain = chain.remove(index)
+                del reference[index]
+            elif operation == 2:
+                chain = chain.replace(index, -index)
+                reference[index] = -index
+            elif operation == 3:
+                chain = Chain.cons(index, chain)
+                reference.insert(0, index)
+            elif operation == 4 and len(reference) > 2:
+                chain = chain[1:]
+                reference = reference[1:]
+            self.assertBalanced(chain)
+            self.assertEqual(list(chain), reference)
+            self.assertEqual(chain, Chain.from_items(reference))
+
+    def test_edits_share_structure(self):
+        chain = Chain.from_items(range(10000))
+        edited = chain.replace(0, -1)
+        self.assertIs(edited.right, chain.right)
+
+        left, right = chain.split(5000)
+        self.assertEqual(len(left), 5000)
+        self.assertEqual(right.first, 5000)
+
+    def test_long_append_stays_shallow(self):
+        chain = None
+        for i in range(20000):
+            chain = Chain.from_items([i]) if chain is None else chain.concat(Chain.from_items([i]))
+        self.assertBalanced(chain)
+        self.assertLessEqual(chain.height, 16)
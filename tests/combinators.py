@@ -0,0 +1,96 @@
+import unittest
+import jax
+from typing import Any
+from jax import numpy as jnp
+from src.validation.core import Validator
+from src.validation.combinators import NOf
+from tests.helpers import find_equations, Observer, Logger, Dtype
+
+
+class InRange(Validator):
+    def __init__(self, low: float, high: float):
+        self.low = low
+        self.high = high
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all((operand >= self.low) & (operand <= self.high))
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError(f"Expected values in [{self.low}, {self.high}]")
+
+
+class TestCombinators(unittest.TestCase):
+    """
+    Test the | operator, and the any_of, all_of, and n_of combinators.
+    """
+    def run_compiled(self, validator: Validator, operand: Any) -> list:
+        observer = Observer()
+        jax.jit((Logger(observer) & validator).compile())(operand)
+        jax.effects_barrier()
+        return observer.errors
+
+    def test_or_is_one_node(self):
+        validator = Dtype("int32") | Dtype("float32") | Dtype("bool")
+        self.assertIsInstance(validator, NOf)
+        self.assertEqual(len(validator), 1)
+        self.assertEqual(validator.required, 1)
+        self.assertEqual(len(validator.branches), 3)
+
+    def test_combinators_are_interned(self):
+        first = Dtype("int32") | Dtype("float32")
+        second = Validator.any_of(Dtype("int32"), Dtype("float32"))
+        self.assertIs(first, second)
+        self.assertIsNot(first, Dtype("float32") | Dtype("int32"))
+
+    def test_any_of(self):
+        validator = Dtype("int32") | (Dtype("float32") & InRange(0.0, 1.0))
+        self.assertEqual(self.run_compiled(validator, jnp.arange(3, dtype=jnp.int32)), [])
+        self.assertEqual(self.run_compiled(validator, jnp.full([3], 0.5)), [])
+
+        errors = self.run_compiled(validator, jnp.full([3], 2.0))
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], ExceptionGroup)
+        self.assertIsInstance(errors[0].exceptions[0], TypeError)
+        self.assertIsInstance(errors[0].exceptions[1], ValueError)
+
+    def test_all_of_reports_every_failing_branch(self):
+        validator = Validator.all_of(Dtype("int32"), InRange(0.0, 1.0), InRange(-1.0, 0.0))
+        errors = self.run_compiled(validator, jnp.full([3], 0.5))
+        self.assertEqual(len(errors), 1)
+        self.assertEqual([type(item) for item in errors[0].exceptions], [TypeError, ValueError])
+
+    def test_n_of(self):
+        validator = Validator.n_of(2, Dtype("float32"), InRange(0.0, 1.0), InRange(-1.0, 0.0))
+        self.assertEqual(self.run_compiled(validator, jnp.full([3], 0.5)), [])
+        self.assertEqual(len(self.run_compiled(validator, jnp.full([3], 2.0))), 1)
+
+    def test_bad_requirement(self):
+        with self.assertRaises(ValueError):
+            Validator.n_of(3, Dtype("int32"), Dtype("float32"))
+        with self.assertRaises(ValueError):
+            Validator.any_of()
+
+    def test_static_branches_stay_static(self):
+        validator = Dtype("int32") | (Dtype("float32") & Dtype("float32"))
+        self.assertIs(validator.predicate(jnp.ones([3])), True)
+        self.assertIs(validator.predicate(jnp.ones([3], dtype=jnp.int8)), False)
+
+        # On the default path, a static failure is handled while tracing,
+        # and nothing is left for the compiled function to do
+        observer = Observer()
+        chain = Logger(observer) & validator
+        jaxpr = jax.make_jaxpr(lambda x: chain(x))(jnp.ones([3], dtype=jnp.int8))
+        self.assertEqual(find_equations(jaxpr, "cond"), [])
+        self.assertEqual(find_equations(jaxpr, "callback"), [])
+        self.assertEqual(len(observer.errors), 1)
+        self.assertIsInstance(observer.errors[0], ExceptionGroup)
+
+    def test_traced_branch_stays_traced(self):
+        validator = Dtype("int32") | InRange(0.0, 1.0)
+        self.assertIsInstance(validator.predicate(jnp.full([3], 0.5)), jax.Array)
+        self.assertEqual(self.run_compiled(validator, jnp.full([3], 2.0))[0].exceptions[1].args,
+                         ("Expected values in [0.0, 1.0]",))
+
+    def test_one_cond_in_jaxpr(self):
+        # The only cond guards the host callback. The branches add none
+        validator = Dtype("int32") | (Dtype("float32") & InRange(0.0, 1.0))
+        jaxpr = jax.make_jaxpr(validator.compile())(jnp.ones([3]))
+        self.assertEqual(len(find_equations(jaxpr, "cond")), 1)
@@ -1,9 +1,20 @@
+import gc
+import weakref
+import threading
 import unittest
+from unittest import mock
 import jax
 from typing import Any, Optional, Tuple, Callable
-from src.validation.core import ValidatorException, Validator
+from src.validation.core import (ValidatorException, Validator, ValidationErrorState, ViolationSummary,
+                                 CompiledValidator)
+from src.validation.chain import Chain
 from jax import numpy as jnp
 from src.validation import patching
+from src.validation.state import (ExecutionBackendContextManager, ValidationEnabledContextManager, is_validation_enabled,
+                                  SuccessCallbackContextManager, ExceptionCallbackContextManager,
+                                  get_interning_table, set_interning_bound)
+from jax.experimental import checkify
+from tests.helpers import find_equations, Observer, Pass, Fail, Logger, Suppress, Throw, Positive, Even, NonNegative
 
 jax.config.update("jax_traceback_filtering","off")
 
@@ -60,6 +71,25 @@ class ValidatorInitializationTests(unittest.TestCase):
         second_validator = self.MockValidator(_next_validator=first_validator)
         self.assertIs(second_validator.next_validator, first_validator)
 
+    def test_init_runs_once_before_interning(self):
+        calls = []
+
+        class CountedInit(Validator):
+            def __init__(self, name: str):
+                # Nothing else may see the instance until init is done
+                calls.append(get_interning_table().get(self._key))
+                self.name = name
+            def predicate(self, operand, **kwargs) -> bool:
+                return True
+            def create_exception(self, operand: Any, **kwargs) -> Exception:
+                return Exception()
+
+        first = CountedInit("counted")
+        second = CountedInit("counted")
+        self.assertIs(first, second)
+        self.assertEqual(calls, [None])
+        self.assertEqual(first.name, "counted")
+
 
 class TestHashFunction(unittest.TestCase):
     """
@@ -202,18 +232,112 @@ class TestLinkedList(unittest.TestCase):
 
     This includes automated merging, and the various helper functions.
     """
+    class ChainNode(Validator):
+        def __init__(self, name: str):
+            self.name = name
+        def predicate(self, operand: Any, **kwargs) -> bool:
+            return True
+        def create_exception(self, operand: Any, **kwargs) -> Exception:
+            return Exception(self.name)
+
+    def make_chain(self, *names: str) -> Validator:
+        chain = self.ChainNode(names[0])
+        for name in names[1:]:
+            chain = chain & self.ChainNode(name)
+        return chain
+
     def test_link_by_and(self):
-        raise NotImplementedError()
+        chain = self.ChainNode("a") & self.ChainNode("b")
+        self.assertEqual(len(chain), 2)
+        self.assertEqual(chain.name, "a")
+        self.assertEqual(chain.next_validator.name, "b")
+        self.assertIs(chain.next_validator, self.ChainNode("b"))
+        self.assertIs(chain, self.ChainNode("a") & self.ChainNode("b"))
     def test_append(self):
-        raise NotImplementedError()
+        chain = self.make_chain("a", "b")
+        appended = chain.append(self.make_chain("c", "d"))
+        self.assertIsNot(appended, chain)
+        self.assertEqual(len(chain), 2)
+        self.assertEqual([node.name for node in appended.walk(lambda node: node)], ["a", "b", "c", "d"])
+        self.assertIs(appended, self.make_chain("a", "b", "c", "d"))
+    def test_length_and_hash_stored(self):
+        chain = self.make_chain("a", "b", "c")
+        self.assertEqual(len(chain), 3)
+        self.assertEqual(len(chain.next_validator), 2)
+        self.assertEqual(hash(chain), chain._key.hash_value)
+        self.assertNotEqual(hash(chain), hash(self.make_chain("a", "c", "b")))
+
+        # However the chain was put together, the same nodes give the same chain
+        regrouped = self.ChainNode("a") & (self.ChainNode("b") & self.ChainNode("c"))
+        self.assertIs(regrouped, chain)
+    def test_long_composition(self):
+        # Appending one node at a time shares structure with the previous chain
+        chain = self.ChainNode("0")
+        for i in range(1, 5000):
+            chain = chain & self.ChainNode(str(i))
+        self.assertEqual(len(chain), 5000)
+        self.assertEqual(chain.fetch(4321).name, "4321")
+        self.assertLessEqual(chain._key.height, 2 * 13)
+    def names(self, chain: Validator) -> list:
+        return [node.name for node in chain.walk(lambda node: node)]
     def test_insert(self):
-        raise NotImplementedError()
+        chain = self.make_chain("a", "b", "c")
+        self.assertEqual(self.names(chain.insert(1, self.make_chain("x", "y"))), ["a", "x", "y", "b", "c"])
+        self.assertEqual(self.names(chain.insert(3, self.ChainNode("x"))), ["a", "b", "c", "x"])
+        self.assertIs(chain.insert(0, self.ChainNode("x")), self.make_chain("x", "a", "b", "c"))
+        with self.assertRaises(IndexError):
+            chain.insert(4, self.ChainNode("x"))
     def test_fetch(self):
-        raise NotImplementedError()
+        chain = self.make_chain("a", "b", "c")
+        self.assertIs(chain.fetch(0), self.ChainNode("a"))
+        self.assertIs(chain.fetch(2), self.ChainNode("c"))
+        self.assertIs(chain.fetch(-2), self.ChainNode("b"))
+        self.assertFalse(chain.fetch(1).has_next)
+        with self.assertRaises(IndexError):
+            chain.fetch(3)
     def test_slice(self):
-        raise NotImplementedError()
+        chain = self.make_chain("a", "b", "c", "d")
+        self.assertIs(chain[1:3], self.make_chain("b", "c"))
+        self.assertIs(chain[-2:], self.make_chain("c", "d"))
+        self.assertIs(chain[2], self.ChainNode("c"))
+        self.assertIs(chain.without_head(), self.make_chain("b", "c", "d"))
+        self.assertIs(chain.without_tail(), self.make_chain("a", "b", "c"))
+        with self.assertRaises(IndexError):
+            chain[2:2]
+        with self.assertRaises(ValueError):
+            self.ChainNode("a").without_head()
+    def test_remove_and_replace(self):
+        chain = self.make_chain("a", "b", "c")
+        self.assertIs(chain.remove(1), self.make_chain("a", "c"))
+        self.assertIs(chain.remove(-1), self.make_chain("a", "b"))
+        self.assertIs(chain.replace(0, self.ChainNode("x")), self.make_chain("x", "b", "c"))
+        self.assertIs(chain.replace(1, self.make_chain("x", "y")), self.make_chain("a", "x", "y", "c"))
+        with self.assertRaises(ValueError):
+            self.ChainNode("a").remove(0)
+        with self.assertRaises(IndexError):
+            chain.replace(3, self.ChainNode("x"))
+    def test_split(self):
+        chain = self.make_chain("a", "b", "c")
+        head, tail = chain.split(1)
+        self.assertIs(head, self.ChainNode("a"))
+        self.assertIs(tail, self.make_chain("b", "c"))
+        self.assertIs(head & tail, chain)
+        with self.assertRaises(IndexError):
+            chain.split(0)
+    def test_edits_memoized(self):
+        terminal = self.make_chain("terminal", "raise")
+        body = self.make_chain("a", "b")
+        capped = terminal & body
+        with mock.patch.object(Chain, "concat", side_effect=AssertionError("Edit was not memoized")):
+            self.assertIs(terminal & body, capped)
+            self.assertIs(terminal.append(body), capped)
     def test_walk(self):
-        raise NotImplementedError()
+        chain = self.make_chain(*[str(i) for i in range(3000)])
+        names = list(chain.walk(lambda node: node.name))
+        self.assertEqual(names, [str(i) for i in range(3000)])
+        items, treedef = jax.tree_util.tree_flatten(chain)
+        self.assertIs(jax.tree_util.tree_unflatten(treedef, items), chain)
+    @unittest.skip("Validators do not have a string representation yet")
     def test_str_representation(self):
         raise NotImplementedError()
 
@@ -259,6 +383,32 @@ class TestJitPytreeMechanisms(unittest.TestCase):
         new_validator = jax.tree_util.tree_unflatten(treedef, items)
         self.assertIs(new_validator, validator)
 
+    def test_flatten_is_cached(self):
+        init_calls = []
+        class CountsInit(Validator):
+            def __init__(self, name: str):
+                init_calls.append(name)
+            def predicate(self, operand: Any, **kwargs) -> bool:
+                return True
+            def create_exception(self, operand: Any, **kwargs) -> Exception:
+                return Exception("Never raised")
+
+        validator = CountsInit("a") & CountsInit("b")
+        self.assertIs(validator.tree_flatten(), validator.tree_flatten())
+
+        init_calls.clear()
+        _, treedef = jax.tree_util.tree_flatten(validator)
+        self.assertIs(jax.tree_util.tree_unflatten(treedef, []), validator)
+        self.assertEqual(init_calls, [])
+
+    def test_unflatten_after_collection(self):
+        _, treedef = jax.tree_util.tree_flatten(self.MockValidatorWithInit("rebuilt") & self.MockValidator())
+        gc.collect()
+        rebuilt = jax.tree_util.tree_unflatten(treedef, [])
+        self.assertEqual(rebuilt.do_raise, "rebuilt")
+        self.assertIsInstance(rebuilt.next_validator, self.MockValidator)
+        self.assertEqual(jax.tree_util.tree_structure(rebuilt), treedef)
+
     def test_chained_callback(self):
         class logging_observer:
             def __init__(self):
@@ -288,13 +438,17 @@ class TestJitPytreeMechanisms(unittest.TestCase):
 
 class ValidatorLinkedListTests(unittest.TestCase):
     class MockValidator(Validator):
-        def validate(self, operand: Any, **kwargs) -> Optional[Exception]:
+        def predicate(self, operand: Any, **kwargs) -> bool:
+            return True
+        def create_exception(self, operand: Any, **kwargs) -> Exception:
             # Satisfies abstract
-            return None
+            return Exception()
     class MockOtherValidator(Validator):
-        def validate(self, operand: Any, **kwargs) -> Optional[Exception]:
+        def predicate(self, operand: Any, **kwargs) -> bool:
+            return True
+        def create_exception(self, operand: Any, **kwargs) -> Exception:
             # Satisfies abstract
-            return None
+            return Exception()
     def test_append(self):
 
         to_append = self.MockOtherValidator()
@@ -321,10 +475,13 @@ class ValidateBehavior(unittest.TestCase):
         kwarg = {"test" : 3}
 
         class KwargPassthrough(Validator):
-            def validate(slf, operand: Any, **kwargs) -> Optional[Exception]:
+            def predicate(slf, operand: Any, **kwargs) -> bool:
                 self.assertIn("test", kwargs)
                 self.assertIs(kwargs["test"], 3)
-            def handle(slf, exception: Exception, **kwargs) ->Optional[Exception]:
+                return True
+            def create_exception(slf, operand: Any, **kwargs) -> Exception:
+                return Exception("This should never happen")
+            def handle_exception(slf, exception: Exception, **kwargs) -> Exception:
                 self.assertIn("test", kwargs)
                 self.assertIs(kwargs["test"], 3)
                 return exception
@@ -333,72 +490,644 @@ class ValidateBehavior(unittest.TestCase):
                 self.assertIs(kwargs["test"], 3)
                 return True
 
-        class ProduceError(Validator):
-            def validate(self, operand: Any, **kwargs) -> Optional[Exception]:
-                return Exception()
-
-        chain = KwargPassthrough() & KwargPassthrough() & ProduceError()
+        observer = Observer()
+        chain = Logger(observer) & KwargPassthrough() & KwargPassthrough() & Fail("produced")
         chain(None, **kwarg)
+        self.assertEqual([str(item) for item in observer.errors], ["produced"])
 
     def test_validate_method(self):
         class MockValidator(Validator):
             def __init__(self, do_raise: bool):
                 self.do_raise = do_raise
-            def validate(self, operand: Any, **kwargs) -> Optional[Exception]:
-                if self.do_raise:
-                    return Exception()
+            def predicate(self, operand: Any, **kwargs) -> bool:
+                return jnp.logical_not(self.do_raise)
+            def create_exception(self, operand: Any, **kwargs) -> Exception:
+                return Exception("raised")
 
-        validator = MockValidator(True)
-        self.assertIsInstance(validator(3), Exception)
+        observer = Observer()
+        (Logger(observer) & MockValidator(True))(3)
+        jax.effects_barrier()
+        self.assertEqual([str(item) for item in observer.errors], ["raised"])
+
+        observer = Observer()
+        (Logger(observer) & MockValidator(False))(3)
+        jax.effects_barrier()
+        self.assertEqual(observer.errors, [])
 
-        validator = MockValidator(False)
-        self.assertIsNone(validator(3))
     def test_supression_predicate(self):
 
         # Define a chain of three things. The first should use the chain
         # predicate to shut down any further checking, and the second should throw
         # an error
 
-        class ThrowError(Validator):
-            def validate(self, operand: Any, **kwargs) -> Optional[Exception]:
-                raise Exception()
-        class SuppressError(Validator):
-            def validate(self, operand: Any, **kwargs) -> Optional[Exception]:
-                return None
-            def chain_predicate(self, **kwargs):
-                return False
-
-        chain = SuppressError() & ThrowError()
+        chain = Throw() & Suppress(True) & Fail()
 
         # Check that the error is in fact being prevented
         chain(3)
 
     def test_simple_chain_behavior(self):
-        validator_chain = ThrowValidator() & PositiveValidator() & EvenValidator()
-        with self.assertRaises(Exception) as context:
-            validator_chain(-2)  # Should fail PositiveValidator
-        self.assertIn("positive", str(context.exception))
+        observer = Observer()
+        validator_chain = Logger(observer) & Positive() & Even()
+        validator_chain(-2)  # Should fail Positive
+        validator_chain(3)  # Should pass Positive but fail Even
+        jax.effects_barrier()
+        self.assertEqual([str(item) for item in observer.errors],
+                         ["Operand must be positive", "Operand must be even"])
+
+    def test_chain_predicate_error_chained(self):
+        class MissingKwarg(Pass):
+            def chain_predicate(self, **kwargs) -> bool:
+                return kwargs["active"]
+
+        with self.assertRaises(ValidatorException) as err:
+            (MissingKwarg() & Fail())(3)
+        self.assertIsInstance(err.exception.__cause__, KeyError)
 
-        with self.assertRaises(Exception) as context:
-            validator_chain(3)  # Should pass PositiveValidator but fail EvenValidator
-        self.assertIn("even", str(context.exception))
+
+class TestDefaultPathUnderJit(unittest.TestCase):
+    """
+    Test the default, node by node, execution path when the
+    predicates and chain predicates are traced.
+    """
+    class Gate(Validator):
+        def predicate(self, operand: Any, **kwargs) -> bool:
+            return True
+        def create_exception(self, operand: Any, **kwargs) -> Exception:
+            return Exception("This should never happen")
+        def chain_predicate(self, active: Any, **kwargs) -> bool:
+            return jnp.asarray(active, dtype=bool)
+
+    def test_traced_predicate(self):
+        observer = Observer()
+        validate = jax.jit(Logger(observer) & Positive() & Even())
+        for operand in [jnp.full([3], 2), jnp.full([3], -2), jnp.full([3], 3)]:
+            self.assertTrue(bool(jnp.all(validate(operand) == operand)))
+        jax.effects_barrier()
+        self.assertEqual([str(item) for item in observer.errors],
+                         ["Operand must be positive", "Operand must be even"])
+
+    def test_traced_chain_predicate(self):
+        observer = Observer()
+        chain = Logger(observer) & self.Gate() & Fail("gated")
+        validate = jax.jit(lambda operand, active: chain(operand, active=active, step=3))
+        validate(jnp.ones([3]), jnp.asarray(False))
+        jax.effects_barrier()
+        self.assertEqual(observer.errors, [])
+        validate(jnp.ones([3]), jnp.asarray(True))
+        jax.effects_barrier()
+        self.assertEqual([str(item) for item in observer.errors], ["gated"])
+
+    def test_long_traced_chain(self):
+        # Each traced node adds conds one after another, rather than
+        # nested, so long chains do not recurse
+        observer = Observer()
+        chain = Logger(observer)
+        for _ in range(250):
+            chain = chain & Positive() & self.Gate()
+        chain = chain & Fail("deep")
+        validate = jax.jit(lambda operand, active: chain(operand, active=active))
+        validate(jnp.ones([3]), jnp.asarray(False))
+        validate(jnp.ones([3]), jnp.asarray(True))
+        validate(-jnp.ones([3]), jnp.asarray(True))
+        jax.effects_barrier()
+        self.assertEqual([str(item) for item in observer.errors], ["deep", "Operand must be positive"])
+
+        jaxpr = jax.make_jaxpr(lambda operand, active: chain(operand, active=active))(jnp.ones([3]), True)
+        top_level = [eqn for eqn in jaxpr.eqns if "cond" in str(eqn.primitive)]
+        self.assertEqual(len(top_level), len(find_equations(jaxpr, "cond")))
+
+    def test_static_kwargs_stay_static(self):
+        # Kwargs are closed over by the cond branches rather than passed
+        # through them, so python values reach the predicates unchanged
+        seen = []
+
+        class Record(Pass):
+            def predicate(self, operand: Any, **kwargs) -> bool:
+                seen.append(kwargs["mode"])
+                return True
+
+        jax.jit(lambda operand: (Positive() & Record())(operand, mode="strict"))(jnp.ones([3]))
+        self.assertEqual(seen, ["strict"])
+
+
+class TestDefaultPathCallbacks(unittest.TestCase):
+    """
+    Test that the default path reads its final callbacks from
+    state, as the compiled path does.
+    """
+    def test_exception_callback_context(self):
+        seen = []
+        with ExceptionCallbackContextManager(lambda exception, **kwargs: seen.append(str(exception))):
+            jax.jit(lambda x: Positive()(x))(-jnp.ones([3]))
+            jax.effects_barrier()
+        jax.jit(lambda x: Positive()(x))(-jnp.ones([2]))
+        jax.effects_barrier()
+        self.assertEqual(seen, ["Operand must be positive"])
+
+    def test_context_around_jitted_call(self):
+        # The function is traced before the context is entered, so the
+        # callback must be looked up when the call runs
+        seen = []
+        validate = jax.jit(lambda x: Positive()(x))
+        validate(-jnp.ones([3]))
+        jax.effects_barrier()
+        with ExceptionCallbackContextManager(lambda exception, **kwargs: seen.append(str(exception))):
+            validate(-jnp.ones([3]))
+            jax.effects_barrier()
+        validate(-jnp.ones([3]))
+        jax.effects_barrier()
+        self.assertEqual(seen, ["Operand must be positive"])
+
+    def test_success_callback_runs_per_call(self):
+        seen = []
+        validate = jax.jit(lambda x: Positive()(x))
+        with SuccessCallbackContextManager(lambda operand, **kwargs: seen.append(float(operand.sum()))):
+            validate(jnp.ones([3]))
+            validate(2 * jnp.ones([3]))
+            validate(-jnp.ones([3]))
+            jax.effects_barrier()
+        self.assertEqual(seen, [3.0, 6.0])
+
+    def test_no_success_callback_no_host_call(self):
+        jaxpr = jax.make_jaxpr(lambda x: Pass()(x))(jnp.ones([3]))
+        self.assertEqual(find_equations(jaxpr, "callback"), [])
 
 
 class ValidatorCachingTests(unittest.TestCase):
     #TODO: Need more tests
     def test_validator_caching(self):
-        first_instance = PositiveValidator()
-        second_instance = PositiveValidator()
+        first_instance = Positive()
+        second_instance = Positive()
         self.assertIs(first_instance, second_instance)
 
     def test_validator_caching_with_different_params(self):
-        first_instance = PositiveValidator()
-        second_instance = EvenValidator()  # Different validator subclass
+        first_instance = Positive()
+        second_instance = Even()  # Different validator subclass
         self.assertIsNot(first_instance, second_instance)
     def test_caching_with_chaining(self):
-        chain_one = PositiveValidator() & PositiveValidator() & PositiveValidator()
-        chain_two = PositiveValidator() & PositiveValidator() & PositiveValidator()
+        chain_one = Positive() & Positive() & Positive()
+        chain_two = Positive() & Positive() & Positive()
         self.assertIs(chain_one, chain_two)
     def test_merge_chains(self):
-        chain_one = PositiveValidator() & PositiveValidator()
-        chain_two = chain_one & chain_one
\ No newline at end of file
+        chain_one = Positive() & Positive()
+        chain_two = chain_one & chain_one
+        self.assertEqual(len(chain_two), 4)
+        self.assertIs(chain_two, Positive() & Positive() & Positive() & Positive())
+
+class TestInterning(unittest.TestCase):
+    class InternedNode(Validator):
+        def __init__(self, threshold: float):
+            self.threshold = threshold
+        def predicate(self, operand: Any, **kwargs) -> bool:
+            return True
+        def create_exception(self, operand: Any, **kwargs) -> Exception:
+            return Exception("Never raised")
+
+    def test_identical_chains_reused(self):
+        chain = self.InternedNode(1.0) & self.InternedNode(2.0)
+        self.assertIs(chain, self.InternedNode(1.0) & self.InternedNode(2.0))
+
+    def test_equal_leaves_of_other_types_not_shared(self):
+        # 1, 1.0 and True are equal in python, but may validate differently
+        nodes = [self.InternedNode(1), self.InternedNode(1.0), self.InternedNode(True)]
+        self.assertEqual(len({id(node) for node in nodes}), 3)
+        self.assertEqual([type(node.threshold) for node in nodes], [int, float, bool])
+        self.assertIs(self.InternedNode(1.0) & nodes[0], self.InternedNode(1.0) & self.InternedNode(1))
+        self.assertIsNot(nodes[1] & nodes[0], nodes[1] & nodes[2])
+
+    def test_colliding_hashes_not_swapped(self):
+        # Both classes share a module and name, so every part of their
+        # hash is the same. Only the structural key tells them apart.
+        def make_class():
+            class Colliding(Validator):
+                def predicate(self, operand: Any, **kwargs) -> bool:
+                    return True
+                def create_exception(self, operand: Any, **kwargs) -> Exception:
+                    return Exception("Never raised")
+            return Colliding
+
+        first_class, second_class = make_class(), make_class()
+        first, second = first_class(), second_class()
+        self.assertEqual(hash(first), hash(second))
+        self.assertIsNot(first, second)
+        self.assertIsInstance(second, second_class)
+
+        tail = self.InternedNode(3.0)
+        self.assertIsInstance(first_class(_next_validator=tail), first_class)
+        self.assertIsInstance(second_class(_next_validator=tail), second_class)
+
+    def test_unused_chains_collected(self):
+        table = get_interning_table()
+        gc.collect()
+        start = len(table)
+        chains = [self.InternedNode(float(i)) & self.InternedNode(-1.0) for i in range(50)]
+        self.assertGreaterEqual(len(table), start + 50)
+        del chains
+        gc.collect()
+        self.assertLessEqual(len(table), start + 1)
+
+    def test_forgotten_chains_not_reused(self):
+        # A validator dropped from a bounded table must not come back
+        # through the shortcut that skips building its chain
+        tail = self.InternedNode(-5.0)
+        first = self.InternedNode(3000.0, _next_validator=tail)
+        self.assertIs(self.InternedNode(3000.0, _next_validator=tail), first)
+        set_interning_bound(1)
+        try:
+            self.InternedNode(3001.0)
+            self.assertIsNot(self.InternedNode(3000.0, _next_validator=tail), first)
+        finally:
+            set_interning_bound(None)
+
+    def test_cached_edits_do_not_pin(self):
+        # Each edit below returns the chain itself, or a chain ending in
+        # it, so a cache key holding it strongly would keep it alive forever
+        edits = [lambda chain: chain.fetch(0),
+                 lambda chain: chain[:],
+                 lambda chain: chain.insert(0, self.InternedNode(-3.0)),
+                 lambda chain: self.InternedNode(-4.0).append(chain)]
+        for edit in edits:
+            chain = self.InternedNode(2000.0)
+            reference = weakref.ref(chain)
+            edited = edit(chain)
+            self.assertIs(edit(chain), edited)
+            del chain, edited
+            gc.collect()
+            self.assertIsNone(reference())
+
+    def test_concurrent_construction_shares_instance(self):
+        # Many threads building the same fresh chains at once must all
+        # end up with the one interned instance per chain.
+        barrier = threading.Barrier(16)
+        built = [[] for _ in range(16)]
+
+        def build(slot: int):
+            barrier.wait()
+            for i in range(200):
+                built[slot].append(self.InternedNode(1000.0 + i) & self.InternedNode(-2.0))
+
+        threads = [threading.Thread(target=build, args=(slot,)) for slot in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(200):
+            self.assertEqual(len({id(chains[i]) for chains in built}), 1)
+
+class TestCompiledValidator(unittest.TestCase):
+    """
+    Test the compiled, or fused, execution mode. It should behave
+    the same as the chain it was compiled from, while lowering to
+    a single reduction instead of nested conds.
+    """
+    def test_first_failure_is_handled(self):
+        observer = Observer()
+        chain = Logger(observer) & Pass() & Fail("first") & Fail("second")
+        chain.compile()(jnp.ones([3]))
+        jax.effects_barrier()
+        self.assertEqual(len(observer.errors), 1)
+        self.assertEqual(str(observer.errors[0]), "first")
+
+    def test_chain_predicate_stops_validation(self):
+        observer = Observer()
+        chain = Logger(observer) & Suppress(True) & Fail("first")
+        chain.compile()(jnp.ones([3]))
+        jax.effects_barrier()
+        self.assertEqual(observer.errors, [])
+
+    def test_one_cond_in_jaxpr(self):
+        # The only cond guards the host callback, however long the chain is
+        chain = Pass() & Positive() & Pass() & Positive() & Fail("first")
+        jaxpr = jax.make_jaxpr(chain.compile())(jnp.ones([3]))
+        self.assertEqual(len(find_equations(jaxpr, "cond")), 1)
+
+    def test_passing_call_skips_host(self):
+        validators = [(Logger(Observer()) & Positive()).compile(),
+                      (Logger(Observer()) & NonNegative()).batched(),
+                      (Logger(Observer()) & Positive()).compile(aggregate=True)]
+        for validator in validators:
+            jaxpr = jax.make_jaxpr(validator)(jnp.ones([1000, 1000]))
+            self.assertEqual([eqn for eqn in jaxpr.eqns if "callback" in str(eqn.primitive)], [])
+            self.assertEqual(len(find_equations(jaxpr, "callback")), 1)
+
+        calls = []
+        with mock.patch.object(CompiledValidator, "_dispatch", lambda *args, **kwargs: calls.append(args)):
+            validator = (Logger(Observer()) & Positive()).compile()
+            jax.jit(validator)(jnp.ones([3]))
+            jax.effects_barrier()
+            self.assertEqual(calls, [])
+            jax.jit(validator)(-jnp.ones([3]))
+            jax.effects_barrier()
+            self.assertEqual(len(calls), 1)
+
+    def test_long_chain_of_traced_chain_predicates(self):
+        # Each traced chain predicate opens a cond, but the conds follow one
+        # another rather than nest, so long chains do not recurse
+        class Gate(Pass):
+            def chain_predicate(self, active: Any, **kwargs) -> bool:
+                return jnp.asarray(active, dtype=bool)
+
+        observer = Observer()
+        chain = Logger(observer)
+        for _ in range(300):
+            chain = chain & Positive() & Gate()
+        chain = chain & Fail("deep")
+        self.assertGreaterEqual(len(chain), 600)
+
+        compiled = chain.compile()
+        validate = jax.jit(lambda operand, active: compiled(operand, active=active))
+        validate(jnp.ones([3]), jnp.asarray(False))
+        validate(jnp.ones([3]), jnp.asarray(True))
+        jax.effects_barrier()
+        self.assertEqual([str(item) for item in observer.errors], ["deep"])
+
+        jaxpr = jax.make_jaxpr(lambda operand, active: compiled(operand, active=active))(jnp.ones([3]), True)
+        top_level = [eqn for eqn in jaxpr.eqns if "cond" in str(eqn.primitive)]
+        self.assertEqual(len(top_level), len(find_equations(jaxpr, "cond")))
+
+    def test_success_callback_still_called(self):
+        successes = []
+        with SuccessCallbackContextManager(lambda operand, **kwargs: successes.append(operand)):
+            (Pass() & Positive()).compile()(jnp.ones([3]))
+            jax.effects_barrier()
+        self.assertEqual(len(successes), 1)
+
+
+class TestFunctionalValidator(unittest.TestCase):
+    """
+    Test the functional execution mode, where an error state
+    is returned rather than handled by a host callback.
+    """
+    def test_error_state_records_failure(self):
+        chain = Pass() & Fail("failed") & Pass()
+        operand, error_state = jax.jit(chain.compile(functional=True))(jnp.ones([3]))
+        self.assertTrue(bool(error_state.failed))
+        self.assertEqual(int(error_state.failure_index), 1)
+        self.assertEqual(str(error_state.get_exception(operand)), "failed")
+
+    def test_error_state_passes(self):
+        chain = Pass() & Pass()
+        operand, error_state = chain.compile(functional=True)(jnp.ones([3]))
+        self.assertFalse(bool(error_state.failed))
+        self.assertIsNone(error_state.get_exception(operand))
+
+    def test_no_callbacks_in_jaxpr(self):
+        chain = Pass() & Fail("failed")
+        jaxpr = jax.make_jaxpr(chain.compile(functional=True))(jnp.ones([3]))
+        self.assertNotIn("callback", str(jaxpr))
+
+    def test_error_state_carried_through_scan(self):
+        chain = Pass() & Fail("failed")
+        functional = chain.compile(functional=True)
+
+        def step(error_state, operand):
+            operand, new_state = functional(operand)
+            return error_state.merge(new_state), operand
+
+        initial = ValidationErrorState.passed(chain)
+        error_state, _ = jax.lax.scan(step, initial, jnp.ones([4, 3]))
+        self.assertTrue(bool(error_state.failed))
+        self.assertEqual(int(error_state.failure_index), 1)
+
+
+class TestCheckifyValidator(unittest.TestCase):
+    """
+    Test the checkify backend, and that checkify errors map
+    back onto the node that failed.
+    """
+    def test_error_maps_to_failing_node(self):
+        observer = Observer()
+        validator = (Logger(observer) & Pass() & Fail("first") & Fail("second")).checkify()
+        error, operand = jax.jit(checkify.checkify(validator))(jnp.ones([3]))
+        self.assertEqual(validator.find_failing_node(error), 2)
+        validator.handle_error(error, operand)
+        self.assertEqual([str(item) for item in observer.errors], ["first"])
+
+    def test_passing_chain_has_no_error(self):
+        validator = (Pass() & Pass()).checkify()
+        error, _ = checkify.checkify(validator)(jnp.ones([3]))
+        self.assertIsNone(error.get())
+
+    def test_under_vmap(self):
+        validator = (Pass() & Fail("failed")).checkify()
+        error, _ = checkify.checkify(jax.vmap(validator))(jnp.ones([4, 3]))
+        self.assertEqual(validator.find_failing_node(error), 1)
+
+    def test_chains_told_apart(self):
+        first = (Pass() & Fail("first")).checkify()
+        second = (Pass() & Fail("second")).checkify()
+
+        def validate_both(operand):
+            return second(first(operand))
+
+        error, _ = checkify.checkify(validate_both)(jnp.ones([3]))
+        self.assertEqual(first.find_failing_node(error), 1)
+        with self.assertRaises(ValueError):
+            second.find_failing_node(error)
+
+    def test_selected_globally(self):
+        chain = Pass() & Fail("failed")
+        with ExecutionBackendContextManager("checkify"):
+            error, _ = checkify.checkify(chain)(jnp.ones([3]))
+        self.assertEqual(chain.checkify().find_failing_node(error), 1)
+
+
+class TestBatchedValidator(unittest.TestCase):
+    """
+    Test per-example validation of a batch, and that failing
+    rows are reported together.
+    """
+    def test_mask_and_failing_rows(self):
+        observer = Observer()
+        validator = (Logger(observer) & NonNegative()).batched()
+        operand = jnp.array([[1.0, 2.0], [-1.0, 2.0], [0.0, 0.0], [3.0, -3.0]])
+        _, mask = jax.jit(validator)(operand)
+        jax.effects_barrier()
+        self.assertEqual(mask.tolist(), [True, False, True, False])
+        self.assertEqual(len(observer.errors), 1)
+        self.assertEqual(observer.errors[0].failing_indices, [1, 3])
+        self.assertIsInstance(observer.errors[0].exception, ValueError)
+
+    def test_passing_batch_does_not_handle(self):
+        observer = Observer()
+        validator = (Logger(observer) & NonNegative()).batched(axis=1)
+        _, mask = validator(jnp.ones([2, 5]))
+        jax.effects_barrier()
+        self.assertEqual(mask.shape, (5,))
+        self.assertTrue(bool(jnp.all(mask)))
+        self.assertEqual(observer.errors, [])
+
+
+class TestStaticPredicates(unittest.TestCase):
+    """
+    Test that predicates returning concrete python bools are
+    resolved while tracing, rather than through jax.lax.cond.
+    """
+    class StaticShape(Validator):
+        def __init__(self, length: int):
+            self.length = length
+        def predicate(self, operand: Any, **kwargs) -> bool:
+            return operand.shape[0] == self.length
+        def create_exception(self, operand: Any, **kwargs) -> Exception:
+            return ValueError(f"Expected length {self.length}")
+
+    def test_passing_chain_adds_no_ops(self):
+        chain = Throw() & self.StaticShape(3) & self.StaticShape(3)
+        jaxpr = jax.make_jaxpr(chain)(jnp.ones([3]))
+        self.assertEqual(len(jaxpr.eqns), 0)
+
+    def test_failing_chain_raises_while_tracing(self):
+        chain = Throw() & self.StaticShape(3) & self.StaticShape(4)
+        with self.assertRaises(ValidatorException) as err:
+            jax.jit(chain)(jnp.ones([3]))
+        self.assertIsInstance(err.exception.__cause__, ValueError)
+
+
+class TestDisabledValidation(unittest.TestCase):
+    """
+    Test that turning validation off compiles it out entirely.
+    """
+    class DisabledFail(Validator):
+        def predicate(self, operand: Any, **kwargs) -> bool:
+            return jnp.all(operand < 0)
+        def create_exception(self, operand: Any, **kwargs) -> Exception:
+            return ValueError("This should never be created")
+
+    def test_disabled_hlo_matches_unwrapped(self):
+        validator = (self.DisabledFail() & self.DisabledFail()).compile()
+
+        def make_step(validate: bool):
+            def step(x):
+                if validate:
+                    x = validator(x)
+                return jnp.sin(x).sum()
+            return step
+
+        operand = jnp.ones([4])
+        unwrapped = jax.jit(make_step(False)).lower(operand).as_text()
+        with ValidationEnabledContextManager(False):
+            disabled = jax.jit(make_step(True)).lower(operand).as_text()
+        enabled = jax.jit(make_step(True)).lower(operand).as_text()
+        self.assertEqual(disabled, unwrapped)
+        self.assertNotEqual(enabled, unwrapped)
+
+    def test_disabled_call_traces_nothing(self):
+        validator = self.DisabledFail() & self.DisabledFail()
+        with ValidationEnabledContextManager(False):
+            jaxpr = jax.make_jaxpr(validator)(jnp.ones([4]))
+        self.assertEqual(len(jaxpr.eqns), 0)
+
+    def test_already_traced_function_unchanged(self):
+        # The setting is read while tracing, so functions traced before
+        # a change keep behaving as they were traced
+        observer = Observer()
+        validator = (Logger(observer) & self.DisabledFail()).compile()
+        enabled = jax.jit(lambda x: validator(x))
+        enabled(jnp.ones([4]))
+        with ValidationEnabledContextManager(False):
+            disabled = jax.jit(lambda x: validator(x))
+            disabled(jnp.ones([4]))
+            enabled(jnp.ones([4]))
+        disabled(jnp.ones([4]))
+        jax.effects_barrier()
+        self.assertEqual(len(observer.errors), 2)
+
+    def test_switch_as_static_argument(self):
+        observer = Observer()
+        validator = (Logger(observer) & self.DisabledFail()).compile()
+
+        def step(x, validate: bool):
+            with ValidationEnabledContextManager(validate):
+                return validator(x)
+
+        step = jax.jit(step, static_argnames="validate")
+        step(jnp.ones([4]), validate=True)
+        step(jnp.ones([4]), validate=False)
+        jax.effects_barrier()
+        self.assertEqual(len(observer.errors), 1)
+
+    def test_context_restores_setting(self):
+        with ValidationEnabledContextManager(False):
+            self.assertFalse(is_validation_enabled())
+        self.assertTrue(is_validation_enabled())
+
+
+class TestFailureSummaries(unittest.TestCase):
+    """
+    Test that validators declaring a summary ship only that
+    summary to the host, and hand it to create_exception.
+    """
+    class SummarizedProbability(Validator):
+        def predicate(self, operand: Any, **kwargs) -> bool:
+            return jnp.all((operand >= 0) & (operand <= 1))
+        def summarize(self, operand: Any, **kwargs) -> Any:
+            return ViolationSummary.from_violations(operand, (operand < 0) | (operand > 1))
+        def create_exception(self, summary: Any, **kwargs) -> Exception:
+            return ValueError(summary)
+
+    class SummaryLogger(Logger):
+        def summarize(self, operand: Any, **kwargs) -> Any:
+            return None
+
+    def test_summary_reaches_create_exception(self):
+        observer = Observer()
+        validator = (self.SummaryLogger(observer) & self.SummarizedProbability()).compile()
+        validator(jnp.array([[0.5, 1.5], [-1.0, 0.2]]))
+        jax.effects_barrier()
+        summary = observer.errors[0].args[0]
+        self.assertIsInstance(summary, ViolationSummary)
+        self.assertEqual(int(summary.count), 2)
+        self.assertEqual(tuple(int(item) for item in summary.first_index), (0, 1))
+        self.assertEqual(float(summary.maximum), 1.5)
+
+    @staticmethod
+    def largest_shipped(validator: Validator) -> int:
+        jaxpr = jax.make_jaxpr(validator.compile())(jnp.ones([1000]))
+        callback = find_equations(jaxpr, "callback")[0]
+        return max(var.aval.size for var in callback.invars)
+
+    def test_operand_not_shipped(self):
+        observer = Observer()
+        validator = self.SummaryLogger(observer) & self.SummarizedProbability()
+        self.assertLess(self.largest_shipped(validator), 1000)
+
+    def test_passthrough_needs_no_summary(self):
+        # Passthrough nodes never fail, so never need the operand
+        observer = Observer()
+        validator = Logger(observer) & self.SummarizedProbability()
+        self.assertLess(self.largest_shipped(validator), 1000)
+
+        validator.compile()(jnp.array([2.0, 0.5]))
+        jax.effects_barrier()
+        self.assertIsInstance(observer.errors[0].args[0], ViolationSummary)
+
+    def test_unreachable_needs_no_summary(self):
+        validator = self.SummarizedProbability() & Suppress(True) & Positive()
+        self.assertLess(self.largest_shipped(validator), 1000)
+
+    def test_reachable_without_summary_ships_operand(self):
+        validator = self.SummarizedProbability() & Suppress(False) & Positive()
+        self.assertEqual(self.largest_shipped(validator), 1000)
+
+
+class TestAggregateValidator(unittest.TestCase):
+    """
+    Test that the aggregate mode reports every failing node
+    in one pass, as an ExceptionGroup.
+    """
+    def test_every_failure_reported(self):
+        observer = Observer()
+        chain = Logger(observer) & Fail("first") & Pass() & Fail("second")
+        jax.jit(chain.compile(aggregate=True))(jnp.ones([3]))
+        jax.effects_barrier()
+        self.assertEqual(len(observer.errors), 1)
+        group = observer.errors[0]
+        self.assertIsInstance(group, ExceptionGroup)
+        self.assertEqual([str(item) for item in group.exceptions], ["first", "second"])
+
+    def test_passing_chain_not_handled(self):
+        observer = Observer()
+        chain = Logger(observer) & Pass()
+        chain.compile(aggregate=True)(jnp.ones([3]))
+        jax.effects_barrier()
+        self.assertEqual(observer.errors, [])
@@ -0,0 +1,127 @@
+"""
+Validators and helpers shared between the test modules.
+"""
+from typing import Any
+from jax import numpy as jnp
+from src.validation.core import Validator
+
+
+def find_equations(jaxpr: Any, name: str) -> list:
+    """
+    Finds every equation of a jaxpr whose primitive mentions the
+    name, including those nested inside cond, scan, and so on.
+    """
+    found = []
+    for eqn in jaxpr.eqns:
+        if name in str(eqn.primitive):
+            found.append(eqn)
+        for param in eqn.params.values():
+            for item in param if isinstance(param, (tuple, list)) else [param]:
+                if hasattr(item, "eqns"):
+                    found.extend(find_equations(item, name))
+    return found
+
+
+class Observer:
+    """
+    Records what the handlers of a chain were handed, and
+    the names of the handlers, in the order they ran.
+    """
+    def __init__(self):
+        self.errors = []
+        self.names = []
+
+
+class Pass(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return True
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return Exception("This should never happen")
+
+
+class Fail(Validator):
+    def __init__(self, message: str = "failed"):
+        self.message = message
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return False
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return Exception(self.message)
+
+
+class Noop(Pass):
+    passthrough = True
+
+
+class Logger(Noop):
+    def __init__(self, observer: Observer, name: str = "log"):
+        self.observer = observer
+        self.name = name
+    def handle_exception(self, exception: Exception, **kwargs) -> Exception:
+        self.observer.errors.append(exception)
+        self.observer.names.append(self.name)
+        return exception
+
+
+class Suppress(Noop):
+    def __init__(self, suppress: bool):
+        self.suppress = suppress
+    def chain_predicate(self, **kwargs) -> bool:
+        return not self.suppress
+
+
+class Throw(Noop):
+    def handle_exception(self, exception: Exception, **kwargs) -> Exception:
+        raise exception
+
+
+class Positive(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all(operand > 0)
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError("Operand must be positive")
+
+
+class Even(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all(operand % 2 == 0)
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError("Operand must be even")
+
+
+class NonNegative(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all(operand >= 0)
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError("Operand had negative entries")
+
+
+class Finite(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all(jnp.isfinite(operand))
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError("Expected finite values")
+
+
+class Probability(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all((operand >= 0.0) & (operand <= 1.0))
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError("Expected a probability")
+
+
+class Floating(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.issubdtype(operand.dtype, jnp.floating)
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return TypeError("Expected a floating dtype")
+
+
+class Dtype(Validator):
+    def __init__(self, dtype: str):
+        self.dtype = dtype
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return operand.dtype == jnp.dtype(self.dtype)
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return TypeError(f"Expected {self.dtype}")
+    def subsumes(self, other: Validator) -> bool:
+        return isinstance(other, Floating) and jnp.issubdtype(jnp.dtype(self.dtype), jnp.floating)
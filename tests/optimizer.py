@@ -0,0 +1,143 @@
+import unittest
+import jax
+from typing import Any
+from jax import numpy as jnp
+from src.validation.core import Validator
+from src.validation.optimizer import MergedPassthrough, OptimizationReport
+from tests.helpers import Observer, Floating, Dtype, Probability, Noop, Logger, Suppress
+
+
+class TestOptimize(unittest.TestCase):
+    """
+    Test that optimize shrinks chains without changing
+    what they accept, and reports what it removed.
+    """
+    def test_duplicates_removed(self):
+        chain = Probability() & Floating() & Probability() & Floating()
+        optimized, report = chain.optimize()
+        self.assertIs(optimized, Probability() & Floating())
+        self.assertIsInstance(report, OptimizationReport)
+        self.assertEqual([removal.index for removal in report.removed], [2, 3])
+        self.assertEqual((report.original_length, report.optimized_length), (4, 2))
+
+    def test_subsumed_removed(self):
+        optimized, report = (Floating() & Dtype("float32") & Probability()).optimize()
+        self.assertIs(optimized, Dtype("float32") & Probability())
+        self.assertIn("subsumed", report.removed[0].reason)
+
+        optimized, _ = (Dtype("float32") & Probability() & Floating()).optimize()
+        self.assertIs(optimized, Dtype("float32") & Probability())
+
+        # An int dtype check says nothing about floating point
+        chain = Floating() & Dtype("int32")
+        self.assertIs(chain.optimize()[0], chain)
+
+    def test_subsumed_not_moved_past_chain_predicate(self):
+        chain = Floating() & Suppress(True) & Dtype("float32")
+        optimized, _ = chain.optimize()
+        self.assertIs(optimized, chain)
+
+    def test_handlers_kept(self):
+        observer = Observer()
+        chain = Logger(observer, "first") & Probability() & Logger(observer, "first")
+        self.assertIs(chain.optimize()[0], chain)
+
+    def test_passthroughs_collapsed(self):
+        observer = Observer()
+        chain = (Noop()
+                 & Logger(observer, "outer")
+                 & Suppress(False)
+                 & Logger(observer, "inner")
+                 & Noop()
+                 & Probability())
+        optimized, report = chain.optimize()
+        self.assertEqual(len(optimized), 2)
+        self.assertIsInstance(optimized, MergedPassthrough)
+        self.assertEqual(len(report.removed), 5)
+
+        optimized.compile()(jnp.full([3], 2.0))
+        jax.effects_barrier()
+        self.assertEqual(observer.names, ["inner", "outer"])
+
+    def test_merged_chain_predicate(self):
+        observer = Observer()
+        chain = Logger(observer, "outer") & Suppress(True) & Probability()
+        optimized, _ = chain.optimize()
+        self.assertEqual(len(optimized), 2)
+        optimized.compile()(jnp.full([3], 2.0))
+        jax.effects_barrier()
+        self.assertEqual(observer.names, [])
+
+    def test_same_outcomes(self):
+        observer = Observer()
+        chain = Logger(observer, "log") & Floating() & Floating() & Dtype("float32") & Noop() & Probability()
+        optimized, _ = chain.optimize()
+        self.assertEqual(len(optimized), 3)
+        for operand in [jnp.full([3], 0.5), jnp.full([3], 2.0), jnp.ones([3], dtype=jnp.int32)]:
+            observer.names.clear()
+            chain.compile()(operand)
+            jax.effects_barrier()
+            expected = list(observer.names)
+            observer.names.clear()
+            optimized.compile()(operand)
+            jax.effects_barrier()
+            self.assertEqual(observer.names, expected)
+
+    def test_all_noops(self):
+        optimized, report = (Noop() & Noop()).optimize()
+        self.assertIs(optimized, Noop())
+        self.assertEqual(len(report.removed), 1)
+
+
+class Cheap(Validator):
+    reorderable = True
+    cost = 0.1
+    def __init__(self, name: str):
+        self.name = name
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return operand.ndim > 0
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError(self.name)
+
+
+class Expensive(Cheap):
+    cost = 10.0
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return jnp.all(jnp.isfinite(jnp.cumsum(jnp.sort(operand.ravel()))))
+
+
+class TestReorderByCost(unittest.TestCase):
+    """
+    Test that reordering sorts only the reorderable runs of a
+    chain, and never moves handlers or chain predicates.
+    """
+    def names(self, validator: Validator) -> list:
+        return [getattr(node, "name", type(node).__name__) for node in validator.walk(lambda node: node)]
+
+    def test_sorted_within_segment(self):
+        chain = Expensive("a") & Cheap("b") & Expensive("c") & Cheap("d")
+        self.assertEqual(self.names(chain.reorder_by_cost()), ["b", "d", "a", "c"])
+
+    def test_handlers_and_gates_stay(self):
+        observer = Observer()
+        chain = (Expensive("a") & Cheap("b")
+                 & Logger(observer, "log")
+                 & Expensive("c") & Probability() & Cheap("d")
+                 & Suppress(False)
+                 & Expensive("e") & Cheap("f"))
+        reordered = chain.reorder_by_cost()
+        self.assertEqual(self.names(reordered),
+                         ["b", "a", "log", "c", "Probability", "d", "Suppress", "f", "e"])
+
+    def test_explicit_costs(self):
+        chain = Cheap("a") & Cheap("b") & Cheap("c")
+        self.assertEqual(self.names(chain.reorder_by_cost((3.0, 1.0, 2.0))), ["b", "c", "a"])
+        with self.assertRaises(ValueError):
+            chain.reorder_by_cost((1.0,))
+
+    def test_profile(self):
+        chain = Expensive("a") & Cheap("b")
+        costs = chain.profile(jnp.ones([64, 64]), repeats=3)
+        self.assertEqual(len(costs), 2)
+        self.assertTrue(all(cost > 0 for cost in costs))
+        self.assertEqual(len(chain.reorder_by_cost(costs)), 2)
@@ -0,0 +1,65 @@
+import unittest
+import jax
+from jax import numpy as jnp
+from src.validation.pytree_validator import PyTreeValidator, TreeValidatorError
+from src.validation.schema import Schema
+from tests.helpers import Observer, Logger, Positive, Finite
+
+
+class TestPyTreeValidator(unittest.TestCase):
+    """
+    Test pytree validation end to end, through both the default and
+    compiled paths, with and without grouped leaves.
+    """
+    schema = Schema({"a": Positive(), "b": [Positive(), None]})
+
+    def make_operand(self, b: float = 1.0) -> dict:
+        return {"a": jnp.ones([3]), "b": [b * jnp.ones([3]), -jnp.ones([3])]}
+
+    def run_validator(self, validator: PyTreeValidator, operand: dict, compiled: bool = False) -> list:
+        observer = Observer()
+        chain = Logger(observer) & validator
+        if compiled:
+            chain = chain.compile()
+        jax.jit(lambda tree: chain(tree))(operand)
+        jax.effects_barrier()
+        return observer.errors
+
+    def test_passing_tree(self):
+        for grouped in (False, True):
+            for compiled in (False, True):
+                validator = PyTreeValidator(self.schema, grouped=grouped)
+                self.assertEqual(self.run_validator(validator, self.make_operand(), compiled), [])
+
+    def test_failing_leaf_reported(self):
+        for grouped in (False, True):
+            for compiled in (False, True):
+                validator = PyTreeValidator(self.schema, grouped=grouped)
+                errors = self.run_validator(validator, self.make_operand(-1.0), compiled)
+                self.assertEqual(len(errors), 1)
+                self.assertIsInstance(errors[0], TreeValidatorError)
+                self.assertIn("'b'", str(errors[0]))
+                cause = errors[0].__cause__
+                self.assertIsInstance(cause, ExceptionGroup)
+                self.assertEqual([str(item) for item in cause.exceptions], ["Operand must be positive"])
+
+    def test_header_applies_to_every_leaf(self):
+        validator = PyTreeValidator(self.schema, header=Finite())
+        operand = self.make_operand()
+        operand["b"][1] = jnp.full([3], jnp.nan)
+        errors = self.run_validator(validator, operand)
+        self.assertEqual([str(item) for item in errors[0].__cause__.exceptions], ["Expected finite values"])
+
+    def test_no_validators_at_all(self):
+        validator = PyTreeValidator(Schema({"a": None}))
+        self.assertIs(validator.predicate({"a": jnp.ones([3])}), True)
+
+    def test_schema_leaves_checked(self):
+        with self.assertRaises(TypeError):
+            Schema({"a": Positive(), "b": 3})
+
+    def test_structure_mismatch_is_static(self):
+        validator = PyTreeValidator(self.schema, broadcast_schema=False)
+        operand = {"a": jnp.ones([3]), "b": [jnp.ones([3])]}
+        self.assertIs(validator.predicate(operand), False)
+        self.assertIn("Schema tree", str(validator.create_exception(operand)))
@@ -0,0 +1,72 @@
+import unittest
+import jax
+from jax import numpy as jnp
+from src.validation.sampled_validator import SampledValidator
+from typing import Any
+from tests.helpers import Observer, Pass, Fail, Logger, Finite, Probability
+
+
+class Counted(Pass):
+    # Counts, on the host, how many times its predicate executes. Nodes
+    # are rebuilt when compiled, so the count lives on the class.
+    calls = []
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        jax.debug.callback(lambda: Counted.calls.append(1))
+        return True
+
+
+class TestSampledValidator(unittest.TestCase):
+    """
+    Test that the sampled validator gates the rest of the chain
+    deterministically, and at about the configured rate.
+    """
+    def test_static_rates(self):
+        self.assertIs(SampledValidator(1.0).chain_predicate(), True)
+        self.assertIs(SampledValidator(0.0).chain_predicate(), False)
+
+    def test_rate_is_respected(self):
+        validator = SampledValidator(0.25, seed=1)
+        decisions = jax.vmap(lambda step: validator.chain_predicate(step=step))(jnp.arange(4000))
+        self.assertAlmostEqual(float(decisions.mean()), 0.25, delta=0.03)
+
+    def test_deterministic_seeding(self):
+        key = jax.random.PRNGKey(7)
+        first = SampledValidator(0.5, seed=2).chain_predicate(key=key)
+        second = SampledValidator(0.5, seed=2).chain_predicate(key=key)
+        self.assertEqual(bool(first), bool(second))
+
+    def test_gates_rest_of_chain(self):
+        observer = Observer()
+        chain = (Logger(observer) & SampledValidator(0.5, seed=3) & Fail()).compile()
+        sampler = SampledValidator(0.5, seed=3)
+        expected = 0
+        for step in range(20):
+            chain(jnp.ones([3]), step=step)
+            expected += bool(sampler.chain_predicate(step=step))
+        jax.effects_barrier()
+        self.assertEqual(len(observer.errors), expected)
+        self.assertTrue(0 < expected < 20)
+
+    def test_skipped_predicates_not_executed(self):
+        Counted.calls.clear()
+        chain = (SampledValidator(0.5, seed=3) & Counted()).compile()
+        sampler = SampledValidator(0.5, seed=3)
+        step_fn = jax.jit(lambda x, step: chain(x, step=step))
+        expected = 0
+        for step in range(20):
+            step_fn(jnp.ones([3]), step)
+            expected += bool(sampler.chain_predicate(step=step))
+        jax.effects_barrier()
+        self.assertEqual(len(Counted.calls), expected)
+        self.assertTrue(0 < expected < 20)
+
+    def test_docstring_example(self):
+        # Default, uncompiled, path, both eagerly and under jit
+        validator = SampledValidator(rate=0.5, seed=3) & Finite() & Probability()
+        validator(jnp.full([3], 0.5), step=0)
+        jax.jit(lambda x, step: validator(x, step=step))(jnp.full([3], 0.5), 1)
+        jax.effects_barrier()
+
+    def test_missing_kwargs(self):
+        with self.assertRaises(KeyError):
+            SampledValidator(0.5).chain_predicate()
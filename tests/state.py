@@ -0,0 +1,288 @@
+import asyncio
+import gc
+import threading
+import time
+import unittest
+import cachetools
+
+from src.validation import state as state_module
+from src.validation.state import (InterningTable, CachePolicy, ManagedCache, get_cache, set_cache_policy,
+                                  get_cache_policy, cache_report, clear_caches, StateSnapshot,
+                                  ExceptionCallbackContextManager, SuccessCallbackContextManager,
+                                  ValidationEnabledContextManager, get_exception_callback,
+                                  get_success_callback, set_exception_callback, is_validation_enabled)
+
+
+class TestInterningTable(unittest.TestCase):
+    class Value:
+        def __init__(self, name: str):
+            self.name = name
+
+    def test_reuse(self):
+        table = InterningTable()
+        value = self.Value("a")
+        table.put(("a",), value)
+        self.assertIs(table.get(("a",)), value)
+        self.assertIsNone(table.get(("b",)))
+        self.assertIn(("a",), table)
+        self.assertEqual(len(table), 1)
+
+    def test_collected_entries_drop_out(self):
+        table = InterningTable()
+        value = self.Value("a")
+        table.put(("a",), value)
+        del value
+        gc.collect()
+        self.assertEqual(len(table), 0)
+        self.assertIsNone(table.get(("a",)))
+
+    def test_equal_hash_different_key(self):
+        class Colliding:
+            def __init__(self, name):
+                self.name = name
+            def __hash__(self):
+                return 0
+            def __eq__(self, other):
+                return self.name == other.name
+
+        table = InterningTable()
+        first, second = self.Value("a"), self.Value("b")
+        table.put(Colliding("a"), first)
+        table.put(Colliding("b"), second)
+        self.assertIs(table.get(Colliding("a")), first)
+        self.assertIs(table.get(Colliding("b")), second)
+
+    def test_bound_evicts_least_recently_used(self):
+        table = InterningTable(maxsize=2)
+        values = [self.Value(str(i)) for i in range(3)]
+        table.put(0, values[0])
+        table.put(1, values[1])
+        table.get(0)
+        table.put(2, values[2])
+        self.assertEqual(len(table), 2)
+        self.assertIs(table.get(0), values[0])
+        self.assertIsNone(table.get(1))
+
+        table.set_maxsize(1)
+        self.assertEqual(len(table), 1)
+
+    def test_setdefault(self):
+        table = InterningTable()
+        first, second = self.Value("a"), self.Value("b")
+        self.assertIs(table.setdefault("a", first), first)
+        self.assertIs(table.setdefault("a", second), first)
+        del first
+        gc.collect()
+        self.assertIs(table.setdefault("a", second), second)
+
+    def test_concurrent_setdefault(self):
+        table = InterningTable(maxsize=64)
+        barrier = threading.Barrier(8)
+        winners = [[] for _ in range(8)]
+        keep_alive = []
+
+        def intern(slot: int):
+            values = [self.Value(str(i)) for i in range(500)]
+            keep_alive.append(values)
+            barrier.wait()
+            for i, value in enumerate(values):
+                winners[slot].append(table.setdefault(i % 32, value))
+
+        threads = [threading.Thread(target=intern, args=(slot,)) for slot in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(len(table), 32)
+        for i in range(32):
+            self.assertEqual(len({id(winners[slot][i]) for slot in range(8)}), 1)
+
+    def test_memory_usage(self):
+        table = InterningTable()
+        empty = table.memory_usage()
+        values = [self.Value(str(i)) for i in range(100)]
+        for i, value in enumerate(values):
+            table.put(i, value)
+        self.assertGreater(table.memory_usage(), empty)
+
+
+class TestManagedCache(unittest.TestCase):
+    class Value:
+        def __init__(self, name: str):
+            self.name = name
+
+    def tearDown(self):
+        for name in ["TestManagedCache", "TestManagedCacheLater"]:
+            state_module.state.caches.pop(name, None)
+            state_module.state.cache_policies.pop(name, None)
+
+    def test_counters(self):
+        cache = ManagedCache("test", CachePolicy("lru", maxsize=2))
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(cache["a"], 1)
+        with self.assertRaises(KeyError):
+            cache["c"]
+        cache["c"] = 3
+        self.assertEqual((cache.stats.hits, cache.stats.misses, cache.stats.evictions), (1, 1, 1))
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.stats.hit_rate, 0.5)
+
+    def test_policies(self):
+        lfu = ManagedCache("test", CachePolicy("lfu", maxsize=2))
+        lfu["a"], lfu["b"] = 1, 2
+        lfu["a"], lfu["a"]
+        lfu["c"] = 3
+        self.assertEqual(sorted(lfu), ["a", "c"])
+
+        unbounded = ManagedCache("test", CachePolicy("unbounded"))
+        for i in range(5000):
+            unbounded[i] = i
+        self.assertEqual(len(unbounded), 5000)
+
+        ttl = ManagedCache("test", CachePolicy("ttl", maxsize=10, ttl=0.01))
+        ttl["a"] = 1
+        time.sleep(0.02)
+        self.assertNotIn("a", ttl)
+
+        weak = ManagedCache("test", CachePolicy("weak", maxsize=None))
+        value = self.Value("a")
+        weak["a"] = value
+        self.assertIs(weak["a"], value)
+        del value
+        gc.collect()
+        self.assertEqual(len(weak), 0)
+
+    def test_maxbytes(self):
+        cache = ManagedCache("test", CachePolicy("lru", maxsize=100, maxbytes=1000))
+        for i in range(100):
+            cache[i] = "x" * 100
+        self.assertLessEqual(len(cache) * len("x" * 100), 1000)
+        self.assertGreater(cache.stats.evictions, 0)
+
+        cache = ManagedCache("test", CachePolicy("lru", maxsize=3, maxbytes=10 ** 6))
+        for i in range(10):
+            cache[i] = i
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.stats.evictions, 7)
+
+    def test_bad_policies(self):
+        with self.assertRaises(ValueError):
+            CachePolicy("fifo")
+        with self.assertRaises(ValueError):
+            CachePolicy("ttl")
+        with self.assertRaises(ValueError):
+            CachePolicy("weak", maxbytes=10)
+
+    def test_reconfigure_in_place(self):
+        cache = get_cache("TestManagedCache")
+        self.assertIs(get_cache("TestManagedCache"), cache)
+        cache["a"] = 1
+        set_cache_policy("TestManagedCache", CachePolicy("lru", maxsize=1))
+        self.assertIs(get_cache("TestManagedCache"), cache)
+        self.assertEqual(get_cache_policy("TestManagedCache").kind, "lru")
+        self.assertEqual(len(cache), 0)
+
+        set_cache_policy("TestManagedCacheLater", CachePolicy("unbounded"))
+        self.assertEqual(get_cache("TestManagedCacheLater").policy.kind, "unbounded")
+
+    def test_backs_cachetools(self):
+        cache = get_cache("TestManagedCache")
+        calls = []
+
+        @cachetools.cached(cache)
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        self.assertEqual([square(2), square(2), square(3)], [4, 4, 9])
+        self.assertEqual(calls, [2, 3])
+        report = cache_report()["TestManagedCache"]
+        self.assertEqual((report["hits"], report["misses"], report["entries"]), (1, 2, 2))
+        self.assertEqual(report["policy"]["kind"], "lfu")
+
+        clear_caches()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats.hits, 0)
+
+
+class TestContextLocalState(unittest.TestCase):
+    """
+    Test that callback overrides stay within the thread
+    or task that made them.
+    """
+    def test_override_restored(self):
+        callback = lambda exception, **kwargs: None
+        with ExceptionCallbackContextManager(callback):
+            self.assertIs(get_exception_callback(), callback)
+            with ExceptionCallbackContextManager(None):
+                self.assertIsNone(get_exception_callback())
+            self.assertIs(get_exception_callback(), callback)
+        self.assertIsNone(get_exception_callback())
+
+    def test_default_seen_by_new_threads(self):
+        callback = lambda exception, **kwargs: None
+        seen = []
+        set_exception_callback(callback)
+        try:
+            thread = threading.Thread(target=lambda: seen.append(get_exception_callback()))
+            thread.start()
+            thread.join()
+        finally:
+            set_exception_callback(None)
+        self.assertEqual(seen, [callback])
+
+    def test_threads_do_not_clobber(self):
+        barrier = threading.Barrier(8)
+        mismatches = []
+
+        def serve(slot: int):
+            callback = lambda exception, **kwargs: slot
+            with SuccessCallbackContextManager(callback):
+                barrier.wait()
+                for _ in range(1000):
+                    if get_success_callback() is not callback:
+                        mismatches.append(slot)
+            barrier.wait()
+            if get_success_callback() is not None:
+                mismatches.append(slot)
+
+        threads = [threading.Thread(target=serve, args=(slot,)) for slot in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(mismatches, [])
+
+    def test_tasks_do_not_clobber(self):
+        async def serve(slot: int) -> list:
+            callback = lambda exception, **kwargs: slot
+            seen = []
+            with ExceptionCallbackContextManager(callback):
+                for _ in range(10):
+                    await asyncio.sleep(0)
+                    seen.append(get_exception_callback() is callback)
+            return seen
+
+        async def main():
+            return await asyncio.gather(*(serve(slot) for slot in range(8)))
+
+        for seen in asyncio.run(main()):
+            self.assertTrue(all(seen))
+        self.assertIsNone(get_exception_callback())
+
+    def test_snapshot(self):
+        callback = lambda exception, **kwargs: None
+        with ExceptionCallbackContextManager(callback), ValidationEnabledContextManager(False):
+            snapshot = StateSnapshot.capture()
+        seen = []
+
+        def work():
+            with snapshot:
+                seen.append((get_exception_callback(), is_validation_enabled()))
+            seen.append((get_exception_callback(), is_validation_enabled()))
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        self.assertEqual(seen, [(callback, False), (None, True)])
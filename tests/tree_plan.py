@@ -0,0 +1,221 @@
+import unittest
+from typing import Any
+from unittest import mock
+from jax import numpy as jnp
+from jax import tree_util
+from src.validation.core import Validator
+from src.validation import tree_plan
+from src.validation.tree_plan import TreeMatchError, get_plan, make_plan, group_leaves, validate_grouped
+from src.validation.tree_plan import Each, KeyPathTrie
+from tests.helpers import Finite, Positive
+
+
+class TestValidationPlan(unittest.TestCase):
+    """
+    Test that plans pair every operand leaf with the right
+    schema validator, and are only made once per structure.
+    """
+    def make_operand(self, layers: int) -> dict:
+        return {"layers": [{"weight": jnp.ones([2, 2]), "bias": jnp.ones([2])} for _ in range(layers)],
+                "scale": jnp.ones([])}
+
+    def test_exact_match(self):
+        schema = {"a": Finite(), "b": [Positive(), None]}
+        operand = {"a": jnp.ones([]), "b": [jnp.ones([]), jnp.ones([])]}
+        plan, schema_leaves, operand_leaves = get_plan(schema, operand, broadcast=False)
+        self.assertEqual([validator for _, validator in plan.bind(schema_leaves)], [Finite(), Positive(), None])
+        self.assertEqual(len(operand_leaves), 3)
+
+    def test_broadcast(self):
+        schema = {"layers": Finite(), "scale": Positive()}
+        plan, schema_leaves, _ = get_plan(schema, self.make_operand(3), broadcast=True)
+        pairs = plan.bind(schema_leaves)
+        self.assertEqual(len(pairs), 7)
+        for leaf_index, validator in pairs:
+            path = plan.operand_paths[leaf_index]
+            self.assertIs(validator, Positive() if path[0].key == "scale" else Finite())
+
+    def test_most_specific_wins(self):
+        schema = {"layers": [{"weight": Positive(), "bias": None}, None], "scale": None}
+        operand = self.make_operand(2)
+        plan, schema_leaves, _ = get_plan(schema, operand, broadcast=True)
+        validators = [validator for _, validator in plan.bind(schema_leaves)]
+        self.assertEqual(validators.count(Positive()), 1)
+
+    def test_incompatible(self):
+        with self.assertRaises(TreeMatchError):
+            make_plan({"layers": Finite()}, self.make_operand(1), broadcast=True)
+        with self.assertRaises(TreeMatchError):
+            make_plan({"layers": Finite(), "scale": None}, self.make_operand(1), broadcast=False)
+        with self.assertRaises(TreeMatchError) as context:
+            make_plan({"layers": Finite(), "scale": None, "extra": None}, self.make_operand(1), broadcast=True)
+        self.assertEqual(context.exception.schema_path[0].key, "extra")
+
+    def test_plan_cached_by_structure(self):
+        schema = {"layers": Finite(), "scale": Positive()}
+        first, _, _ = get_plan(schema, self.make_operand(4), broadcast=True)
+        with mock.patch.object(tree_plan, "make_plan", side_effect=AssertionError("Plan was remade")):
+            second, _, _ = get_plan(schema, self.make_operand(4), broadcast=True)
+            # The validators are not part of the structure
+            third, schema_leaves, _ = get_plan({"layers": Positive(), "scale": None},
+                                               self.make_operand(4), broadcast=True)
+        self.assertIs(first, second)
+        self.assertIs(first, third)
+        self.assertEqual(schema_leaves, [Positive(), None])
+        self.assertIsNot(first, get_plan(schema, self.make_operand(5), broadcast=True)[0])
+
+
+class TestKeyPathTrie(unittest.TestCase):
+    """
+    Test that the trie finds the most specific schema leaf
+    for each operand path, including through wildcards.
+    """
+    def make_operand(self, layers: int) -> dict:
+        return {"layers": [{"weight": jnp.ones([2, 2]), "bias": jnp.ones([2])} for _ in range(layers)],
+                "scale": jnp.ones([])}
+
+    def validators(self, schema: Any, operand: Any, broadcast: bool) -> list:
+        plan, schema_leaves, _ = get_plan(schema, operand, broadcast)
+        return [validator for _, validator in plan.bind(schema_leaves)]
+
+    def test_wildcard(self):
+        schema = {"layers": Each({"weight": Positive(), "bias": Finite()}), "scale": None}
+        for layers in [1, 4]:
+            validators = self.validators(schema, self.make_operand(layers), broadcast=False)
+            self.assertEqual(validators, [Finite(), Positive()] * layers + [None])
+
+    def test_wildcard_broadcast(self):
+        schema = {"layers": Each(Positive()), "scale": None}
+        validators = self.validators(schema, self.make_operand(3), broadcast=True)
+        self.assertEqual(validators, [Positive()] * 6 + [None])
+        with self.assertRaises(TreeMatchError):
+            make_plan(schema, self.make_operand(3), broadcast=False)
+
+    def test_wildcard_over_empty_container(self):
+        schema = {"layers": Each({"weight": Positive(), "bias": Finite()}), "scale": None}
+        self.assertEqual(self.validators(schema, self.make_operand(0), broadcast=False), [None])
+
+    def test_none_facing_none(self):
+        operand = {"a": jnp.ones([]), "b": None}
+        self.assertEqual(self.validators({"a": Finite(), "b": None}, operand, broadcast=False), [Finite()])
+        # A validator there is still a mismatch, even with a plan for the same structure cached
+        with self.assertRaises(TreeMatchError):
+            get_plan({"a": Finite(), "b": Positive()}, operand, broadcast=False)
+
+    def test_exact_preferred_over_wildcard(self):
+        schema = {"layers": {"a": Finite(), "b": Each(Positive())}}
+        trie = KeyPathTrie.from_schema(schema)
+        operand = {"layers": {"a": jnp.ones([]), "b": [jnp.ones([]), jnp.ones([])]}}
+        self.assertEqual(make_plan(schema, operand, broadcast=False, trie=trie).schema_indices, (0, 1, 1))
+
+        schema = [Finite(), Each(Positive()), Finite()]
+        trie = KeyPathTrie.from_schema(schema)
+        paths = [path for path, _ in tree_util.tree_flatten_with_path([1, [2, 3], 4])[0]]
+        self.assertEqual([trie.match(path, broadcast=False) for path in paths], [0, 1, 1, 2])
+
+    def test_prefix_falls_back(self):
+        # When the more specific branch dead ends, a broadcasting prefix still governs
+        trie = KeyPathTrie.from_schema({"a": {"b": Finite()}})
+        trie.insert((tree_util.DictKey("a"),), 1)
+        path = (tree_util.DictKey("a"), tree_util.DictKey("c"))
+        self.assertEqual(trie.match(path, broadcast=True), 1)
+        self.assertIsNone(trie.match(path, broadcast=False))
+
+    def test_stale_trie_ignored(self):
+        stale = KeyPathTrie.from_schema({"other": Finite()})
+        schema = {"layers": Finite(), "scale": Positive(), "fresh": None}
+        operand = dict(self.make_operand(1), fresh=jnp.ones([]))
+        plan, _, _ = get_plan(schema, operand, broadcast=True, trie=stale)
+        self.assertEqual(len(plan.schema_paths), 3)
+
+
+class Tagged(Validator):
+    def __init__(self, tag: str):
+        self.tag = tag
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return True
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return Exception("This should never happen")
+    def handle_exception(self, exception: Exception, **kwargs) -> Exception:
+        return ValueError(f"{self.tag}: {exception}")
+
+
+class IsOk(Validator):
+    def predicate(self, operand: Any, **kwargs) -> bool:
+        return operand == "ok"
+    def create_exception(self, operand: Any, **kwargs) -> Exception:
+        return ValueError(f"Expected 'ok', got '{operand}'")
+
+
+class TestGroupedValidation(unittest.TestCase):
+    """
+    Test that leaves are grouped by validator, shape, and dtype, and
+    that failures are scattered back to the right key paths.
+    """
+    def make_operand(self) -> dict:
+        return {"layers": [{"weight": jnp.ones([2, 2]), "bias": jnp.ones([2])} for _ in range(3)],
+                "scale": jnp.ones([], dtype=jnp.int32)}
+
+    def test_groups(self):
+        schema = {"layers": Finite(), "scale": Finite()}
+        plan, schema_leaves, operand_leaves = get_plan(schema, self.make_operand(), broadcast=True)
+        groups = group_leaves(plan, schema_leaves, operand_leaves)
+        self.assertEqual(sorted(len(group.leaf_indices) for group in groups), [1, 3, 3])
+        for group in groups:
+            shapes = {operand_leaves[leaf_index].shape for leaf_index in group.leaf_indices}
+            self.assertEqual(len(shapes), 1)
+
+        # Leaves with no validator are not validated at all
+        plan, schema_leaves, operand_leaves = get_plan({"layers": Finite(), "scale": None},
+                                                       self.make_operand(), broadcast=True)
+        self.assertEqual(len(group_leaves(plan, schema_leaves, operand_leaves)), 2)
+
+    def test_passes(self):
+        schema = {"layers": Finite() & Positive(), "scale": Positive()}
+        plan, schema_leaves, operand_leaves = get_plan(schema, self.make_operand(), broadcast=True)
+        self.assertEqual(validate_grouped(plan, schema_leaves, operand_leaves), [])
+
+    def test_failures_scattered(self):
+        operand = self.make_operand()
+        operand["layers"][1]["weight"] = jnp.full([2, 2], -1.0)
+        operand["layers"][2]["bias"] = jnp.full([2], jnp.nan)
+        schema = {"layers": Tagged("layers") & Finite() & Positive(), "scale": Positive()}
+        plan, schema_leaves, operand_leaves = get_plan(schema, operand, broadcast=True)
+        failures = validate_grouped(plan, schema_leaves, operand_leaves)
+
+        self.assertEqual(len(failures), 2)
+        first, second = failures
+        self.assertEqual([entry.key for entry in first.operand_path[::2]], ["layers", "weight"])
+        self.assertEqual(first.operand_path[1].idx, 1)
+        self.assertEqual(second.operand_path[1].idx, 2)
+        self.assertEqual(first.schema_path[0].key, "layers")
+        self.assertEqual(str(first.exception), "layers: Operand must be positive")
+        self.assertEqual(str(second.exception), "layers: Expected finite values")
+
+    def test_compiled_once_per_group(self):
+        schema = {"layers": Finite() & Positive(), "scale": Positive()}
+        plan, schema_leaves, operand_leaves = get_plan(schema, self.make_operand(), broadcast=True)
+        groups = group_leaves(plan, schema_leaves, operand_leaves)
+        with mock.patch.object(tree_plan, "CompiledValidator", wraps=tree_plan.CompiledValidator) as compiled:
+            validate_grouped(plan, schema_leaves, operand_leaves)
+        self.assertEqual(compiled.call_count, len(groups))
+
+    def test_non_array_leaves(self):
+        # Strings have no dtype, and "float32" would even be misread as one
+        operand = {"names": ["ok", "float32", "bad"], "scale": jnp.ones([])}
+        plan, schema_leaves, operand_leaves = get_plan({"names": IsOk(), "scale": Positive()},
+                                                       operand, broadcast=True)
+        groups = group_leaves(plan, schema_leaves, operand_leaves)
+        self.assertEqual(sorted((len(group.leaf_indices), group.stacked) for group in groups),
+                         [(1, False), (1, False), (1, False), (1, True)])
+        failures = validate_grouped(plan, schema_leaves, operand_leaves)
+        self.assertEqual([failure.operand_path[1].idx for failure in failures], [1, 2])
+
+    def test_wrap(self):
+        operand = self.make_operand()
+        operand["scale"] = jnp.zeros([], dtype=jnp.int32)
+        plan, schema_leaves, operand_leaves = get_plan({"layers": None, "scale": None},
+                                                       operand, broadcast=True)
+        failures = validate_grouped(plan, schema_leaves, operand_leaves,
+                                    wrap=lambda validator: Positive())
+        self.assertEqual([failure.operand_path[0].key for failure in failures], ["scale"])